@@ -0,0 +1,162 @@
+"""Precomputed room, stream and teacher rollups behind ``/analytics``.
+
+The dashboards aggregate every exam and seat of a session; grouping the raw
+tables on each view would rescan ``convocations`` every time. The rollups
+hold one row per room and slot, per stream and day, and per teacher and day.
+``refresh`` brings them up to date from the change log: only the days
+touched by an exam or seating change since the stored cursor are deleted
+and re-aggregated, with one ``INSERT ... SELECT ... GROUP BY`` per rollup.
+
+Room capacity is not copied into the rollups; readers join ``rooms``, so a
+resized room shows its new fill ratio without a refresh.
+
+A refresh with nothing to fold in only reads. Otherwise it takes
+``cluster.hold(db, "analytics")`` and re-reads the cursor: a worker that
+waited on another one's refresh then finds the days already recomputed
+instead of deleting and inserting them a second time.
+"""
+import threading
+
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from . import models
+from .changes import is_pruned, latest_seq_query, pruned_seq_query, since_query
+from .cluster import hold
+
+CURSOR_KEY = "analytics_seq"
+BATCH = 10_000
+CHUNK = 500  # exam ids per IN (...), well under SQLite's bound-parameter limit
+
+Exam, Convocation = models.Exam, models.Convocation
+
+# one refresh at a time in this process; ``hold`` does the same across processes
+_lock = threading.Lock()
+
+
+def _on(stmt, dates):
+    return stmt if dates is None else stmt.where(Exam.date.in_(dates))
+
+
+def _room_usage(dates):
+    seat_room = func.coalesce(Convocation.room_id, Exam.room_id)
+    seats = _on(
+        select(seat_room.label("room_id"), Exam.date, Exam.time, Exam.id.label("exam_id"), func.count().label("seated"))
+        .select_from(Exam)
+        .join(Convocation, Convocation.exam_id == Exam.id),
+        dates,
+    ).group_by(seat_room, Exam.date, Exam.time, Exam.id)
+    # the booked room is in use even before seats are allocated
+    bookings = _on(select(Exam.room_id, Exam.date, Exam.time, Exam.id, literal(0)), dates)
+    u = union_all(seats, bookings).subquery()
+    return select(
+        u.c.room_id, u.c.date, u.c.time, func.count(func.distinct(u.c.exam_id)), func.sum(u.c.seated)
+    ).group_by(u.c.room_id, u.c.date, u.c.time)
+
+
+def _stream_day(dates):
+    return _on(
+        select(
+            Exam.stream_id, Exam.date,
+            func.count(func.distinct(Exam.id)), func.count(func.distinct(Convocation.student_id)),
+        )
+        .select_from(Exam)
+        .outerjoin(Convocation, Convocation.exam_id == Exam.id),
+        dates,
+    ).group_by(Exam.stream_id, Exam.date)
+
+
+def _teacher_day(dates):
+    return _on(
+        select(Exam.teacher_id, Exam.date, func.count(), func.sum(Exam.duration)).where(Exam.teacher_id.isnot(None)),
+        dates,
+    ).group_by(Exam.teacher_id, Exam.date)
+
+
+ROLLUPS = [
+    (models.RoomUsageRollup, ("room_id", "date", "time", "exams", "seated"), _room_usage),
+    (models.StreamDayRollup, ("stream_id", "date", "exams", "students"), _stream_day),
+    (models.TeacherDayRollup, ("teacher_id", "date", "exams", "minutes"), _teacher_day),
+]
+
+
+def _recompute(db: Session, dates=None):
+    """Rebuild the rollup rows of ``dates`` (all of them when None)."""
+    for model, columns, query in ROLLUPS:
+        stmt = delete(model)
+        if dates is not None:
+            stmt = stmt.where(model.date.in_(dates))
+        db.execute(stmt)
+        db.execute(insert(model).from_select(columns, query(dates)))
+
+
+def _dirty_dates(db: Session, exam_ids):
+    """Old and new dates of ``exam_ids``; moves the snapshot to the new ones."""
+    Snapshot = models.RollupExamDate
+    dates = set()
+    ids = sorted(exam_ids)
+    for i in range(0, len(ids), CHUNK):
+        chunk = ids[i:i + CHUNK]
+        dates.update(db.scalars(select(Snapshot.date).where(Snapshot.exam_id.in_(chunk))))
+        dates.update(db.scalars(select(Exam.date).where(Exam.id.in_(chunk))))
+        db.execute(delete(Snapshot).where(Snapshot.exam_id.in_(chunk)))
+        db.execute(insert(Snapshot).from_select(("exam_id", "date"), select(Exam.id, Exam.date).where(Exam.id.in_(chunk))))
+    return sorted(dates)
+
+
+def rebuild(db: Session):
+    """Recompute every rollup and move the cursor to the end of the log. Commits."""
+    with _lock:
+        hold(db, "analytics")
+        _rebuild(db, db.scalar(latest_seq_query()))
+        db.commit()
+
+
+def _rebuild(db: Session, latest):
+    db.execute(delete(models.RollupExamDate))
+    db.execute(insert(models.RollupExamDate).from_select(("exam_id", "date"), select(Exam.id, Exam.date)))
+    _recompute(db)
+    db.merge(models.AppMeta(key=CURSOR_KEY, value=str(latest)))
+
+
+def _cursor(db: Session):
+    value = db.scalar(select(models.AppMeta.value).where(models.AppMeta.key == CURSOR_KEY))
+    return int(value) if value is not None else None
+
+
+def refresh(db: Session):
+    """Fold the changes logged since the last refresh into the rollups. Commits.
+
+    Returns the number of days recomputed, or None after a full rebuild (first
+    run, a cursor ahead of the log, e.g. after restoring a backup, or behind
+    changes that were pruned).
+    """
+    if _cursor(db) == db.scalar(latest_seq_query()):
+        return 0
+    with _lock:
+        hold(db, "analytics")
+        # another worker may have refreshed while this one waited
+        latest = db.scalar(latest_seq_query())
+        cursor = _cursor(db)
+        if cursor == latest:
+            db.rollback()
+            return 0
+        if cursor is None or cursor > latest or is_pruned(cursor, db.scalar(pruned_seq_query())):
+            _rebuild(db, latest)
+            db.commit()
+            return None
+
+        exam_ids = set()
+        while cursor < latest:
+            rows = db.execute(since_query(cursor, BATCH)).all()
+            if not rows:
+                break
+            cursor = rows[-1].seq
+            exam_ids.update(r.entity_id for r in rows if r.entity in ("exam", "seating"))
+
+        dates = _dirty_dates(db, exam_ids) if exam_ids else []
+        if dates:
+            _recompute(db, dates)
+        db.merge(models.AppMeta(key=CURSOR_KEY, value=str(cursor)))
+        db.commit()
+        return len(dates)
@@ -0,0 +1,123 @@
+"""Monotonic change log behind the delta-sync feed.
+
+Every flush that creates, updates or deletes an Exam, Room, Subject or
+Convocation appends rows to ``changes`` in the same transaction, so a
+change is visible in the feed exactly when the data is. Seats are logged
+per exam, as one ``seating`` change, instead of per student: allocating an
+exam rewrites thousands of them at once.
+
+Clients load their lists once, remember the ``seq`` they were served, then
+ask for ``GET /changes?since=<seq>`` (or hold ``/changes/stream`` open) and
+refetch only the entities named there.
+
+Core bulk writes do not go through the flush, so they call ``record``,
+which also tells the other worker processes (see ``cluster``).
+
+``prune`` keeps the log to ``CHANGES_RETENTION_DAYS`` and ``CHANGES_MAX_ROWS``
+(the newest change always stays, it carries the current ``seq``). The last
+pruned ``seq`` is stored in ``app_meta``; a reader behind it missed changes
+and must reload.
+"""
+import datetime
+import os
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .cluster import ENTITY_CACHES, touch
+
+ENTITIES = {models.Exam: "exam", models.Room: "room", models.Subject: "subject"}
+
+RETENTION_DAYS = float(os.getenv("CHANGES_RETENTION_DAYS", "7"))
+MAX_ROWS = int(os.getenv("CHANGES_MAX_ROWS", "100000"))
+PRUNE_INTERVAL = float(os.getenv("CHANGES_PRUNE_INTERVAL", "3600"))  # seconds
+PRUNED_KEY = "changes_pruned_seq"
+
+
+def _rows(keys):
+    now = datetime.datetime.utcnow()
+    return [{"entity": e, "entity_id": i, "op": op, "at": now} for (e, i), op in keys.items()]
+
+
+def record(db: Session, entity: str, entity_ids, op: str = "update"):
+    """Log changes written outside the ORM flush (Core inserts/deletes)."""
+    rows = _rows({(entity, i): op for i in dict.fromkeys(entity_ids)})
+    if rows:
+        db.execute(insert(models.Change), rows)
+        touch(db, *ENTITY_CACHES.get(entity, ()))
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    keys = {}  # (entity, id) -> op, in flush order
+    for obj, op in (
+        *((o, "create") for o in session.new),
+        *((o, "update") for o in session.dirty if session.is_modified(o, include_collections=False)),
+        *((o, "delete") for o in session.deleted),
+    ):
+        if isinstance(obj, models.Convocation):
+            keys.setdefault(("seating", obj.exam_id), "update")
+        elif type(obj) in ENTITIES:
+            keys[(ENTITIES[type(obj)], obj.id)] = op
+    if keys:
+        session.connection().execute(insert(models.Change), _rows(keys))
+
+
+# -------------------------
+# Reading the feed
+# -------------------------
+def latest_seq_query():
+    return select(func.coalesce(func.max(models.Change.seq), 0))
+
+
+def since_query(since: int, limit: int):
+    return (
+        select(models.Change.seq, models.Change.entity, models.Change.entity_id, models.Change.op)
+        .where(models.Change.seq > since)
+        .order_by(models.Change.seq)
+        .limit(limit)
+    )
+
+
+def pruned_seq_query():
+    """The highest ``seq`` deleted by ``prune``; NULL while nothing was."""
+    return select(models.AppMeta.value).where(models.AppMeta.key == PRUNED_KEY)
+
+
+def is_pruned(since: int, pruned) -> bool:
+    return pruned is not None and since < int(pruned)
+
+
+def prune(db: Session) -> int:
+    """Delete changes past the retention limits. Commits; returns the number deleted."""
+    Change = models.Change
+    latest = db.scalar(latest_seq_query())
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=RETENTION_DAYS)
+    bounds = (
+        db.scalar(select(func.max(Change.seq)).where(Change.at < cutoff, Change.seq < latest)),
+        db.scalar(select(Change.seq).order_by(Change.seq.desc()).offset(MAX_ROWS).limit(1)),
+    )
+    upto = max((b for b in bounds if b is not None), default=None)
+    if upto is None:
+        return 0
+    deleted = db.execute(delete(Change).where(Change.seq <= upto)).rowcount
+    marker = db.get(models.AppMeta, PRUNED_KEY)
+    if marker is None:
+        db.add(models.AppMeta(key=PRUNED_KEY, value=str(upto)))
+    else:
+        marker.value = str(max(upto, int(marker.value)))
+    db.commit()
+    return deleted
+
+
+def compact(rows):
+    """Keep the last change per entity: a client only needs its final state."""
+    last = {}
+    for seq, entity, entity_id, op in rows:
+        last.pop((entity, entity_id), None)
+        last[(entity, entity_id)] = (seq, op)
+    return [
+        {"seq": seq, "entity": entity, "id": entity_id, "op": op}
+        for (entity, entity_id), (seq, op) in last.items()
+    ]
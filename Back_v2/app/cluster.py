@@ -0,0 +1,253 @@
+"""Coordination between the worker processes of one deployment.
+
+With ``uvicorn --workers N`` (or ``python -m app.jobs`` next to the server)
+several processes share the database, each with its own in-process caches.
+
+* ``startup_lock`` is an exclusive file lock: one process at a time creates
+  the schema, migrates and seeds; the next ones find nothing left to do. It
+  only covers processes on the same host.
+* Writes that make a cache stale bump that cache's row in
+  ``cache_generations`` in the same transaction: ORM flushes through the
+  listener below, Core writes through ``touch``. ``invalidator`` polls the
+  table (on SQLite only when ``PRAGMA data_version`` says another connection
+  committed) and runs the callbacks that caches ``subscribe``d for every
+  generation bumped by another process. A process's own commits are skipped:
+  it already updated its caches in place.
+* ``hold`` bumps a generation first thing in a transaction, which takes the
+  database write lock with it: a process checking a write against its cache
+  waits for any other one doing the same, then sees what it committed.
+"""
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from . import models
+from .database import engine as default_engine
+
+logger = logging.getLogger("uvicorn.error")
+
+STARTUP_LOCK = os.getenv("STARTUP_LOCK_FILE", "./.startup.lock")
+POLL_INTERVAL = float(os.getenv("CACHE_POLL_INTERVAL", "1.0"))  # 0 = no polling thread
+
+# cache name -> models whose writes make it stale in the other processes
+CACHE_MODELS = {
+    "refdata": (models.Stream, models.Subject, models.Room),
+    "principals": (models.User,),
+    "conflicts": (models.Exam, models.Convocation),
+}
+# a new row cannot be in these yet
+NOT_STALE_ON_CREATE = {"principals"}
+# change-log entity -> caches, for Core writes logged with changes.record
+ENTITY_CACHES = {"exam": ("conflicts",), "seating": ("conflicts",), "room": ("refdata",), "subject": ("refdata",)}
+
+Generation = models.CacheGeneration
+
+
+# -------------------------
+# One-time initialisation
+# -------------------------
+@contextmanager
+def startup_lock(path: str = STARTUP_LOCK):
+    """Hold an exclusive lock on ``path`` for the duration of the block."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # gives up after 10 s
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# -------------------------
+# Signalling writes
+# -------------------------
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def touch(db: Session, *names):
+    """Bump the generation of the named caches in the current transaction."""
+    names = sorted(set(names))
+    if not names:
+        return
+    insert = _DIALECT_INSERTS[db.get_bind().dialect.name]
+    stmt = insert(Generation).values([{"name": n, "generation": 1} for n in names])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Generation.name], set_={"generation": Generation.generation + 1}
+    ).returning(Generation.name, Generation.generation)
+    pending = db.info.setdefault("cache_generations", {})  # name -> (bumps, last generation)
+    for name, generation in db.connection().execute(stmt):
+        bumps, _ = pending.get(name, (0, 0))
+        pending[name] = (bumps + 1, generation)
+
+
+def hold(db: Session, name):
+    """Lock the cache ``name`` across processes until ``db`` commits or rolls back.
+
+    The bump takes SQLite's write lock, or on PostgreSQL the row lock on
+    ``name``; other processes calling ``hold`` wait for it. A rollback undoes it.
+    """
+    touch(db, name)
+
+
+def _stale_caches(session):
+    names = set()
+    for obj, created in (
+        *((o, True) for o in session.new),
+        *((o, False) for o in session.dirty if session.is_modified(o, include_collections=False)),
+        *((o, False) for o in session.deleted),
+    ):
+        for name, types in CACHE_MODELS.items():
+            if isinstance(obj, types) and not (created and name in NOT_STALE_ON_CREATE):
+                names.add(name)
+    return names
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    touch(session, *_stale_caches(session))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    pending = session.info.pop("cache_generations", None)
+    if pending:
+        invalidator.committed(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("cache_generations", None)
+
+
+# -------------------------
+# Watching them
+# -------------------------
+class Invalidator:
+    def __init__(self, engine=default_engine, interval=POLL_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        # an in-memory database lives in this process only
+        self.enabled = not isinstance(engine.pool, StaticPool)
+        self._callbacks = defaultdict(list)  # name -> [callable]
+        self._lock = threading.Lock()
+        self._seen = None  # name -> generation, None before the first poll
+        self._conn = None
+        self._data_version = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, name, callback):
+        """Call ``callback()`` whenever another process bumps ``name``."""
+        self._callbacks[name].append(callback)
+
+    def committed(self, pending):
+        """Mark this process's own bumps as seen, unless another process bumped in between."""
+        with self._lock:
+            if self._seen is None:
+                return
+            for name, (bumps, generation) in pending.items():
+                if generation == self._seen.get(name, 0) + bumps:
+                    self._seen[name] = generation
+
+    def _changed(self) -> bool:
+        # data_version moves when any other connection commits to the file
+        if self.engine.dialect.name != "sqlite":
+            return True
+        version = self._conn.exec_driver_sql("PRAGMA data_version").scalar()
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    def poll(self):
+        """Run the callbacks of the caches made stale since the last poll; returns their names.
+
+        The first poll runs every callback: nothing is known yet about what
+        the caches were filled from.
+        """
+        if not self.enabled:
+            return []
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = self.engine.connect()
+                    self._data_version = None
+                if not self._changed() and self._seen is not None:
+                    return []
+                current = dict(self._conn.execute(select(Generation.name, Generation.generation)).all())
+            except Exception:
+                if self._conn is not None:
+                    self._conn.invalidate()
+                    self._conn.close()
+                    self._conn = None
+                raise
+            finally:
+                if self._conn is not None:
+                    self._conn.rollback()
+            if self._seen is None:
+                stale = set(self._callbacks)
+                self._seen = current
+            else:
+                # any difference, not only a higher generation: the table may have been
+                # recreated or restored from a backup since
+                stale = {n for n in {*current, *self._seen} if current.get(n, 0) != self._seen.get(n, 0)}
+                self._seen = current
+        # outside our lock: callbacks take their cache's own lock
+        for name in sorted(stale):
+            for callback in self._callbacks.get(name, ()):
+                callback()
+        return sorted(stale)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                stale = self.poll()
+            except Exception:
+                logger.exception("Cache invalidation poll failed")
+                continue
+            if stale:
+                logger.debug("Caches changed by another process: %s", ", ".join(stale))
+
+    def start(self):
+        self.poll()
+        if self.enabled and self.interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+invalidator = Invalidator()
+subscribe = invalidator.subscribe
@@ -0,0 +1,214 @@
+"""Double-booking detection for rooms, teachers and streams.
+
+Bookings are kept in memory, bucketed per (kind, resource_id, date) and
+sorted by start minute, so checking a new exam is a bisect in a handful of
+tiny lists instead of a scan of the ``exams`` table. The index is loaded
+from the database on first use and kept up to date by the exam write paths.
+Those check and write under ``writing``, which also keeps other processes
+from booking in between.
+"""
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from datetime import time
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .cluster import hold, invalidator, subscribe
+
+Booking = namedtuple("Booking", "start end exam_id")
+Conflict = namedtuple("Conflict", "kind resource_id date start end exam_id conflicting_exam_id")
+
+
+def _minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _as_time(minutes: int) -> time:
+    minutes = min(minutes, 24 * 60 - 1)
+    return time(minutes // 60, minutes % 60)
+
+
+def resources(exam, extra_rooms=()):
+    """The (kind, resource_id) pairs an exam occupies.
+
+    ``extra_rooms`` are the overflow rooms of a split-room exam (see seating).
+    """
+    keys = [("room", exam.room_id), ("stream", exam.stream_id)]
+    if exam.teacher_id is not None:
+        keys.append(("teacher", exam.teacher_id))
+    keys.extend(("room", rid) for rid in extra_rooms if rid != exam.room_id)
+    return keys
+
+
+def overflow_rooms(db: Session, exam_id=None):
+    """exam_id -> overflow room ids, from convocations seated outside the exam's room."""
+    q = (
+        db.query(models.Convocation.exam_id, models.Convocation.room_id)
+        .join(models.Exam, models.Convocation.exam_id == models.Exam.id)
+        .filter(models.Convocation.room_id.isnot(None), models.Convocation.room_id != models.Exam.room_id)
+        .distinct()
+    )
+    if exam_id is not None:
+        q = q.filter(models.Convocation.exam_id == exam_id)
+    extra = defaultdict(list)
+    for eid, rid in q:
+        extra[eid].append(rid)
+    return extra
+
+
+class ConflictIndex:
+    def __init__(self, loaded=False):
+        """``loaded=True`` starts empty without reading the database, e.g. to check a batch against itself."""
+        self.lock = threading.RLock()
+        self._loaded = loaded
+        self._buckets = defaultdict(list)   # (kind, rid, date) -> sorted [Booking]
+        self._longest = defaultdict(int)    # (kind, rid, date) -> longest booking in the bucket
+        self._keys_by_exam = {}             # exam_id -> [bucket key]
+        self._extra_rooms = {}              # exam_id -> overflow room ids
+
+    def ensure_loaded(self, db: Session):
+        # drops the index first if another process booked or moved exams since
+        invalidator.poll()
+        if self._loaded:
+            return
+        with self.lock:
+            if self._loaded:
+                return
+            self._extra_rooms = dict(overflow_rooms(db))
+            rows = db.query(
+                models.Exam.id, models.Exam.room_id, models.Exam.teacher_id,
+                models.Exam.stream_id, models.Exam.date, models.Exam.time, models.Exam.duration,
+            )
+            for row in rows:
+                self._add(row)
+            self._loaded = True
+
+    @contextmanager
+    def writing(self, db: Session):
+        """Hold the index lock and, until ``db`` ends its transaction, the same lock in every process.
+
+        Rolls ``db`` back if the block raises, so a rejected write releases the
+        database at once.
+        """
+        with self.lock:
+            hold(db, "conflicts")
+            try:
+                yield
+            except BaseException:
+                db.rollback()
+                raise
+
+    def reset(self):
+        with self.lock:
+            self._buckets.clear()
+            self._longest.clear()
+            self._keys_by_exam.clear()
+            self._extra_rooms.clear()
+            self._loaded = False
+
+    def _add(self, exam):
+        start = _minutes(exam.time)
+        booking = Booking(start, start + exam.duration, exam.id)
+        keys = []
+        for kind, rid in resources(exam, self._extra_rooms.get(exam.id, ())):
+            key = (kind, rid, exam.date)
+            insort(self._buckets[key], booking)
+            self._longest[key] = max(self._longest[key], exam.duration)
+            keys.append(key)
+        self._keys_by_exam[exam.id] = keys
+
+    def add(self, exam):
+        with self.lock:
+            if self._loaded:
+                self._remove(exam.id)
+                self._add(exam)
+
+    def set_overflow_rooms(self, exam, room_ids):
+        with self.lock:
+            if room_ids:
+                self._extra_rooms[exam.id] = list(room_ids)
+            else:
+                self._extra_rooms.pop(exam.id, None)
+            self.add(exam)
+
+    def _remove(self, exam_id):
+        for key in self._keys_by_exam.pop(exam_id, ()):
+            bucket = self._buckets[key]
+            bucket[:] = [b for b in bucket if b.exam_id != exam_id]
+            if not bucket:
+                del self._buckets[key]
+                self._longest.pop(key, None)
+
+    def remove(self, exam_id):
+        with self.lock:
+            self._remove(exam_id)
+            self._extra_rooms.pop(exam_id, None)
+
+    def find(self, exam, ignore_exam_id=None):
+        """Bookings overlapping ``exam`` (any object with the Exam columns).
+
+        When an existing exam is being moved (``ignore_exam_id``), its overflow
+        rooms move with it and are checked too.
+        """
+        start = _minutes(exam.time)
+        end = start + exam.duration
+        found = []
+        with self.lock:
+            for kind, rid in resources(exam, self._extra_rooms.get(ignore_exam_id, ())):
+                key = (kind, rid, exam.date)
+                bucket = self._buckets.get(key)
+                if not bucket:
+                    continue
+                # candidates start before our end and no earlier than start - longest
+                i = bisect_left(bucket, (end,)) - 1
+                lower = start - self._longest[key]
+                while i >= 0 and bucket[i].start > lower - 1:
+                    b = bucket[i]
+                    if b.end > start and b.exam_id != ignore_exam_id:
+                        found.append(Conflict(
+                            kind, rid, exam.date, _as_time(b.start), _as_time(b.end),
+                            ignore_exam_id, b.exam_id,
+                        ))
+                    i -= 1
+        return found
+
+
+conflict_index = ConflictIndex()
+subscribe("conflicts", conflict_index.reset)
+
+
+def check_exam(db: Session, exam, ignore_exam_id=None):
+    conflict_index.ensure_loaded(db)
+    return conflict_index.find(exam, ignore_exam_id)
+
+
+def sweep(db: Session):
+    """Every overlapping pair in the timetable, in one pass over exams sorted by start."""
+    rows = db.query(
+        models.Exam.id, models.Exam.room_id, models.Exam.teacher_id,
+        models.Exam.stream_id, models.Exam.date, models.Exam.time, models.Exam.duration,
+    ).order_by(models.Exam.date, models.Exam.time, models.Exam.id)
+    extra = overflow_rooms(db)
+
+    # per resource, the bookings of the current day that may still be running
+    active = {}
+    conflicts = []
+    for row in rows:
+        start = _minutes(row.time)
+        for kind, rid in resources(row, extra.get(row.id, ())):
+            key = (kind, rid)
+            day, running = active.get(key, (None, []))
+            if day != row.date:
+                running = []
+            running = [b for b in running if b.end > start]
+            for b in running:
+                conflicts.append(Conflict(
+                    kind, rid, row.date, row.time, _as_time(start + row.duration),
+                    row.id, b.exam_id,
+                ))
+            running.append(Booking(start, start + row.duration, row.id))
+            active[key] = (row.date, running)
+    return conflicts
@@ -0,0 +1,267 @@
+"""Convocation PDF rendering.
+
+Rendering only works on plain dicts (see ``convocation_data``) so it can run
+in worker processes: this module must stay importable without touching the
+database. ReportLab is CPU-bound and holds the GIL, so bulk exports fan the
+pages out over a process pool instead of threads. It is also slow to import,
+so it is only loaded by the first render.
+
+A merged PDF export renders ranges of ``PAGES_PER_CHUNK`` pages on the pool
+and ``PdfMerger`` grafts the pages of each range into one document as they
+arrive, so the first bytes go out while later pages are still being drawn.
+"""
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .metrics import timed
+
+PAGES_PER_CHUNK = 50
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def convocation_data(student, exam, conv) -> dict:
+    return {
+        "student_id": student.id,
+        "full_name": student.full_name,
+        "cne": student.cne,
+        "code_apoge": student.code_apoge,
+        "exam_id": exam.id,
+        "stream": exam.stream.nom,
+        "subject": exam.subject.name,
+        "room": (conv.room or exam.room).name,
+        "table_number": conv.table_number,
+        "date": exam.date.strftime("%d/%m/%Y"),
+        "time": exam.time.strftime("%H:%M"),
+    }
+
+
+def _canvas(target):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    return canvas.Canvas(target, pagesize=A4)
+
+
+def draw_convocation(p, data: dict):
+    from reportlab.lib.pagesizes import A4
+
+    width, height = A4
+
+    p.setFont("Helvetica-Bold", 18)
+    p.drawCentredString(width / 2, height - 80, "Université Ibn Zohr")
+    p.setFont("Helvetica", 14)
+    p.drawCentredString(width / 2, height - 110, "Convocation d'Examen")
+
+    y = height - 160
+    p.setFont("Helvetica", 12)
+    p.drawString(80, y, f"Nom complet : {data['full_name']}"); y -= 20
+    p.drawString(80, y, f"CNE : {data['cne'] or '-'}"); y -= 20
+    p.drawString(80, y, f"Code Apogée : {data['code_apoge'] or '-'}"); y -= 20
+    p.drawString(80, y, f"Filière : {data['stream']}"); y -= 20
+    p.drawString(80, y, f"Matière : {data['subject']}"); y -= 20
+    p.drawString(80, y, f"Salle : {data['room']}"); y -= 20
+    p.drawString(80, y, f"Table : {data['table_number']}"); y -= 20
+    p.drawString(80, y, f"Date : {data['date']} à {data['time']}")
+
+    p.showPage()
+
+
+def render_convocation(data: dict) -> bytes:
+    buffer = io.BytesIO()
+    p = _canvas(buffer)
+    draw_convocation(p, data)
+    p.save()
+    return buffer.getvalue()
+
+
+def render_pages(items) -> bytes:
+    """Every convocation of ``items`` as one page of a single PDF."""
+    buffer = io.BytesIO()
+    p = _canvas(buffer)
+    for data in items:
+        draw_convocation(p, data)
+    p.save()
+    return buffer.getvalue()
+
+
+def render_merged(items, path: str):
+    """Render every convocation as one page of a single PDF written to ``path``."""
+    p = _canvas(path)
+    for data in items:
+        draw_convocation(p, data)
+    p.save()
+    return path
+
+
+def worker_count() -> int:
+    return int(os.getenv("CONVOCATION_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded server process is not safe
+            _executor = ProcessPoolExecutor(
+                max_workers=worker_count(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+def render_parallel(items, window=None, render=render_convocation):
+    """Yield (item, pdf_bytes) in order, keeping at most ``window`` renders in flight."""
+    executor = get_executor()
+    window = window or worker_count() * 2
+    pending = deque()
+    for data in items:
+        pending.append((data, executor.submit(render, data)))
+        if len(pending) >= window:
+            data, future = pending.popleft()
+            yield data, future.result()
+    while pending:
+        data, future = pending.popleft()
+        yield data, future.result()
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable target: zipfile then emits data descriptors."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def archive_name(data: dict) -> str:
+    """Path of a convocation inside an export archive."""
+    return f"exam_{data['exam_id']}/{data['room']}/table_{data['table_number']:03d}_{data['student_id']}.pdf"
+
+
+def stream_zip(items, filename):
+    """Yield a ZIP archive chunk by chunk while convocations are being rendered."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for data, pdf in render_parallel(items):
+            zf.writestr(filename(data), pdf)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
+
+
+_REF = re.compile(rb"(\d+) 0 R")
+
+
+def _pdf_objects(pdf: bytes):
+    """(objects by number, trailer) of a PDF written by ReportLab: one xref
+    section, objects in number order. Objects are cut at the xref offsets, so
+    stream data is never scanned."""
+    xref = int(pdf[pdf.rindex(b"startxref") + 9:].split()[0])
+    lines = pdf[xref:].split(b"\n")
+    count = int(lines[1].split()[1])
+    offsets = [int(line[:10]) for line in lines[3:2 + count]]  # objects 1..count-1, after the free entry
+    bounds = offsets + [xref]
+    objects = {}
+    for number, (start, end) in enumerate(zip(bounds, bounds[1:]), 1):
+        body = pdf[start:end]
+        body = body[body.index(b"obj") + 3:body.rindex(b"endobj")].strip(b"\r\n")
+        objects[number] = body
+    return objects, pdf[pdf.rindex(b"trailer"):pdf.rindex(b"startxref")]
+
+
+def _ref(body: bytes, key: bytes) -> int:
+    return int(re.search(rb"/" + key + rb" (\d+) 0 R", body).group(1))
+
+
+class PdfMerger:
+    """Writes one PDF from the pages of several, one source document at a time.
+
+    Object 1 is the catalog and object 2 the page tree; both are written last,
+    with the cross-reference table, by ``finish``.
+    """
+
+    HEADER = b"%PDF-1.3\n%\x93\x8c\x8b\x9e\n"
+
+    def __init__(self):
+        self._offsets = {}  # object number -> byte offset
+        self._kids = []
+        self._next = 3
+        self._size = 0
+
+    def _emit(self, number: int, body: bytes) -> bytes:
+        self._offsets[number] = self._size
+        out = b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        self._size += len(out)
+        return out
+
+    def header(self) -> bytes:
+        self._size = len(self.HEADER)
+        return self.HEADER
+
+    def add(self, pdf: bytes) -> bytes:
+        """The objects of ``pdf``'s pages, renumbered; its catalog, page tree and info are left out."""
+        objects, trailer = _pdf_objects(pdf)
+        root = _ref(trailer, b"Root")
+        pages = _ref(objects[root], b"Pages")
+        skip = {root, pages, _ref(trailer, b"Info")}
+        numbers = {pages: 2}
+        for number in objects:
+            if number not in skip:
+                numbers[number] = self._next
+                self._next += 1
+
+        def renumber(body):
+            # only the dictionary: stream data is copied untouched
+            head, sep, data = body.partition(b"stream\n")
+            return _REF.sub(lambda m: b"%d 0 R" % numbers[int(m.group(1))], head) + sep + data
+
+        kids = objects[pages][objects[pages].index(b"/Kids"):]
+        self._kids.extend(numbers[int(n)] for n in _REF.findall(kids[:kids.index(b"]")]))
+        return b"".join(self._emit(numbers[n], renumber(body)) for n, body in objects.items() if n not in skip)
+
+    def finish(self) -> bytes:
+        kids = b" ".join(b"%d 0 R" % k for k in self._kids)
+        out = self._emit(2, b"<<\n/Count %d /Kids [ %s ] /Type /Pages\n>>" % (len(self._kids), kids))
+        out += self._emit(1, b"<<\n/PageMode /UseNone /Pages 2 0 R /Type /Catalog\n>>")
+        xref = self._size
+        entries = [b"0000000000 65535 f \n"] + [b"%010d 00000 n \n" % self._offsets[n] for n in range(1, self._next)]
+        return out + b"xref\n0 %d\n%strailer\n<<\n/Root 1 0 R /Size %d\n>>\nstartxref\n%d\n%%%%EOF\n" % (
+            self._next, b"".join(entries), self._next, xref,
+        )
+
+
+def stream_merged_pdf(items, pages_per_chunk=PAGES_PER_CHUNK):
+    """Yield one PDF of every convocation, range by range as the pool renders them."""
+    chunks = [items[i:i + pages_per_chunk] for i in range(0, len(items), pages_per_chunk)]
+    merger = PdfMerger()
+    yield merger.header()
+    with timed("pdf_render_merged"):
+        for _, pdf in render_parallel(chunks, render=render_pages):
+            yield merger.add(pdf)
+    yield merger.finish()
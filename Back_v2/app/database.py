@@ -1,13 +1,140 @@
-from sqlalchemy import create_engine
+import os
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+# DATABASE_URL may point at SQLite (default) or PostgreSQL; DATABASE_READ_URL
+# optionally sends read-only sessions elsewhere (e.g. a replica).
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./gestion_examens.db")
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL", SQLALCHEMY_DATABASE_URL)
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "20"))
+
+# applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    # first, so the switch to WAL below waits for a sibling worker's startup instead of failing
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "journal_mode": "WAL",  # readers no longer block on a writer
+    "synchronous": "NORMAL",  # safe with WAL, one fsync per checkpoint instead of per commit
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB
+    "temp_store": "MEMORY",
+}
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+# async drivers for the sync URLs above
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def make_engine(url: str, readonly: bool = False, asynchronous: bool = False):
+    factory = create_async_engine if asynchronous else create_engine
+    if is_sqlite(url):
+        kwargs = {"connect_args": {"check_same_thread": False}}
+        if _is_memory(url):
+            # one shared connection, otherwise every connection sees its own empty database
+            kwargs["poolclass"] = StaticPool
+        else:
+            if asynchronous:
+                # aiosqlite defaults to NullPool: a new thread and connection per checkout
+                kwargs["poolclass"] = AsyncAdaptedQueuePool
+            kwargs["pool_size"] = READ_POOL_SIZE if readonly else POOL_SIZE
+            kwargs["max_overflow"] = READ_MAX_OVERFLOW if readonly else MAX_OVERFLOW
+        eng = factory(async_url(url) if asynchronous else url, **kwargs)
+
+        @event.listens_for(eng.sync_engine if asynchronous else eng, "connect")
+        def _sqlite_pragmas(dbapi_conn, _):
+            cursor = dbapi_conn.cursor()
+            for name, value in SQLITE_PRAGMAS.items():
+                if name == "journal_mode" and _is_memory(url):
+                    continue
+                cursor.execute(f"PRAGMA {name}={value}")
+            if readonly:
+                cursor.execute("PRAGMA query_only=ON")
+            cursor.close()
+
+        return eng
+
+    eng = factory(
+        async_url(url) if asynchronous else url,
+        pool_size=READ_POOL_SIZE if readonly else POOL_SIZE,
+        max_overflow=READ_MAX_OVERFLOW if readonly else MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+    if readonly and url.startswith("postgresql"):
+        @event.listens_for(eng.sync_engine if asynchronous else eng, "connect")
+        def _read_only(dbapi_conn, _):
+            cursor = dbapi_conn.cursor()
+            cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+            cursor.close()
+            dbapi_conn.commit()
+    return eng
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./gestion_examens.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
+if _is_memory(SQLALCHEMY_READ_DATABASE_URL):
+    read_engine = engine
+else:
+    read_engine = make_engine(SQLALCHEMY_READ_DATABASE_URL, readonly=True)
+
+# read-heavy async handlers: one event loop can keep many queries in flight
+# without tying up a threadpool thread per request. An in-memory database is
+# private to its connection, so there the async engine cannot see the sync
+# one's data; point DATABASE_URL at a file or a server to use it.
+#
+# Built on first use, so a backend without an async driver installed only
+# fails the async handlers instead of the whole app at import.
+_async_read_engine = None
+_async_lock = threading.Lock()
+ASYNC_ENGINE_HOOKS = []  # called with the async engine once it is built (e.g. metrics)
+
+
+def async_read_engine():
+    global _async_read_engine
+    if _async_read_engine is None:
+        with _async_lock:
+            if _async_read_engine is None:
+                eng = make_engine(SQLALCHEMY_READ_DATABASE_URL, readonly=True, asynchronous=True)
+                for hook in ASYNC_ENGINE_HOOKS:
+                    hook(eng)
+                _async_read_engine = eng
+    return _async_read_engine
+
+
+async def dispose_async_engine():
+    if _async_read_engine is not None:
+        await _async_read_engine.dispose()
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+_async_sessions = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def AsyncReadSessionLocal() -> AsyncSession:
+    return _async_sessions(bind=async_read_engine())
 Base = declarative_base()
 
 def get_db():
@@ -16,3 +143,18 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session on the read-only pool, for handlers that never write."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """AsyncSession on the read-only pool, for ``async def`` read handlers."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
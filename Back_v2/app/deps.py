@@ -1,25 +1,30 @@
 from fastapi import HTTPException, status, Depends, Header
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-
-from .database import get_db
+from typing import Optional
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+import os, threading, time
+
+from .cache import TTLCache
+from .cluster import subscribe
+from .hashing import hash_password, verify_and_update
+from .database import get_async_db, get_read_db
 from . import models
 
 SECRET_KEY = "CHANGE_ME_IN_PROD"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# verified tokens are remembered so authenticated calls skip the JWT decode and user lookup
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return hash_password(password)
 
 
 def create_access_token(data: dict) -> str:
@@ -28,42 +33,153 @@ def create_access_token(data: dict) -> str:
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-# Original function to get current user by token
-def get_current_user(token: str, db: Session) -> models.User:
-    credentials_exception = HTTPException(
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller: just what authorization checks need."""
+    id: int
+    email: str
+    role: str
+    stream_id: Optional[int] = None
+
+
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+# bumped by every eviction: a lookup that started before one may have read the
+# old row, so it answers but does not cache (see _remember)
+_evictions = 0
+_evictions_lock = threading.Lock()
+
+
+def _evicted():
+    global _evictions
+    with _evictions_lock:
+        _evictions += 1
+
+
+def invalidate_user(user_id: int):
+    _evicted()
+    principal_cache.discard_where(lambda p: p.id == user_id)
+
+
+def clear_principals():
+    _evicted()
+    principal_cache.clear()
+
+
+# another worker process updated or deleted a user
+subscribe("principals", clear_principals)
+
+
+# writes flag their session; the entries go only once the transaction commits,
+# so a concurrent lookup cannot cache the pre-commit row after the eviction
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    for user_id in session.info.pop("changed_users", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("changed_users", None)
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if not email:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if not payload.get("sub"):
+        raise _credentials_exception()
+    return payload
+
 
-    user = db.query(models.User).filter(models.User.email == email).first()
+# Original function to get current user by token
+def get_current_user(token: str, db: Session) -> models.User:
+    payload = _decode_token(token)
+    user = db.query(models.User).filter(models.User.email == payload["sub"]).first()
     if not user:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 
+def _principal_select(email: str):
+    return select(models.User.id, models.User.email, models.User.role, models.User.stream_id).where(
+        models.User.email == email
+    )
+
+
+def _remember(token: str, payload: dict, row, evictions: int) -> Principal:
+    if not row:
+        raise _credentials_exception()
+    principal = Principal(id=row.id, email=row.email, role=row.role, stream_id=row.stream_id)
+    with _evictions_lock:
+        if evictions == _evictions:
+            # never cache a token past its own expiry
+            principal_cache.set(token, principal, ttl=payload.get("exp", 0) - time.time())
+    return principal
+
+
+def get_current_principal(token: str, db: Session) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = _decode_token(token)
+    evictions = _evictions
+    return _remember(token, payload, db.execute(_principal_select(payload["sub"])).first(), evictions)
+
+
+async def get_current_principal_async(token: str, db: AsyncSession) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = _decode_token(token)
+    evictions = _evictions
+    return _remember(token, payload, (await db.execute(_principal_select(payload["sub"]))).first(), evictions)
+
+
+def bearer_token(authorization: Optional[str]) -> str:
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Invalid or missing token")
+    return authorization.split(" ", 1)[1]
+
+
 # FastAPI dependency wrapper for current user
 def get_current_user_dep(
-    authorization: str = Header(...), db: Session = Depends(get_db)
-) -> models.User:
+    authorization: str = Header(...), db: Session = Depends(get_read_db)
+) -> Principal:
     """
     Use in endpoints with Depends(get_current_user_dep)
     Automatically extracts the token from Authorization header.
+    Returns a cached Principal; load the User row only when more fields are needed.
     """
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid or missing token")
-    token = authorization.split(" ", 1)[1]
-    return get_current_user(token, db)
+    return get_current_principal(bearer_token(authorization), db)
+
+
+async def get_current_user_async_dep(
+    authorization: str = Header(...), db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """get_current_user_dep for ``async def`` handlers; shares the principal cache."""
+    return await get_current_principal_async(bearer_token(authorization), db)
 
 
 # Admin requirement helper
-def require_admin(user: models.User):
+def require_admin(user: Principal):
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
@@ -0,0 +1,106 @@
+"""Password hashing on a dedicated, bounded worker pool.
+
+bcrypt costs a few hundred milliseconds of CPU per call, so a login burst
+would otherwise occupy every request thread. Hashes run on their own pool
+(bcrypt releases the GIL, so threads scale across cores), at most
+``PASSWORD_HASH_MAX_PENDING`` calls may be queued or running, and callers
+beyond that are turned away at once with a 503 instead of piling up.
+Waiting callers hold a request thread, so the default stays below the size
+of the request threadpool.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from .metrics import hash_rejected, timed
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or os.cpu_count() or 1
+# anyio runs sync handlers on 40 threads by default; keep some free for other requests
+REQUEST_THREADS = 40
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0")) or min(
+    PASSWORD_HASH_WORKERS * 8, REQUEST_THREADS // 2
+)
+
+# hashes below the configured cost are flagged for rehash on login; stronger ones are kept
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+
+def _timed_call(fn, *args):
+    # measured on the worker thread: bcrypt time only, not the queue wait
+    with timed(f"bcrypt_{fn.__name__}"):
+        return fn(*args)
+
+
+class HashPool:
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+            return self._executor
+
+    def run(self, fn, *args):
+        """Run ``fn`` on the pool and wait for it; 503 if the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            hash_rejected.inc()
+            raise HTTPException(
+                status_code=503,
+                detail="Too many authentication requests, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._get_executor().submit(_timed_call, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def map(self, fn, items):
+        """Run ``fn`` over ``items`` for bulk jobs.
+
+        Waits for free slots instead of failing, and keeps at most one task per
+        worker in flight so interactive logins still find room in the queue.
+        """
+        futures = []
+        for i, item in enumerate(items):
+            if i >= self.workers:
+                futures[i - self.workers].result()
+            self._slots.acquire()
+            future = self._get_executor().submit(_timed_call, fn, item)
+            future.add_done_callback(lambda _: self._slots.release())
+            futures.append(future)
+        return [f.result() for f in futures]
+
+
+hash_pool = HashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+def hash_password(password: str) -> str:
+    return hash_pool.run(pwd_context.hash, password)
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return hash_pool.run(pwd_context.verify, plain, hashed)
+
+
+def verify_and_update(plain: str, hashed: str):
+    """(valid, new_hash); ``new_hash`` is set when the stored hash uses an outdated cost."""
+    return hash_pool.run(pwd_context.verify_and_update, plain, hashed)
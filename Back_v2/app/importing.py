@@ -0,0 +1,122 @@
+"""Bulk user import from CSV.
+
+The upload is read row by row and written in batches: each batch costs one
+``IN`` lookup for already-registered emails, one parallel round of bcrypt on
+the hashing pool and one multi-row INSERT. Only the current batch is held in
+memory. Emails repeated across batches are caught by the next batch's lookup,
+since earlier batches are already committed.
+
+Emails are compared and stored lowercased, so ``S1@X.com`` in a file is a
+duplicate of an existing ``s1@x.com``.
+"""
+import csv
+import io
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .hashing import hash_pool, pwd_context
+from .student_schedule import refresh_students
+
+BATCH_SIZE = 500
+
+SCHEMAS = {"student": schemas.StudentCreate, "teacher": schemas.TeacherCreate}
+COLUMNS = {
+    "student": ("full_name", "email", "password", "stream_id", "code_apoge", "cne"),
+    "teacher": ("full_name", "email", "password", "stream_id"),
+}
+
+
+def _row_error(line, email, errors):
+    return schemas.ImportRowError(row=line, email=email or None, errors=errors)
+
+
+def _validation_messages(exc: ValidationError):
+    return [f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors()]
+
+
+def _flush(db: Session, role, batch, report):
+    seen = set()
+    unique = []
+    for line, payload in batch:
+        email = payload.email.lower()
+        if email in seen:
+            report.errors.append(_row_error(line, payload.email, ["email: duplicated in file"]))
+            continue
+        seen.add(email)
+        unique.append((line, payload.model_copy(update={"email": email})))
+
+    existing = set(db.scalars(
+        select(func.lower(models.User.email)).where(func.lower(models.User.email).in_(seen))
+    ))
+    rows = []
+    for line, payload in unique:
+        if payload.email in existing:
+            report.errors.append(_row_error(line, payload.email, ["email: already in use"]))
+        else:
+            rows.append(payload)
+    if not rows:
+        return
+
+    hashes = hash_pool.map(pwd_context.hash, [p.password for p in rows])
+    db.execute(insert(models.User), [
+        {
+            "full_name": p.full_name,
+            "email": p.email,
+            "hashed_password": h,
+            "role": role,
+            "code_apoge": getattr(p, "code_apoge", None),
+            "cne": getattr(p, "cne", None),
+            "stream_id": p.stream_id,
+        }
+        for p, h in zip(rows, hashes)
+    ])
+    if role == "student":
+        refresh_students(db, db.scalars(
+            select(models.User.id).where(models.User.email.in_([p.email for p in rows]))
+        ))
+    db.commit()
+    report.created += len(rows)
+
+
+def import_users(db: Session, fileobj, role: str, on_batch=None) -> schemas.ImportReport:
+    """Import the CSV in ``fileobj``; ``on_batch(rows_read, report)`` runs after each committed batch."""
+    schema = SCHEMAS[role]
+    report = schemas.ImportReport(created=0, errors=[])
+    stream_ids = {sid for (sid,) in db.query(models.Stream.id)}
+
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    missing = [c for c in ("full_name", "email", "password") if c not in (reader.fieldnames or [])]
+    if missing:
+        report.errors.append(_row_error(1, None, [f"missing column: {c}" for c in missing]))
+        return report
+
+    batch = []
+    for row in reader:
+        line = reader.line_num
+        data = {c: (row.get(c) or "").strip() or None for c in COLUMNS[role]}
+        data["role"] = role
+        try:
+            payload = schema(**data)
+        except ValidationError as exc:
+            report.errors.append(_row_error(line, data.get("email"), _validation_messages(exc)))
+            continue
+        if payload.stream_id is not None and payload.stream_id not in stream_ids:
+            report.errors.append(_row_error(line, payload.email, ["stream_id: unknown stream"]))
+            continue
+
+        batch.append((line, payload))
+        if len(batch) >= BATCH_SIZE:
+            _flush(db, role, batch, report)
+            batch = []
+            if on_batch is not None:
+                on_batch(line - 1, report)
+    if batch:
+        _flush(db, role, batch, report)
+
+    text.detach()
+    report.errors.sort(key=lambda e: e.row)
+    return report
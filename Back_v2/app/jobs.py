@@ -0,0 +1,474 @@
+"""Persistent background jobs for heavy admin work.
+
+Convocation exports, seat allocation and CSV imports can outlast an HTTP
+timeout and would hold a request thread all along. They are queued as rows
+of ``jobs`` instead and run by a worker pool: threads of the server process
+by default, or spawned processes with ``JOB_WORKER_MODE=process``;
+``python -m app.jobs`` runs the same workers outside the server. A worker
+claims a job with one conditional UPDATE, so any number of workers, in any
+number of processes, share the table without a broker.
+
+Handlers report progress through their ``JobContext``, which raises
+``JobCancelled`` once a cancel was requested, and write their files to the
+job's own directory under ``JOBS_DIR``. Each process refreshes the heartbeat
+of the jobs it runs; a running job whose heartbeat is older than
+``JOB_STALE_SECONDS`` lost its worker and is queued again when a pool starts.
+Each process with workers also deletes the jobs finished more than
+``JOB_RETENTION_DAYS`` ago, with their files, and prunes the change log.
+
+Jobs run in another process do not update the in-memory indexes of the
+server (conflicts, PDF cache), so ``process`` mode suits deployments where
+those are invalidated across processes.
+"""
+import argparse
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, NamedTuple, Optional, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from . import changes, models, schemas
+from .convocations import (
+    archive_name, convocation_data, get_executor, render_merged, render_parallel, shutdown_executor,
+)
+from .database import SessionLocal, engine
+from .importing import import_users
+from .metrics import timed
+from .pdf_cache import pdf_cache
+from .queries import convocation_rows, get_exam
+from .seating import allocate_seats
+
+JOBS_DIR = os.getenv("JOBS_DIR", "./.jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # 0 = run jobs with `python -m app.jobs` only
+JOB_WORKER_MODE = os.getenv("JOB_WORKER_MODE", "thread")  # thread | process
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+PROGRESS_INTERVAL = 0.5  # seconds between progress writes
+INPUT_PREFIX = "input"  # uploaded files; kept across retries
+
+logger = logging.getLogger("uvicorn.error")
+
+Job = models.Job
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+def job_dir(job_id) -> str:
+    return os.path.join(JOBS_DIR, str(job_id))
+
+
+def _clear_outputs(job_id):
+    directory = job_dir(job_id)
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if not name.startswith(INPUT_PREFIX):
+                os.remove(os.path.join(directory, name))
+
+
+class JobContext:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last = 0.0
+
+    def path(self, name) -> str:
+        directory = job_dir(self.job_id)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    def progress(self, done, total=None):
+        """Record progress (at most every PROGRESS_INTERVAL); raise JobCancelled if asked to stop.
+
+        Writes on its own connection: call it between the handler's transactions.
+        """
+        now = time.monotonic()
+        if now - self._last < PROGRESS_INTERVAL and done != total:
+            return
+        self._last = now
+        values = {"progress": done, "heartbeat_at": _now()}
+        if total is not None:
+            values["total"] = total
+        with engine.begin() as conn:
+            conn.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            cancelled = conn.scalar(select(Job.cancel_requested).where(Job.id == self.job_id))
+        if cancelled:
+            raise JobCancelled()
+
+
+# -------------------------
+# Job kinds
+# -------------------------
+class JobKind(NamedTuple):
+    params: Type[BaseModel]
+    run: Callable  # (ctx, db, params) -> (result dict, artifact file name or None)
+    upload: bool = False  # takes an uploaded file, see /jobs/import-users
+
+
+KINDS: Dict[str, JobKind] = {}
+
+
+def job_kind(name, params, upload=False):
+    def register(fn):
+        KINDS[name] = JobKind(params, fn, upload)
+        return fn
+    return register
+
+
+@job_kind("convocations", schemas.ConvocationExportParams)
+def export_convocations(ctx: JobContext, db: Session, params):
+    rows = convocation_rows(db)
+    if params.exam_id is not None:
+        rows = rows.filter(models.Convocation.exam_id == params.exam_id)
+        name = f"convocations_exam_{params.exam_id}"
+    else:
+        rows = rows.filter(models.Exam.stream_id == params.stream_id)
+        name = f"convocations_stream_{params.stream_id}"
+    items = [convocation_data(student, exam, conv) for conv, student, exam in rows]
+    db.rollback()
+    if not items:
+        raise ValueError("No convocations to export")
+
+    if params.format == "pdf":
+        ctx.progress(0, len(items))
+        get_executor().submit(render_merged, items, ctx.path(name + ".pdf")).result()
+        ctx.progress(len(items), len(items))
+        return {"convocations": len(items)}, name + ".pdf"
+
+    with zipfile.ZipFile(ctx.path(name + ".zip"), mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for done, (data, pdf) in enumerate(render_parallel(items), 1):
+            zf.writestr(archive_name(data), pdf)
+            ctx.progress(done, len(items))
+    return {"convocations": len(items)}, name + ".zip"
+
+
+@job_kind("seats", schemas.SeatAllocationParams)
+def allocate_exams_seats(ctx: JobContext, db: Session, params):
+    """Seat each exam in turn; exams seated before a failure or cancel keep their seats."""
+    seated = {}
+    for done, exam_id in enumerate(params.exam_ids, 1):
+        exam = get_exam(db, exam_id)
+        if exam is None:
+            raise ValueError(f"Exam {exam_id} not found")
+        rooms = allocate_seats(db, exam)
+        pdf_cache.invalidate_exam(exam_id)
+        seated[str(exam_id)] = sum(r.assigned for r in rooms)
+        ctx.progress(done, len(params.exam_ids))
+    return {"seated": seated}, None
+
+
+@job_kind("user_import", schemas.UserImportParams, upload=True)
+def import_users_csv(ctx: JobContext, db: Session, params):
+    """Batches imported before a cancel stay imported."""
+    path = ctx.path(INPUT_PREFIX + ".csv")
+    with open(path, "rb") as f:
+        total = max(sum(1 for _ in f) - 1, 0)
+    with open(path, "rb") as f:
+        report = import_users(db, f, params.role, on_batch=lambda rows, _: ctx.progress(rows, total))
+    with open(ctx.path("report.json"), "w", encoding="utf-8") as out:
+        out.write(report.model_dump_json())
+    ctx.progress(total, total)
+    return {"created": report.created, "errors": len(report.errors)}, "report.json"
+
+
+# -------------------------
+# Queue
+# -------------------------
+def parse_params(kind: str, params: dict) -> BaseModel:
+    if kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind: {kind}")
+    try:
+        return KINDS[kind].params.model_validate(params)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=json.loads(exc.json(include_url=False)))
+
+
+def enqueue(db: Session, kind: str, params: BaseModel, created_by=None) -> Job:
+    """Add a job to the session and flush it; the caller commits, then calls ``pool.wake``."""
+    job = Job(
+        kind=kind, params=params.model_dump_json(), status="queued", progress=0, attempts=0,
+        cancel_requested=False, created_by=created_by, created_at=_now(),
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def job_out(job: Job) -> schemas.JobOut:
+    return schemas.JobOut(
+        id=job.id, kind=job.kind, status=job.status, params=json.loads(job.params),
+        progress=job.progress, total=job.total, message=job.message,
+        result=json.loads(job.result) if job.result else None, artifact=job.artifact,
+        attempts=job.attempts, cancel_requested=job.cancel_requested,
+        created_at=job.created_at, started_at=job.started_at, finished_at=job.finished_at,
+    )
+
+
+def cancel(db: Session, job_id) -> bool:
+    """Cancel a queued job at once, or ask a running one to stop. False if it already ended."""
+    if db.execute(
+        update(Job).where(Job.id == job_id, Job.status == "queued").values(status="cancelled", finished_at=_now())
+    ).rowcount:
+        return True
+    return bool(db.execute(
+        update(Job).where(Job.id == job_id, Job.status == "running").values(cancel_requested=True)
+    ).rowcount)
+
+
+def retry(db: Session, job_id) -> bool:
+    """Queue a failed or cancelled job again. False for any other state."""
+    requeued = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status.in_(("failed", "cancelled")))
+        .values(
+            status="queued", progress=0, total=None, message=None, result=None, artifact=None,
+            cancel_requested=False, worker=None, started_at=None, heartbeat_at=None, finished_at=None,
+        )
+    ).rowcount
+    if requeued:
+        _clear_outputs(job_id)
+    return bool(requeued)
+
+
+def claim(worker: str) -> Optional[int]:
+    """Mark the oldest queued job as ours and return its id."""
+    now = _now()
+    oldest = select(Job.id).where(Job.status == "queued").order_by(Job.id).limit(1).scalar_subquery()
+    with engine.begin() as conn:
+        return conn.scalar(
+            update(Job)
+            .where(Job.id == oldest, Job.status == "queued")
+            .values(status="running", worker=worker, started_at=now, heartbeat_at=now, attempts=Job.attempts + 1)
+            .returning(Job.id)
+        )
+
+
+def _finish(job_id, status, result=None, artifact=None, message=None):
+    with engine.begin() as conn:
+        conn.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "running")
+            .values(
+                status=status, finished_at=_now(), message=message, artifact=artifact,
+                result=json.dumps(result) if result is not None else None,
+            )
+        )
+
+
+def run_job(job_id):
+    with engine.connect() as conn:
+        kind_name, raw = conn.execute(select(Job.kind, Job.params).where(Job.id == job_id)).one()
+    ctx = JobContext(job_id)
+    with SessionLocal() as db:
+        try:
+            kind = KINDS.get(kind_name)
+            if kind is None:
+                raise ValueError(f"Unknown job kind: {kind_name}")
+            with timed(f"job_{kind_name}"):
+                result, artifact = kind.run(ctx, db, kind.params.model_validate_json(raw))
+        except JobCancelled:
+            db.rollback()
+            _clear_outputs(job_id)
+            _finish(job_id, "cancelled")
+        except Exception as exc:
+            db.rollback()
+            if isinstance(exc, (HTTPException, ValueError)):
+                # refused by the handler (missing exam, no free seats...): no traceback needed
+                logger.warning("Job %s (%s) failed: %s", job_id, kind_name, exc)
+            else:
+                logger.exception("Job %s (%s) failed", job_id, kind_name)
+            _clear_outputs(job_id)
+            message = exc.detail if isinstance(exc, HTTPException) else str(exc) or type(exc).__name__
+            _finish(job_id, "failed", message=str(message))
+        else:
+            _finish(job_id, "succeeded", result=result, artifact=artifact)
+
+
+def requeue_stale():
+    """Queue again the running jobs whose worker stopped sending heartbeats."""
+    cutoff = _now() - datetime.timedelta(seconds=JOB_STALE_SECONDS)
+    with engine.begin() as conn:
+        return conn.execute(
+            update(Job)
+            .where(Job.status == "running", Job.heartbeat_at < cutoff)
+            .values(status="queued", worker=None, cancel_requested=False)
+        ).rowcount
+
+
+def purge_finished():
+    """Delete the jobs that ended more than JOB_RETENTION_DAYS ago and their files. Returns their ids."""
+    cutoff = _now() - datetime.timedelta(days=JOB_RETENTION_DAYS)
+    with engine.begin() as conn:
+        ids = conn.scalars(
+            delete(Job)
+            .where(Job.status.in_(("succeeded", "failed", "cancelled")), Job.finished_at < cutoff)
+            .returning(Job.id)
+        ).all()
+    for job_id in ids:
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+    return ids
+
+
+# -------------------------
+# Workers
+# -------------------------
+def _work(worker: str, stop: threading.Event, wake: threading.Event):
+    while not stop.is_set():
+        try:
+            job_id = claim(worker)
+        except Exception:
+            logger.exception("Job worker %s could not claim a job", worker)
+            job_id = None
+        if job_id is None:
+            wake.wait(JOB_POLL_INTERVAL)
+            wake.clear()
+            continue
+        run_job(job_id)
+
+
+def _heartbeat(prefix: str, stop: threading.Event):
+    while not stop.wait(JOB_STALE_SECONDS / 4):
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(Job)
+                    .where(Job.status == "running", Job.worker.like(prefix + ":%"))
+                    .values(heartbeat_at=_now())
+                )
+        except Exception:
+            logger.exception("Job heartbeat failed")
+
+
+def _housekeeping(stop: threading.Event):
+    while True:
+        try:
+            purged = purge_finished()
+            if purged:
+                logger.info("Deleted %d finished job(s)", len(purged))
+            with SessionLocal() as db:
+                pruned = changes.prune(db)
+            if pruned:
+                logger.info("Pruned %d change(s) from the change log", pruned)
+        except Exception:
+            logger.exception("Housekeeping failed")
+        if stop.wait(changes.PRUNE_INTERVAL):
+            return
+
+
+def _start_threads(count, stop, wake):
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=_heartbeat, args=(prefix, stop), name="job-heartbeat", daemon=True),
+        threading.Thread(target=_housekeeping, args=(stop,), name="job-housekeeping", daemon=True),
+    ]
+    threads += [
+        threading.Thread(target=_work, args=(f"{prefix}:{i}", stop, wake), name=f"job-worker-{i}", daemon=True)
+        for i in range(count)
+    ]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def _process_main(count, parent_pid, stop_signal):
+    stop = threading.Event()
+    threads = _start_threads(count, stop, threading.Event())
+    # not a daemon process (jobs start their own render pool), so also leave if the server dies
+    while os.getppid() == parent_pid and not stop_signal.wait(1.0):
+        pass
+    stop.set()
+    for t in threads:
+        t.join()
+    # multiprocessing joins child processes at exit before the executors tell theirs to quit
+    shutdown_executor()
+
+
+class JobPool:
+    def __init__(self, workers=JOB_WORKERS, mode=JOB_WORKER_MODE):
+        self.workers = workers
+        self.mode = mode
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+        self._processes = []
+        self._process_stop = None
+
+    def start(self):
+        if self.workers <= 0 or self._threads or self._processes:
+            return
+        requeued = requeue_stale()
+        if requeued:
+            logger.warning("Requeued %d job(s) left running by a stopped worker", requeued)
+        self._stop = threading.Event()
+        if self.mode == "process":
+            # spawn: forking a threaded server process is not safe
+            context = multiprocessing.get_context("spawn")
+            self._process_stop = context.Event()
+            self._processes = [
+                context.Process(
+                    target=_process_main, args=(1, os.getpid(), self._process_stop), name=f"job-worker-{i}"
+                )
+                for i in range(self.workers)
+            ]
+            for p in self._processes:
+                p.start()
+        else:
+            self._threads = _start_threads(self.workers, self._stop, self._wake)
+
+    def wake(self):
+        """Let an idle worker thread pick up a new job now instead of at its next poll."""
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        """Stop taking jobs; running ones finish, or are requeued once their heartbeat goes stale."""
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        if self._processes:
+            self._process_stop.set()
+        for p in self._processes:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._threads, self._processes = [], []
+
+
+pool = JobPool()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.jobs", description="Run job workers in the foreground.")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS or 1)
+    args = parser.parse_args(argv)
+
+    runner = JobPool(workers=args.workers, mode="thread")
+    runner.start()
+    print(f"{args.workers} job worker(s) running, Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        runner.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,18 @@
-from fastapi import FastAPI
+import logging
+import time
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from . import models
-from .database import engine, get_db
+from . import cluster, jobs, metrics, models
+from .database import ASYNC_ENGINE_HOOKS, SessionLocal, dispose_async_engine, engine, read_engine
 from .routers import auth, streams, exams, users, rooms
-from .routers import subjects
+from .routers import subjects, changes, analytics
+from .routers import jobs as jobs_router
 
-from .seeds import seed_streams_subjects, seed_rooms, seed_default_admin
+from .migrations import migrate
+from .seeds import seed
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger("uvicorn.error")
 
 app = FastAPI(title="Exams Management API")
 
@@ -21,6 +25,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# outermost, so the timings include CORS and every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+metrics.instrument_engine(engine, "write")
+if read_engine is not engine:
+    metrics.instrument_engine(read_engine, "read")
+ASYNC_ENGINE_HOOKS.append(lambda eng: metrics.instrument_engine(eng.sync_engine, "async_read"))
 
 # Routers
 app.include_router(auth.router)
@@ -29,16 +40,48 @@ app.include_router(exams.router)
 app.include_router(users.router)
 app.include_router(rooms.router)
 app.include_router(subjects.router)
+app.include_router(changes.router)
+app.include_router(analytics.router)
+app.include_router(jobs_router.router)
 
 
-# Seed data on startup
+# Schema and seed data on startup
 @app.on_event("startup")
 def startup_event():
-    db = next(get_db())
-    seed_streams_subjects(db)
-    seed_rooms(db)
-    seed_default_admin(db)
+    # with several workers (uvicorn --workers N) they take turns: the first
+    # one does the work, the others find the schema and seeds up to date
+    t_wait = time.perf_counter()
+    with cluster.startup_lock():
+        t0 = time.perf_counter()
+        # create missing tables, then bring existing ones up to date
+        models.Base.metadata.create_all(bind=engine)
+        applied = migrate(engine)
+        t1 = time.perf_counter()
+
+        with SessionLocal() as db:
+            seeded = seed(db)
+        t2 = time.perf_counter()
+
+    logger.info(
+        "Startup: lock %.1f ms, schema %.1f ms (%d migrations applied), seeds %.1f ms (%s)",
+        (t0 - t_wait) * 1000, (t1 - t0) * 1000, len(applied), (t2 - t1) * 1000,
+        "applied" if seeded else "up to date",
+    )
+    cluster.invalidator.start()
+    jobs.pool.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    jobs.pool.stop()
+    cluster.invalidator.stop()
+    await dispose_async_engine()
 
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,208 @@
+"""In-process metrics, exposed in the Prometheus text format on ``/metrics``.
+
+Recording is a dict lookup, a bisect and a few additions under one lock, so
+it stays cheap enough to leave on for every request:
+
+* ``MetricsMiddleware`` times each request and counts responses per route
+  template (``/exams/{exam_id}``, never the raw path, to bound cardinality);
+* engine hooks time every SQL statement and, through a context variable,
+  add it to the totals of the request that issued it;
+* ``timed`` wraps the CPU-heavy work: PDF rendering and bcrypt.
+
+This module imports neither FastAPI nor ``database`` (engines are handed to
+``instrument_engine`` by ``main``), so code that also runs in spawned worker
+processes, like PDF rendering, can use it without slowing their start.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        names = self.labels + ("le",)
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += n
+                yield f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+
+http_requests = Counter(
+    "http_requests_total", "Responses sent, by route template and status.", ("method", "route", "status")
+)
+http_duration = Histogram(
+    "http_request_duration_seconds", "Time from request to the end of the response body.", ("method", "route")
+)
+db_query_duration = Histogram("db_query_duration_seconds", "Duration of single SQL statements.", ("engine",))
+db_request_queries = Histogram(
+    "db_queries_per_request", "SQL statements issued while serving one request.", ("route",), QUERY_COUNT_BUCKETS
+)
+db_request_duration = Histogram(
+    "db_time_per_request_seconds", "Total SQL time spent serving one request.", ("route",)
+)
+work_duration = Histogram(
+    "work_duration_seconds", "CPU-bound work outside the database: PDF rendering and password hashing.",
+    ("kind",),
+)
+hash_rejected = Counter("password_hash_rejected_total", "Requests refused with 503 because the hash pool was full.")
+
+REGISTRY = (
+    http_requests, http_duration, db_query_duration, db_request_queries, db_request_duration,
+    work_duration, hash_rejected,
+)
+
+
+@contextmanager
+def timed(kind):
+    """Time the enclosed block into ``work_duration_seconds{kind=...}``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        work_duration.observe(time.perf_counter() - start, kind)
+
+
+# -------------------------
+# Per-request SQL totals
+# -------------------------
+class _RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# sync handlers run in a copy of the request's context, which still holds this same object
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def instrument_engine(engine, label):
+    """Time every statement run on ``engine`` (a sync Engine, or ``AsyncEngine.sync_engine``)."""
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        db_query_duration.observe(elapsed, label)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+    def handle_error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+# -------------------------
+# ASGI middleware
+# -------------------------
+class MetricsMiddleware:
+    """Pure ASGI (not BaseHTTPMiddleware): no extra task per request and streaming is untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, path, status)
+            http_duration.observe(elapsed, method, path)
+            db_request_queries.observe(stats.queries, path)
+            db_request_duration.observe(stats.db_time, path)
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,230 @@
+"""Versioned schema migrations.
+
+``create_all`` only creates missing tables, so columns and indexes added to
+``models`` never reach an existing database. Each migration here runs once,
+in order, and is recorded in ``schema_migrations``. Migrations check the live
+schema before changing it: on a database that ``create_all`` just built they
+find nothing to do and are simply recorded.
+
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations status     # list applied / pending
+    python -m app.migrations check      # assert the listing queries use an index
+"""
+import argparse
+import datetime
+import sys
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import engine as default_engine, is_sqlite
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _columns(conn: Connection, table: str):
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _indexes(conn: Connection, table: str):
+    insp = inspect(conn)
+    names = {i["name"] for i in insp.get_indexes(table)}
+    names |= {u["name"] for u in insp.get_unique_constraints(table)}
+    return names
+
+
+def _add_exam_duration_and_seat_rooms(conn: Connection):
+    if "duration" not in _columns(conn, "exams"):
+        conn.execute(text("ALTER TABLE exams ADD COLUMN duration INTEGER NOT NULL DEFAULT 120"))
+    if "room_id" not in _columns(conn, "convocations"):
+        conn.execute(text("ALTER TABLE convocations ADD COLUMN room_id INTEGER REFERENCES rooms (id)"))
+    # SQLite cannot add a table constraint in place; a unique index enforces the same thing
+    if "_exam_room_table_uc" not in _indexes(conn, "convocations"):
+        conn.execute(text(
+            "CREATE UNIQUE INDEX _exam_room_table_uc ON convocations (exam_id, room_id, table_number)"
+        ))
+
+
+def _add_listing_indexes(conn: Connection):
+    for table in (models.Exam.__table__, models.Subject.__table__):
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _backfill_student_schedule(conn: Connection):
+    from .student_schedule import rebuild
+
+    models.StudentSchedule.__table__.create(conn, checkfirst=True)
+    rebuild(Session(bind=conn))
+
+
+def _backfill_analytics(conn: Connection):
+    from .analytics import rebuild
+
+    for model in (models.RoomUsageRollup, models.StreamDayRollup, models.TeacherDayRollup, models.RollupExamDate):
+        model.__table__.create(conn, checkfirst=True)
+    rebuild(Session(bind=conn))
+
+
+def _add_user_search_index(conn: Connection):
+    # FTS5 is SQLite only; app.search falls back to LIKE elsewhere
+    if not is_sqlite(str(conn.engine.url)):
+        return
+    cols = "full_name, email, cne, code_apoge"
+    new = "new.id, new.full_name, new.email, new.cne, new.code_apoge"
+    old = "old.id, old.full_name, old.email, old.cne, old.code_apoge"
+    for ddl in (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+        f"{cols}, content='users', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+        f"INSERT INTO users_fts (rowid, {cols}) VALUES ({new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+        f"INSERT INTO users_fts (users_fts, rowid, {cols}) VALUES ('delete', {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF {cols} ON users BEGIN "
+        f"INSERT INTO users_fts (users_fts, rowid, {cols}) VALUES ('delete', {old}); "
+        f"INSERT INTO users_fts (rowid, {cols}) VALUES ({new}); END",
+        # index the users that existed before the table
+        "INSERT INTO users_fts (users_fts) VALUES ('rebuild')",
+    ):
+        conn.exec_driver_sql(ddl)
+
+
+def _add_email_lower_index(conn: Connection):
+    # checkfirst cannot see expression indexes: SQLAlchemy does not reflect them
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))"))
+
+
+def _add_user_search_lookup_indexes(conn: Connection):
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS ix_users_full_name_lower ON users (lower(full_name))",
+        "CREATE INDEX IF NOT EXISTS ix_users_cne ON users (cne)",
+        "CREATE INDEX IF NOT EXISTS ix_users_code_apoge ON users (code_apoge)",
+    ):
+        conn.execute(text(ddl))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "exam duration and per-seat rooms", _add_exam_duration_and_seat_rooms),
+    Migration(2, "composite indexes for listings", _add_listing_indexes),
+    Migration(3, "materialized student timetables", _backfill_student_schedule),
+    Migration(4, "analytics rollups", _backfill_analytics),
+    Migration(5, "user search index", _add_user_search_index),
+    Migration(6, "case-insensitive email index", _add_email_lower_index),
+    Migration(7, "user search lookup indexes", _add_user_search_lookup_indexes),
+]
+
+
+def applied_versions(conn: Connection):
+    schema_migrations.create(conn, checkfirst=True)
+    return {v for (v,) in conn.execute(select(schema_migrations.c.version))}
+
+
+def migrate(engine: Engine = None) -> List[Migration]:
+    """Apply pending migrations, each in its own transaction. Returns those applied."""
+    engine = engine or default_engine
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=migration.version, name=migration.name, applied_at=datetime.datetime.utcnow()
+            ))
+        applied.append(migration)
+    return applied
+
+
+# -------------------------
+# Index usage check
+# -------------------------
+def _listing_queries():
+    """(label, statement, table that must be searched by index) for each hot lookup."""
+    from .queries import exams_for_stream, exams_for_teacher
+
+    day = datetime.date(2026, 1, 1)
+    slot = datetime.time(9, 0)
+    Exam, Subject, Convocation, Timetable = models.Exam, models.Subject, models.Convocation, models.StudentSchedule
+    return [
+        ("exams by stream", exams_for_stream(1), "exams"),
+        ("exams by teacher", exams_for_teacher(1), "exams"),
+        ("exams by stream and day", exams_for_stream(1).where(Exam.date == day).order_by(Exam.date, Exam.time), "exams"),
+        ("exams by room and slot", select(Exam.id).where(Exam.room_id == 1, Exam.date == day, Exam.time == slot), "exams"),
+        ("subjects by stream", select(Subject).where(Subject.stream_id == 1), "subjects"),
+        ("convocations by exam", select(Convocation).where(Convocation.exam_id == 1), "convocations"),
+        (
+            "student timetable",
+            select(Timetable.payload).where(Timetable.student_id == 1).order_by(Timetable.date, Timetable.time),
+            "student_schedule",
+        ),
+    ]
+
+
+def check_indexes(engine: Engine = None):
+    """EXPLAIN every listing query; return ``(label, plan)`` for those that scan their table.
+
+    SQLite only: other planners legitimately prefer sequential scans on small
+    tables, so their plans say little about the schema.
+    """
+    engine = engine or default_engine
+    if not is_sqlite(str(engine.url)):
+        raise RuntimeError("The index check needs SQLite's EXPLAIN QUERY PLAN")
+
+    failures = []
+    with engine.connect() as conn:
+        for label, stmt, table in _listing_queries():
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+            if any(step.startswith(f"SCAN {table}") for step in plan):
+                failures.append((label, plan))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=("upgrade", "status", "check"))
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        models.Base.metadata.create_all(bind=default_engine)
+        applied = migrate()
+        for m in applied:
+            print(f"applied {m.version}: {m.name}")
+        if not applied:
+            print("up to date")
+    elif args.command == "status":
+        with default_engine.begin() as conn:
+            done = applied_versions(conn)
+        for m in MIGRATIONS:
+            print(f"{'applied' if m.version in done else 'pending':8} {m.version}: {m.name}")
+    else:
+        failures = check_indexes()
+        for label, plan in failures:
+            print(f"{label}: no index used", *plan, sep="\n    ")
+        if failures:
+            return 1
+        print("all listing queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Time, UniqueConstraint
+from sqlalchemy import Boolean, Column, Integer, String, Text, ForeignKey, Date, DateTime, Time, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -30,6 +30,15 @@ class User(Base):
     )
     convocations = relationship("Convocation", back_populates="student")  # student’s convocations
 
+    # imports look up existing accounts case-insensitively; search answers
+    # prefixes and identifiers from these before it ranks full-text matches
+    __table_args__ = (
+        Index("ix_users_email_lower", func.lower(email)),
+        Index("ix_users_full_name_lower", func.lower(full_name)),
+        Index("ix_users_cne", "cne"),
+        Index("ix_users_code_apoge", "code_apoge"),
+    )
+
 class Subject(Base):
     __tablename__ = "subjects"
     id = Column(Integer, primary_key=True, index=True)
@@ -39,6 +48,8 @@ class Subject(Base):
     stream = relationship("Stream", back_populates="subjects")
     exams = relationship("Exam", back_populates="subject", cascade="all, delete")
 
+    __table_args__ = (Index("ix_subjects_stream_id", "stream_id"),)
+
 class Room(Base):
     __tablename__ = "rooms"
     id = Column(Integer, primary_key=True, index=True)
@@ -56,6 +67,7 @@ class Exam(Base):
     stream_id = Column(Integer, ForeignKey("streams.id"), nullable=False)
     date = Column(Date, nullable=False)
     time = Column(Time, nullable=False)
+    duration = Column(Integer, nullable=False, default=120, server_default="120")  # minutes
 
     subject = relationship("Subject", back_populates="exams")
     teacher = relationship("User", back_populates="exams_as_teacher", foreign_keys=[teacher_id])
@@ -63,14 +75,120 @@ class Exam(Base):
     stream = relationship("Stream", back_populates="exams")
     convocations = relationship("Convocation", back_populates="exam", cascade="all, delete")
 
+    # listings filter on one resource and sort by slot
+    __table_args__ = (
+        Index("ix_exams_stream_date_time", "stream_id", "date", "time"),
+        Index("ix_exams_teacher_date_time", "teacher_id", "date", "time"),
+        Index("ix_exams_room_date_time", "room_id", "date", "time"),
+    )
+
 class Convocation(Base):
     __tablename__ = "convocations"
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     exam_id = Column(Integer, ForeignKey("exams.id"), nullable=False)
+    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=True)  # None = the exam's room
     table_number = Column(Integer, nullable=False)
 
     student = relationship("User", back_populates="convocations")
     exam = relationship("Exam", back_populates="convocations")
+    room = relationship("Room")
+
+    __table_args__ = (
+        UniqueConstraint('student_id', 'exam_id', name='_student_exam_uc'),
+        UniqueConstraint('exam_id', 'room_id', 'table_number', name='_exam_room_table_uc'),
+    )
+
+class StudentSchedule(Base):
+    """Read model of /exams/student: one preserialized row per (student, exam of their stream).
+
+    Maintained by ``app.student_schedule``; the primary key doubles as the
+    index a student's timetable is read from, in order.
+    """
+    __tablename__ = "student_schedule"
+    student_id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    time = Column(Time, primary_key=True)
+    exam_id = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False)  # StudentExamOut as JSON
+
+    __table_args__ = (Index("ix_student_schedule_exam_id", "exam_id"),)
+
+class Change(Base):
+    """Append-only change log read by GET /changes; written by ``app.changes``."""
+    __tablename__ = "changes"
+    # AUTOINCREMENT: sequence numbers are never reused, even after the newest rows are deleted
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)  # exam | room | subject | seating
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # create | update | delete
+    at = Column(DateTime, nullable=False)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+# -------------------------
+# Analytics rollups, maintained by app.analytics
+# -------------------------
+class RoomUsageRollup(Base):
+    __tablename__ = "room_usage_rollup"
+    room_id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    time = Column(Time, primary_key=True)
+    exams = Column(Integer, nullable=False)
+    seated = Column(Integer, nullable=False)
+
+class StreamDayRollup(Base):
+    __tablename__ = "stream_day_rollup"
+    stream_id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    exams = Column(Integer, nullable=False)
+    students = Column(Integer, nullable=False)  # distinct students seated that day
+
+class TeacherDayRollup(Base):
+    __tablename__ = "teacher_day_rollup"
+    teacher_id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    exams = Column(Integer, nullable=False)
+    minutes = Column(Integer, nullable=False)
+
+class RollupExamDate(Base):
+    """The date each exam had at the last refresh, so moves and deletes dirty the old day too."""
+    __tablename__ = "rollup_exam_dates"
+    exam_id = Column(Integer, primary_key=True)
+    date = Column(Date, nullable=False)
+
+class Job(Base):
+    """A unit of background work, claimed and run by app.jobs workers."""
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    params = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String, nullable=False, default="queued")  # queued | running | succeeded | failed | cancelled
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)  # None while unknown
+    message = Column(Text, nullable=True)  # error text of a failed job
+    result = Column(Text, nullable=True)  # JSON
+    artifact = Column(String, nullable=True)  # file name under the job's directory
+    attempts = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    worker = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_jobs_status_id", "status", "id"),)
+
+class AppMeta(Base):
+    """Small key/value store for deployment state (e.g. the applied seed version)."""
+    __tablename__ = "app_meta"
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+
 
-    __table_args__ = (UniqueConstraint('student_id', 'exam_id', name='_student_exam_uc'),)
+class CacheGeneration(Base):
+    """Per-cache write counter; worker processes poll it to drop what a sibling made stale."""
+    __tablename__ = "cache_generations"
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False)
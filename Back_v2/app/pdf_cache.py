@@ -0,0 +1,122 @@
+"""Disk-backed cache of rendered convocation PDFs.
+
+Entries are content-addressed: the key is a hash of everything printed on
+the convocation plus the template version. Changing an exam or a seat
+changes the key, so stale PDFs are never served. Files are grouped per exam
+so the exam write paths can also drop them eagerly instead of waiting for
+the LRU to evict them. The key doubles as the HTTP ETag.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from .metrics import timed
+
+# bump whenever the layout in convocations.draw_convocation changes
+TEMPLATE_VERSION = "1"
+
+CACHE_DIR = os.getenv("CONVOCATION_CACHE_DIR", "./.cache/convocations")
+CACHE_MAX_BYTES = int(os.getenv("CONVOCATION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def cache_key(data: dict) -> str:
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{TEMPLATE_VERSION}:{payload}".encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = None  # key -> (exam_id, size), least recently used first
+        self._size = 0
+
+    def _exam_dir(self, exam_id):
+        return os.path.join(self.directory, f"exam_{exam_id}")
+
+    def _path(self, exam_id, key):
+        return os.path.join(self._exam_dir(exam_id), key + ".pdf")
+
+    def _load(self):
+        # rebuild the LRU order from file access times after a restart
+        if self._entries is not None:
+            return
+        found = []
+        if os.path.isdir(self.directory):
+            for sub in os.listdir(self.directory):
+                if not sub.startswith("exam_"):
+                    continue
+                exam_id = int(sub[5:])
+                for name in os.listdir(self._exam_dir(exam_id)):
+                    if name.endswith(".pdf"):
+                        st = os.stat(os.path.join(self._exam_dir(exam_id), name))
+                        found.append((st.st_atime, name[:-4], exam_id, st.st_size))
+        found.sort()
+        self._entries = OrderedDict((key, (exam_id, size)) for _, key, exam_id, size in found)
+        self._size = sum(size for *_, size in found)
+
+    def _drop(self, key):
+        exam_id, size = self._entries.pop(key, (None, 0))
+        self._size -= size
+        return exam_id
+
+    def get(self, key):
+        with self._lock:
+            self._load()
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            exam_id = self._entries[key][0]
+        try:
+            with open(self._path(exam_id, key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._drop(key)
+            return None
+
+    def put(self, exam_id, key, pdf: bytes):
+        path = self._path(exam_id, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._load()
+            self._drop(key)
+            self._entries[key] = (exam_id, len(pdf))
+            self._size += len(pdf)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old = next(iter(self._entries))
+                old_exam = self._drop(old)
+                try:
+                    os.remove(self._path(old_exam, old))
+                except FileNotFoundError:
+                    pass
+
+    def invalidate_exam(self, exam_id):
+        """Drop every cached convocation of an exam (exam edited, moved or reseated)."""
+        with self._lock:
+            self._load()
+            for key in [k for k, (e, _) in self._entries.items() if e == exam_id]:
+                self._drop(key)
+            shutil.rmtree(self._exam_dir(exam_id), ignore_errors=True)
+
+    def get_or_render(self, data: dict, render):
+        """Return (etag, pdf_bytes), rendering and storing on a miss."""
+        key = cache_key(data)
+        pdf = self.get(key)
+        if pdf is None:
+            with timed("pdf_render"):
+                pdf = render(data)
+            self.put(data["exam_id"], key, pdf)
+        return key, pdf
+
+
+pdf_cache = PdfCache()
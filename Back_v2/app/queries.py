@@ -0,0 +1,133 @@
+"""Shared query builders for exam listings, and a query counter.
+
+``ExamOut`` reads ``subject``, ``stream`` and ``room`` from every exam; left
+lazy, that is three extra SELECTs per row. The builders here join those
+many-to-one relationships in the listing query itself, so a listing costs
+the same number of queries whatever its size.
+
+Large listings skip the ORM altogether: ``exam_rows`` selects just the
+columns ``ExamOut`` prints and ``exam_row_dict`` shapes each row straight
+into its JSON structure, with no entity hydration and no validation of data
+that came from our own tables.
+"""
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+from .database import async_read_engine, engine, read_engine
+
+EXAM_RELATIONS = (
+    joinedload(models.Exam.subject),
+    joinedload(models.Exam.stream),
+    joinedload(models.Exam.room),
+)
+
+
+def exam_query(db: Session):
+    return db.query(models.Exam).options(*EXAM_RELATIONS)
+
+
+def exam_select():
+    """``exam_query`` as a 2.0 statement, for AsyncSession."""
+    return select(models.Exam).options(*EXAM_RELATIONS)
+
+
+def exams_for_stream(stream_id):
+    return exam_select().where(models.Exam.stream_id == stream_id)
+
+
+def exams_for_teacher(teacher_id):
+    return exam_select().where(models.Exam.teacher_id == teacher_id)
+
+
+def get_exam(db: Session, exam_id):
+    return exam_query(db).filter(models.Exam.id == exam_id).first()
+
+
+def convocation_rows(db: Session):
+    """(Convocation, student, Exam) in print order, with everything a convocation shows loaded."""
+    return (
+        db.query(models.Convocation, models.User, models.Exam)
+        .join(models.User, models.Convocation.student_id == models.User.id)
+        .join(models.Exam, models.Convocation.exam_id == models.Exam.id)
+        .options(joinedload(models.Convocation.room), *EXAM_RELATIONS)
+        .order_by(
+            models.Exam.date, models.Exam.time, models.Exam.id,
+            models.Convocation.room_id, models.Convocation.table_number,
+        )
+    )
+
+
+# -------------------------
+# Column projections
+# -------------------------
+def exam_rows():
+    Exam, Subject, Stream, Room = models.Exam, models.Subject, models.Stream, models.Room
+    return (
+        select(
+            Exam.id, Exam.date, Exam.time, Exam.duration, Exam.teacher_id,
+            Subject.id.label("subject_id"), Subject.name.label("subject_name"),
+            Subject.stream_id.label("subject_stream_id"),
+            Stream.id.label("stream_id"), Stream.nom.label("stream_nom"),
+            Room.id.label("room_id"), Room.name.label("room_name"), Room.capacity.label("room_capacity"),
+        )
+        .join(Subject, Subject.id == Exam.subject_id)
+        .join(Stream, Stream.id == Exam.stream_id)
+        .join(Room, Room.id == Exam.room_id)
+    )
+
+
+def exam_row_dict(r) -> dict:
+    """An ``exam_rows`` row as ``ExamOut`` would serialize it (same keys, same order)."""
+    return {
+        "id": r.id,
+        "subject": {"name": r.subject_name, "stream_id": r.subject_stream_id, "id": r.subject_id},
+        "stream": {"nom": r.stream_nom, "id": r.stream_id},
+        "room": {"name": r.room_name, "capacity": r.room_capacity, "id": r.room_id},
+        "date": r.date,
+        "time": r.time,
+        "duration": r.duration,
+        "teacher_id": r.teacher_id,
+    }
+
+
+# in UserOut's field order, so ``row._asdict()`` is already the response object
+USER_COLUMNS = (
+    models.User.full_name, models.User.email, models.User.role, models.User.stream_id,
+    models.User.id, models.User.code_apoge, models.User.cne,
+)
+
+
+class QueryCounter:
+    """Count the SQL statements executed on ``binds`` inside a ``with`` block.
+
+    With ``limit`` set, leaving the block raises AssertionError when more
+    statements ran, which lets a test pin a listing to a fixed query budget
+    and catch any N+1 regression regardless of how many rows it returned.
+    """
+
+    def __init__(self, binds=None, limit=None):
+        self.binds = binds or list({engine, read_engine, async_read_engine().sync_engine})
+        self.limit = limit
+        self.count = 0
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        for bind in self.binds:
+            event.listen(bind, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for bind in self.binds:
+            event.remove(bind, "before_cursor_execute", self._on_execute)
+        if exc_type is None and self.limit is not None and self.count > self.limit:
+            raise AssertionError(
+                f"{self.count} queries executed, expected at most {self.limit}:\n"
+                + "\n".join(self.statements)
+            )
+        return False
+
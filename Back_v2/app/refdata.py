@@ -0,0 +1,105 @@
+"""Preserialized reference data: streams, subjects and rooms.
+
+Dropdowns hit these lists on every page render while they almost never
+change. Each list is serialized once per data version and served from
+memory with an ETag, so a revalidation is a string comparison and a miss is
+a memcpy. Any committed insert/update/delete of a Stream, Subject or Room
+bumps the version; the next request rebuilds what it needs.
+
+The ETag is a hash of the payload, so every worker process, and the same
+process after a restart, gives the same list the same tag.
+"""
+import hashlib
+import threading
+from typing import List
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from . import models, schemas
+from .cluster import subscribe
+
+_ADAPTERS = {
+    "streams": TypeAdapter(List[schemas.StreamOut]),
+    "subjects": TypeAdapter(List[schemas.SubjectOut]),
+    "rooms": TypeAdapter(List[schemas.RoomOut]),
+}
+
+
+def _load(db: Session, kind, stream_id=None):
+    if kind == "streams":
+        rows = db.query(models.Stream).order_by(models.Stream.id).all()
+    elif kind == "rooms":
+        rows = db.query(models.Room).order_by(models.Room.id).all()
+    else:
+        q = db.query(models.Subject)
+        if stream_id is not None:
+            q = q.filter(models.Subject.stream_id == stream_id)
+        rows = q.order_by(models.Subject.id).all()
+    adapter = _ADAPTERS[kind]
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+class ReferenceData:
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.Lock()
+        self._payloads = {}  # (kind, stream_id) -> (version, etag, bytes)
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._payloads.clear()
+
+    def get(self, db: Session, kind, stream_id=None):
+        """(etag, json bytes) for a reference list, built on first use per version."""
+        key = (kind, stream_id)
+        cached = self._payloads.get(key)
+        if cached and cached[0] == self.version:
+            return cached[1], cached[2]
+
+        version = self.version
+        body = _load(db, kind, stream_id)
+        etag = f'"ref-{hashlib.sha256(body).hexdigest()[:32]}"'
+        with self._lock:
+            # a write committed while we were reading: serve it but don't keep it
+            if version == self.version:
+                self._payloads[key] = (version, etag, body)
+        return etag, body
+
+    def response(self, request: Request, db: Session, kind, stream_id=None) -> Response:
+        etag, body = self.get(db, kind, stream_id)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+refdata = ReferenceData()
+subscribe("refdata", refdata.bump)
+
+
+# writes flag their session; the version moves only once the transaction commits,
+# so a concurrent reader can never cache pre-commit data under the new version
+def _mark_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["refdata_dirty"] = True
+
+
+for _model in (models.Stream, models.Subject, models.Room):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _mark_dirty)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop("refdata_dirty", False):
+        refdata.bump()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("refdata_dirty", None)
@@ -0,0 +1,127 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .. import database, models, schemas
+from ..analytics import refresh
+from ..deps import Principal, get_current_user_dep, require_admin
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+Rooms, Streams, Teachers = models.RoomUsageRollup, models.StreamDayRollup, models.TeacherDayRollup
+
+
+def fresh_rollups(
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_db),
+) -> Session:
+    require_admin(current_user)
+    refresh(db)
+    return db
+
+
+def _between(stmt, column, date_from, date_to):
+    if date_from is not None:
+        stmt = stmt.where(column >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(column <= date_to)
+    return stmt
+
+
+def _ratio(seated, capacity):
+    return round(seated / capacity, 4) if capacity else None
+
+
+@router.get("/rooms", response_model=List[schemas.RoomUsageOut])
+def room_usage(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    room_id: Optional[int] = Query(None),
+    db: Session = Depends(fresh_rollups),
+):
+    """Occupancy of each room per day and slot."""
+    stmt = (
+        select(Rooms.room_id, models.Room.name, models.Room.capacity, Rooms.date, Rooms.time, Rooms.exams, Rooms.seated)
+        .join(models.Room, models.Room.id == Rooms.room_id)
+        .order_by(Rooms.date, Rooms.time, Rooms.room_id)
+    )
+    if room_id is not None:
+        stmt = stmt.where(Rooms.room_id == room_id)
+    return [
+        {
+            "room_id": r.room_id, "room_name": r.name, "capacity": r.capacity, "date": r.date, "time": r.time,
+            "exams": r.exams, "seated": r.seated, "fill_ratio": _ratio(r.seated, r.capacity),
+        }
+        for r in db.execute(_between(stmt, Rooms.date, date_from, date_to))
+    ]
+
+
+@router.get("/days", response_model=List[schemas.DayUsageOut])
+def day_usage(date_from: Optional[date] = None, date_to: Optional[date] = None, db: Session = Depends(fresh_rollups)):
+    """Session totals per day: exams, students and how full the rooms in use were."""
+    rooms = db.execute(_between(
+        select(Rooms.date, func.count(), func.sum(models.Room.capacity), func.sum(Rooms.seated))
+        .join(models.Room, models.Room.id == Rooms.room_id)
+        .group_by(Rooms.date),
+        Rooms.date, date_from, date_to,
+    ))
+    people = {
+        d: (exams, students)
+        for d, exams, students in db.execute(_between(
+            select(Streams.date, func.sum(Streams.exams), func.sum(Streams.students)).group_by(Streams.date),
+            Streams.date, date_from, date_to,
+        ))
+    }
+    days = []
+    for d, slots, seats, seated in rooms:
+        exams, students = people.get(d, (0, 0))
+        days.append({
+            "date": d, "exams": exams, "students": students, "room_slots": slots,
+            "seats": seats or 0, "seated": seated or 0, "fill_ratio": _ratio(seated or 0, seats),
+        })
+    return sorted(days, key=lambda day: day["date"])
+
+
+@router.get("/streams", response_model=List[schemas.StreamDayOut])
+def stream_load(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    stream_id: Optional[int] = Query(None),
+    db: Session = Depends(fresh_rollups),
+):
+    """Exams and distinct students per stream per day."""
+    stmt = (
+        select(Streams.stream_id, models.Stream.nom, Streams.date, Streams.exams, Streams.students)
+        .join(models.Stream, models.Stream.id == Streams.stream_id)
+        .order_by(Streams.date, Streams.stream_id)
+    )
+    if stream_id is not None:
+        stmt = stmt.where(Streams.stream_id == stream_id)
+    return [
+        {"stream_id": r.stream_id, "stream_name": r.nom, "date": r.date, "exams": r.exams, "students": r.students}
+        for r in db.execute(_between(stmt, Streams.date, date_from, date_to))
+    ]
+
+
+@router.get("/teachers", response_model=List[schemas.TeacherDayOut])
+def teacher_load(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    teacher_id: Optional[int] = Query(None),
+    db: Session = Depends(fresh_rollups),
+):
+    """Exams supervised and minutes of supervision per teacher per day."""
+    stmt = (
+        select(Teachers.teacher_id, models.User.full_name, Teachers.date, Teachers.exams, Teachers.minutes)
+        .join(models.User, models.User.id == Teachers.teacher_id)
+        .order_by(Teachers.date, Teachers.teacher_id)
+    )
+    if teacher_id is not None:
+        stmt = stmt.where(Teachers.teacher_id == teacher_id)
+    return [
+        {"teacher_id": r.teacher_id, "teacher_name": r.full_name, "date": r.date, "exams": r.exams, "minutes": r.minutes}
+        for r in db.execute(_between(stmt, Teachers.date, date_from, date_to))
+    ]
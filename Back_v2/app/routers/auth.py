@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from fastapi import Query
 
 from .. import schemas, models
-from ..database import get_db
+from ..database import get_db, get_read_db
+from ..refdata import refdata
+from ..student_schedule import refresh_students
 from ..deps import (
     get_password_hash,
-    verify_password,
+    verify_and_update,
     create_access_token,
     get_current_user_dep,
     require_admin,
+    Principal,
 )
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -20,8 +23,15 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/login", response_model=schemas.Token)
 def login(request: schemas.LoginRequest, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.email == request.email).first()
-    if not user or not verify_password(request.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = verify_and_update(request.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    # the configured bcrypt cost changed since this hash was made: upgrade it now
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
     token = create_access_token({"sub": user.email, "role": user.role, "id": user.id})
     return {"access_token": token, "token_type": "bearer"}
 
@@ -42,6 +52,8 @@ def register_student(payload: schemas.StudentCreate, db: Session = Depends(get_d
         stream_id=payload.stream_id,
     )
     db.add(user)
+    db.flush()
+    refresh_students(db, [user.id])
     db.commit()
     db.refresh(user)
 
@@ -72,7 +84,7 @@ def register_teacher(payload: schemas.TeacherCreate, db: Session = Depends(get_d
 @router.post("/create-admin", response_model=schemas.UserOut)
 def create_admin(
     payload: schemas.AdminCreate,
-    current_user: models.User = Depends(get_current_user_dep),
+    current_user: Principal = Depends(get_current_user_dep),
     db: Session = Depends(get_db),
 ):
     require_admin(current_user)
@@ -94,27 +106,21 @@ def create_admin(
 
 # ----- GET STREAMS (optional for admin dropdowns) -----
 @router.get("/streams", response_model=List[schemas.StreamOut])
-def get_streams(db: Session = Depends(get_db)):
-    rows = db.query(models.Stream).all()
-    # convert each ORM to pydantic
-    return [schemas.StreamOut.model_validate(r) for r in rows]
+def get_streams(request: Request, db: Session = Depends(get_read_db)):
+    return refdata.response(request, db, "streams")
 
 
 # ----- GET SUBJECTS (filterable by stream_id) -----
 @router.get("/subjects", response_model=List[schemas.SubjectOut])
 def get_subjects(
+    request: Request,
     stream_id: Optional[int] = Query(None, description="Filter by stream id"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    q = db.query(models.Subject)
-    if stream_id is not None:
-        q = q.filter(models.Subject.stream_id == stream_id)
-    rows = q.all()
-    return [schemas.SubjectOut.model_validate(r) for r in rows]
+    return refdata.response(request, db, "subjects", stream_id)
 
 
 # ----- GET ROOMS -----
 @router.get("/rooms", response_model=List[schemas.RoomOut])
-def get_rooms(db: Session = Depends(get_db)):
-    rows = db.query(models.Room).all()
-    return [schemas.RoomOut.model_validate(r) for r in rows]
+def get_rooms(request: Request, db: Session = Depends(get_read_db)):
+    return refdata.response(request, db, "rooms")
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import schemas
+from ..changes import compact, is_pruned, latest_seq_query, pruned_seq_query, since_query
+from ..database import AsyncReadSessionLocal, get_async_db
+
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+MAX_CHANGES = 1000
+POLL_INTERVAL = float(os.getenv("CHANGES_POLL_INTERVAL", "1.0"))
+HEARTBEAT_INTERVAL = 15.0
+
+
+async def _changes_since(db: AsyncSession, since: int, limit: int):
+    if is_pruned(since, await db.scalar(pruned_seq_query())):
+        raise HTTPException(status_code=410, detail="Changes after this sequence were pruned, reload the lists")
+    rows = (await db.execute(since_query(since, limit + 1))).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        return rows[-1].seq, compact(rows), more
+    # nothing new; a cursor ahead of the log means it was issued by another database
+    if since > (await db.scalar(latest_seq_query())):
+        raise HTTPException(status_code=410, detail="Unknown change sequence, reload the lists")
+    return since, [], False
+
+
+# -------------------------
+# Delta polling
+# -------------------------
+@router.get("/", response_model=schemas.ChangesOut)
+async def list_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(MAX_CHANGES, ge=1, le=MAX_CHANGES),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Changes after ``since``; without it, only the current ``seq`` to start polling from."""
+    if since is None:
+        return schemas.ChangesOut(seq=await db.scalar(latest_seq_query()), changes=[])
+    seq, changes, more = await _changes_since(db, since, limit)
+    return schemas.ChangesOut(seq=seq, changes=changes, more=more)
+
+
+# -------------------------
+# Server-Sent Events
+# -------------------------
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[int] = Header(None),
+):
+    """One ``change`` event per batch of changes; the event id is the ``seq`` to resume from.
+
+    Browsers reconnect on their own and send ``Last-Event-ID``, which wins over ``since``.
+    """
+
+    async def events():
+        cursor = last_event_id if last_event_id is not None else since
+        async with AsyncReadSessionLocal() as db:
+            if cursor is None:
+                cursor = await db.scalar(latest_seq_query())
+            yield f"retry: {int(POLL_INTERVAL * 1000)}\nid: {cursor}\n\n"
+            idle = 0.0
+            while not await request.is_disconnected():
+                try:
+                    seq, changes, more = await _changes_since(db, cursor, MAX_CHANGES)
+                except HTTPException as exc:
+                    yield f"event: reset\ndata: {json.dumps(exc.detail)}\n\n"
+                    return
+                # end the read transaction, or SQLite would keep serving the same snapshot
+                await db.rollback()
+                if changes:
+                    cursor, idle = seq, 0.0
+                    yield f"id: {seq}\nevent: change\ndata: {json.dumps(changes, separators=(',', ':'))}\n\n"
+                    if more:
+                        continue
+                elif idle >= HEARTBEAT_INTERVAL:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+                await asyncio.sleep(POLL_INTERVAL)
+                idle += POLL_INTERVAL
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
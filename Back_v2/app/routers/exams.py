@@ -1,17 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import date
+from types import SimpleNamespace
+import orjson
 from fastapi.responses import StreamingResponse
-import io, random
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 
 from .. import models, schemas
-from ..database import get_db
-from ..deps import get_current_user_dep, require_admin
+from ..database import get_async_db, get_db, get_read_db
+from ..deps import Principal, get_current_user_async_dep, get_current_user_dep, require_admin
+from ..scheduling import build_plan
+from ..pagination import MAX_LIMIT, fast_json, keyset, paginate_async, wants_ndjson, ndjson_response_async
+from ..refdata import refdata
+from ..queries import convocation_rows, exam_row_dict, exam_rows, get_exam
+from ..conflicts import ConflictIndex, conflict_index, check_exam, sweep
+from ..seating import allocate_seats
+from ..changes import record
+from ..student_schedule import refresh_exams, timetable_json
+from ..pdf_cache import pdf_cache, cache_key
+from ..convocations import archive_name, convocation_data, render_convocation, stream_zip, stream_merged_pdf
 
 router = APIRouter(prefix="/exams", tags=["Exams"])
 
+MAX_BATCH = 1000
+
+
+def _conflict_error(conflicts):
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": "Exam overlaps existing bookings",
+            "conflicts": [schemas.ExamConflict(**c._asdict()).model_dump(mode="json") for c in conflicts],
+        },
+    )
+
+
+def _check_references(db: Session, payload: schemas.ExamCreate):
+    subject = db.query(models.Subject).filter(models.Subject.id == payload.subject_id).first()
+    room = db.query(models.Room).filter(models.Room.id == payload.room_id).first()
+    stream = db.query(models.Stream).filter(models.Stream.id == payload.stream_id).first()
+
+    if not subject or not room or not stream:
+        raise HTTPException(status_code=404, detail="Subject/Room/Stream not found")
+
 
 # -------------------------
 # Create exam (admins only)
@@ -19,18 +52,12 @@ router = APIRouter(prefix="/exams", tags=["Exams"])
 @router.post("/", response_model=schemas.ExamOut)
 def create_exam(
     payload: schemas.ExamCreate,
-    current_user: models.User = Depends(get_current_user_dep),
+    current_user: Principal = Depends(get_current_user_dep),
     db: Session = Depends(get_db),
 ):
     # require admin
     require_admin(current_user)
-
-    subject = db.query(models.Subject).filter(models.Subject.id == payload.subject_id).first()
-    room = db.query(models.Room).filter(models.Room.id == payload.room_id).first()
-    stream = db.query(models.Stream).filter(models.Stream.id == payload.stream_id).first()
-
-    if not subject or not room or not stream:
-        raise HTTPException(status_code=404, detail="Subject/Room/Stream not found")
+    _check_references(db, payload)
 
     exam = models.Exam(
         subject_id=payload.subject_id,
@@ -38,53 +65,356 @@ def create_exam(
         stream_id=payload.stream_id,
         date=payload.date,
         time=payload.time,
+        duration=payload.duration,
         teacher_id=payload.teacher_id,
     )
-    db.add(exam)
-    db.commit()
-    db.refresh(exam)
+
+    # check and write under the index lock so two requests, in any process, cannot book the same slot
+    with conflict_index.writing(db):
+        conflicts = check_exam(db, exam)
+        if conflicts:
+            raise _conflict_error(conflicts)
+        db.add(exam)
+        db.flush()
+        refresh_exams(db, [exam.id])
+        db.commit()
+        exam = get_exam(db, exam.id)
+        conflict_index.add(exam)
 
     # return Pydantic model
     return schemas.ExamOut.model_validate(exam)
 
 
+def _missing_references(db: Session, items: List[schemas.ExamCreate]):
+    """Per-item error messages, from one IN query per referenced table."""
+
+    def existing(column, ids, *where):
+        ids = {i for i in ids if i is not None}
+        return set(db.scalars(select(column).where(column.in_(ids), *where))) if ids else set()
+
+    subjects = existing(models.Subject.id, (i.subject_id for i in items))
+    rooms = existing(models.Room.id, (i.room_id for i in items))
+    streams = existing(models.Stream.id, (i.stream_id for i in items))
+    teachers = existing(models.User.id, (i.teacher_id for i in items), models.User.role == "teacher")
+
+    errors = []
+    for item in items:
+        missing = []
+        if item.subject_id not in subjects:
+            missing.append(f"Subject {item.subject_id} not found")
+        if item.room_id not in rooms:
+            missing.append(f"Room {item.room_id} not found")
+        if item.stream_id not in streams:
+            missing.append(f"Stream {item.stream_id} not found")
+        if item.teacher_id is not None and item.teacher_id not in teachers:
+            missing.append(f"Teacher {item.teacher_id} not found")
+        errors.append(missing)
+    return errors
+
+
+@router.post("/batch", response_model=schemas.ExamBatchOut)
+def create_exams_batch(
+    payload: List[schemas.ExamCreate],
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_db),
+):
+    """Create a list of exams in one transaction: all of them, or none if any item is invalid.
+
+    Items are checked against the booked exams and against the earlier items
+    of the batch. A rejected batch answers 422 with the per-item results.
+    """
+    require_admin(current_user)
+    if not payload:
+        raise HTTPException(status_code=400, detail="The batch is empty")
+    if len(payload) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH} exams per batch")
+    errors = _missing_references(db, payload)
+
+    with conflict_index.writing(db):
+        conflict_index.ensure_loaded(db)
+        batch = ConflictIndex(loaded=True)  # items seen so far, with their index as id
+        results = []
+        for index, (item, missing) in enumerate(zip(payload, errors)):
+            overlaps = batch.find(item)
+            batch.add(SimpleNamespace(id=index, **item.model_dump()))
+            results.append(schemas.ExamBatchResult(
+                index=index,
+                errors=missing,
+                conflicts=[schemas.ExamConflict(**c._asdict()) for c in conflict_index.find(item)],
+                batch_conflicts=[
+                    schemas.ExamBatchConflict(kind=c.kind, resource_id=c.resource_id, item=c.conflicting_exam_id)
+                    for c in overlaps
+                ],
+            ))
+        if any(r.errors or r.conflicts or r.batch_conflicts for r in results):
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "message": "Batch rejected, no exam was created",
+                    "results": [r.model_dump(mode="json") for r in results],
+                },
+            )
+
+        # a valid batch books each room slot once, so (room, date, time) identifies the rows;
+        # asking RETURNING to keep parameter order instead makes SQLite insert one row at a time
+        Exam = models.Exam
+        inserted = db.execute(
+            insert(Exam).returning(Exam.id, Exam.room_id, Exam.date, Exam.time),
+            [item.model_dump() for item in payload],
+        )
+        id_by_slot = {(r.room_id, r.date, r.time): r.id for r in inserted}
+        ids = [id_by_slot[(item.room_id, item.date, item.time)] for item in payload]
+        # bulk inserts skip the flush, which is what logs changes for the ORM paths
+        record(db, "exam", ids, op="create")
+        refresh_exams(db, ids)
+        db.commit()
+        rows = db.execute(exam_rows().where(models.Exam.id.in_(ids))).all()
+        for row in rows:
+            conflict_index.add(row)
+
+    created = {row.id: exam_row_dict(row) for row in rows}
+    return {"created": len(ids), "results": [{"index": i, "exam": created[id_]} for i, id_ in enumerate(ids)]}
+
+
+# -------------------------
+# Update / delete exam (admins only)
+# -------------------------
+@router.put("/{exam_id}", response_model=schemas.ExamOut)
+def update_exam(
+    exam_id: int,
+    payload: schemas.ExamCreate,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_db),
+):
+    require_admin(current_user)
+    exam = db.query(models.Exam).filter(models.Exam.id == exam_id).first()
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    _check_references(db, payload)
+
+    # moving the exam to another room or stream invalidates its seating
+    reseat = (exam.room_id, exam.stream_id) != (payload.room_id, payload.stream_id)
+
+    with conflict_index.writing(db):
+        conflicts = check_exam(db, payload, ignore_exam_id=exam_id)
+        if conflicts:
+            raise _conflict_error(conflicts)
+        for field, value in payload.model_dump().items():
+            setattr(exam, field, value)
+        if reseat:
+            db.query(models.Convocation).filter(models.Convocation.exam_id == exam_id).delete()
+            record(db, "seating", [exam_id])
+        refresh_exams(db, [exam_id])
+        db.commit()
+        exam = get_exam(db, exam_id)
+        if reseat:
+            conflict_index.set_overflow_rooms(exam, [])
+        else:
+            conflict_index.add(exam)
+    pdf_cache.invalidate_exam(exam_id)
+
+    return schemas.ExamOut.model_validate(exam)
+
+
+@router.delete("/{exam_id}")
+def delete_exam(
+    exam_id: int,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_db),
+):
+    require_admin(current_user)
+    exam = db.query(models.Exam).filter(models.Exam.id == exam_id).first()
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+
+    with conflict_index.writing(db):
+        db.delete(exam)
+        refresh_exams(db, [exam_id])
+        db.commit()
+        conflict_index.remove(exam_id)
+    pdf_cache.invalidate_exam(exam_id)
+    return {"detail": "Exam deleted"}
+
+
+# -------------------------
+# Timetable audit (admins only)
+# -------------------------
+@router.get("/conflicts", response_model=List[schemas.ExamConflict])
+def list_conflicts(
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_read_db),
+):
+    require_admin(current_user)
+    return [schemas.ExamConflict(**c._asdict()) for c in sweep(db)]
+
+
+# -------------------------
+# Automatic timetabling (admins only)
+# -------------------------
+@router.post("/schedule", response_model=schemas.ScheduleOut)
+def schedule_exams(
+    payload: schemas.ScheduleRequest,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_db),
+):
+    require_admin(current_user)
+    if payload.end_date < payload.start_date:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    if not payload.slots:
+        raise HTTPException(status_code=400, detail="At least one time slot is required")
+    teacher_ids = {a.teacher_id for a in payload.teacher_assignments}
+    teachers = set(db.scalars(
+        select(models.User.id).where(models.User.id.in_(teacher_ids), models.User.role == "teacher")
+    )) if teacher_ids else set()
+    if teacher_ids - teachers:
+        raise HTTPException(
+            status_code=422, detail=[f"Teacher {t} not found" for t in sorted(teacher_ids - teachers)]
+        )
+
+    def plan_exams():
+        slots, plan = build_plan(db, payload)
+        exams = []
+        for node, slot, room_id in plan.placed:
+            day, at = slots[slot]
+            exams.append(models.Exam(
+                subject_id=node.subject_id,
+                stream_id=node.stream_id,
+                room_id=room_id,
+                teacher_id=node.teacher_id,
+                date=day,
+                time=at,
+                duration=payload.duration,
+            ))
+        return plan, exams
+
+    if payload.dry_run:
+        plan, exams = plan_exams()
+    else:
+        # commit mode: planned from the bookings as they are under the lock, checked
+        # against the index like a manual create, and written in a single transaction
+        with conflict_index.writing(db):
+            plan, exams = plan_exams()
+            conflicts = [c for exam in exams for c in check_exam(db, exam)]
+            if conflicts:
+                raise _conflict_error(conflicts)
+            if exams:
+                db.add_all(exams)
+                db.flush()
+                refresh_exams(db, [e.id for e in exams])
+                db.commit()
+                for exam in exams:
+                    conflict_index.add(exam)
+            else:
+                db.rollback()
+
+    planned = []
+    for exam in exams:
+        planned.append(schemas.PlannedExam(
+            id=exam.id,
+            subject_id=exam.subject_id,
+            stream_id=exam.stream_id,
+            room_id=exam.room_id,
+            teacher_id=exam.teacher_id,
+            date=exam.date,
+            time=exam.time,
+            duration=exam.duration,
+        ))
+    planned.sort(key=lambda p: (p.date, p.time, p.stream_id))
+
+    return schemas.ScheduleOut(
+        dry_run=payload.dry_run,
+        planned=planned,
+        unscheduled=[
+            schemas.UnscheduledSubject(subject_id=n.subject_id, stream_id=n.stream_id, reason=reason)
+            for n, reason in plan.unscheduled
+        ],
+    )
+
+
 # -------------------------
 # List all exams (public/admin)
 # -------------------------
+EXAM_ORDER = (models.Exam.date, models.Exam.time, models.Exam.id)
+
+
+def _exam_key(e):
+    return (e.date, e.time, e.id)
+
+
+def _filter_exams(q, stream_id=None, room_id=None, teacher_id=None, date_from=None, date_to=None):
+    if stream_id is not None:
+        q = q.filter(models.Exam.stream_id == stream_id)
+    if room_id is not None:
+        q = q.filter(models.Exam.room_id == room_id)
+    if teacher_id is not None:
+        q = q.filter(models.Exam.teacher_id == teacher_id)
+    if date_from is not None:
+        q = q.filter(models.Exam.date >= date_from)
+    if date_to is not None:
+        q = q.filter(models.Exam.date <= date_to)
+    return q
+
+
 @router.get("/", response_model=List[schemas.ExamOut])
-def list_all_exams(db: Session = Depends(get_db)):
-    exams = db.query(models.Exam).all()
-    return [schemas.ExamOut.model_validate(e) for e in exams]
+async def list_all_exams(
+    request: Request,
+    response: Response,
+    stream_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    teacher_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = _filter_exams(
+        exam_rows(), stream_id=stream_id, room_id=room_id, teacher_id=teacher_id, date_from=date_from, date_to=date_to
+    )
+    if wants_ndjson(request, format):
+        return ndjson_response_async(
+            keyset(stmt, EXAM_ORDER, cursor),
+            lambda r: orjson.dumps(exam_row_dict(r)),
+            limit,
+        )
+    rows = await paginate_async(db, stmt, EXAM_ORDER, _exam_key, cursor, limit, response)
+    return fast_json([exam_row_dict(r) for r in rows], response)
 
 
 # -------------------------
 # List exams for current student
 # -------------------------
-@router.get("/student", response_model=List[schemas.ExamOut])
-def list_exams_for_student(
-    current_user: models.User = Depends(get_current_user_dep),
-    db: Session = Depends(get_db),
+@router.get("/student", response_model=List[schemas.StudentExamOut])
+async def list_exams_for_student(
+    current_user: Principal = Depends(get_current_user_async_dep),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Students only")
 
-    exams = db.query(models.Exam).filter(models.Exam.stream_id == current_user.stream_id).all()
-    return [schemas.ExamOut.model_validate(e) for e in exams]
+    # one range read on the materialized timetable (see student_schedule)
+    payloads = await db.scalars(
+        select(models.StudentSchedule.payload)
+        .where(models.StudentSchedule.student_id == current_user.id)
+        .order_by(models.StudentSchedule.date, models.StudentSchedule.time, models.StudentSchedule.exam_id)
+    )
+    return Response(content=timetable_json(payloads), media_type="application/json")
 
 
 # -------------------------
 # List exams for current teacher
 # -------------------------
 @router.get("/teacher", response_model=List[schemas.ExamOut])
-def list_exams_for_teacher(
-    current_user: models.User = Depends(get_current_user_dep),
-    db: Session = Depends(get_db),
+async def list_exams_for_teacher(
+    current_user: Principal = Depends(get_current_user_async_dep),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Teachers only")
 
-    exams = db.query(models.Exam).filter(models.Exam.teacher_id == current_user.id).all()
-    return [schemas.ExamOut.model_validate(e) for e in exams]
+    rows = await db.execute(exam_rows().where(models.Exam.teacher_id == current_user.id))
+    return fast_json([exam_row_dict(r) for r in rows])
 
 
 # -------------------------
@@ -93,80 +423,124 @@ def list_exams_for_teacher(
 @router.get("/{exam_id}/convocation")
 def download_convocation(
     exam_id: int,
-    current_user: models.User = Depends(get_current_user_dep),
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_read_db),
 ):
     # only students can download their convocation
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Students only")
 
-    exam = db.query(models.Exam).filter(models.Exam.id == exam_id).first()
+    exam = get_exam(db, exam_id)
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
 
-    # check or create convocation record
+    # seats are allocated ahead of time by the admin (POST /exams/{id}/seats)
     conv = db.query(models.Convocation).filter_by(student_id=current_user.id, exam_id=exam.id).first()
     if not conv:
-        conv = models.Convocation(
-            student_id=current_user.id,
-            exam_id=exam.id,
-            table_number=random.randint(1, 80),
+        raise HTTPException(status_code=404, detail="No seat allocated for this exam yet")
+
+    student = db.get(models.User, current_user.id)
+    data = convocation_data(student, exam, conv)
+    headers = {
+        "Content-Disposition": "inline; filename=convocation.pdf",
+        "Cache-Control": "private, no-cache",
+    }
+
+    # the ETag is the content hash: revalidation needs no rendering at all
+    etag = f'"{cache_key(data)}"'
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": headers["Cache-Control"]})
+
+    _, pdf = pdf_cache.get_or_render(data, render_convocation)
+    headers["ETag"] = etag
+    return Response(content=pdf, media_type="application/pdf", headers=headers)
+
+
+# -------------------------
+# Seat allocation (admins only)
+# -------------------------
+@router.post("/{exam_id}/seats", response_model=schemas.SeatAllocationOut)
+def allocate_exam_seats(
+    exam_id: int,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_db),
+):
+    require_admin(current_user)
+    exam = get_exam(db, exam_id)
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+
+    rooms = allocate_seats(db, exam)
+    pdf_cache.invalidate_exam(exam_id)
+    return schemas.SeatAllocationOut(
+        exam_id=exam_id,
+        students=sum(r.assigned for r in rooms),
+        rooms=[schemas.SeatedRoom.model_validate(r) for r in rooms],
+    )
+
+
+# -------------------------
+# Bulk convocation export (admins only)
+# -------------------------
+def _export_response(rows, fmt: str, name: str):
+    items = [convocation_data(student, exam, conv) for conv, student, exam in rows]
+    if not items:
+        raise HTTPException(status_code=404, detail="No convocations to export")
+
+    if fmt == "pdf":
+        return StreamingResponse(
+            stream_merged_pdf(items),
+            media_type="application/pdf",
+            headers={"Content-Disposition": f"attachment; filename={name}.pdf"},
         )
-        db.add(conv)
-        db.commit()
-        db.refresh(conv)
-
-    # build PDF
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    p.setFont("Helvetica-Bold", 18)
-    p.drawCentredString(width / 2, height - 80, "Université Ibn Zohr")
-    p.setFont("Helvetica", 14)
-    p.drawCentredString(width / 2, height - 110, "Convocation d'Examen")
-
-    y = height - 160
-    p.setFont("Helvetica", 12)
-    p.drawString(80, y, f"Nom complet : {current_user.full_name}"); y -= 20
-    p.drawString(80, y, f"CNE : {current_user.cne or '-'}"); y -= 20
-    p.drawString(80, y, f"Code Apogée : {current_user.code_apoge or '-'}"); y -= 20
-    p.drawString(80, y, f"Filière : {exam.stream.nom}"); y -= 20
-    p.drawString(80, y, f"Matière : {exam.subject.name}"); y -= 20
-    p.drawString(80, y, f"Salle : {exam.room.name}"); y -= 20
-    p.drawString(80, y, f"Table : {conv.table_number}"); y -= 20
-    p.drawString(80, y, f"Date : {exam.date.strftime('%d/%m/%Y')} à {exam.time.strftime('%H:%M')}")
-
-    p.showPage()
-    p.save()
-    buffer.seek(0)
 
     return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": "inline; filename=convocation.pdf"},
+        stream_zip(items, archive_name),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={name}.zip"},
     )
 
 
+@router.get("/{exam_id}/convocations")
+def export_exam_convocations(
+    exam_id: int,
+    format: str = Query("zip", pattern="^(zip|pdf)$"),
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_read_db),
+):
+    require_admin(current_user)
+    if not db.query(models.Exam).filter(models.Exam.id == exam_id).first():
+        raise HTTPException(status_code=404, detail="Exam not found")
+    rows = convocation_rows(db).filter(models.Convocation.exam_id == exam_id).all()
+    return _export_response(rows, format, f"convocations_exam_{exam_id}")
+
+
+@router.get("/stream/{stream_id}/convocations")
+def export_stream_convocations(
+    stream_id: int,
+    format: str = Query("zip", pattern="^(zip|pdf)$"),
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(get_read_db),
+):
+    require_admin(current_user)
+    rows = convocation_rows(db).filter(models.Exam.stream_id == stream_id).all()
+    return _export_response(rows, format, f"convocations_stream_{stream_id}")
+
+
 # -------------------------
 # Endpoints to populate admin dropdowns
 # -------------------------
 @router.get("/streams", response_model=List[schemas.StreamOut])
-def get_streams(db: Session = Depends(get_db)):
-    rows = db.query(models.Stream).all()
-    return [schemas.StreamOut.model_validate(r) for r in rows]
+def get_streams(request: Request, db: Session = Depends(get_read_db)):
+    return refdata.response(request, db, "streams")
 
 
 @router.get("/subjects", response_model=List[schemas.SubjectOut])
-def get_subjects(stream_id: Optional[int] = None, db: Session = Depends(get_db)):
-    q = db.query(models.Subject)
-    if stream_id is not None:
-        q = q.filter(models.Subject.stream_id == stream_id)
-    rows = q.all()
-    return [schemas.SubjectOut.model_validate(r) for r in rows]
+def get_subjects(request: Request, stream_id: Optional[int] = None, db: Session = Depends(get_read_db)):
+    return refdata.response(request, db, "subjects", stream_id)
 
 
 @router.get("/rooms", response_model=List[schemas.RoomOut])
-def get_rooms(db: Session = Depends(get_db)):
-    rows = db.query(models.Room).all()
-    return [schemas.RoomOut.model_validate(r) for r in rows]
+def get_rooms(request: Request, db: Session = Depends(get_read_db)):
+    return refdata.response(request, db, "rooms")
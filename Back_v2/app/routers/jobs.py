@@ -0,0 +1,133 @@
+import os
+import shutil
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from .. import database, models, schemas
+from ..deps import Principal, get_current_user_dep, require_admin
+from ..jobs import INPUT_PREFIX, KINDS, cancel, enqueue, job_dir, job_out, parse_params, pool, retry
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _get_job(db: Session, job_id: int) -> models.Job:
+    job = db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# -------------------------
+# Submit (admins only)
+# -------------------------
+@router.post("/", response_model=schemas.JobOut, status_code=202)
+def create_job(
+    payload: schemas.JobCreate,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_db),
+):
+    require_admin(current_user)
+    params = parse_params(payload.kind, payload.params)
+    if KINDS[payload.kind].upload:
+        raise HTTPException(status_code=400, detail="This job kind takes a file, see POST /jobs/import-users")
+    job = enqueue(db, payload.kind, params, created_by=current_user.id)
+    db.commit()
+    pool.wake()
+    return job_out(job)
+
+
+@router.post("/import-users", response_model=schemas.JobOut, status_code=202)
+def create_import_job(
+    role: str = Query(..., pattern="^(student|teacher)$"),
+    file: UploadFile = File(..., description="CSV with a header row: full_name,email,password,stream_id[,code_apoge,cne]"),
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_db),
+):
+    require_admin(current_user)
+    job = enqueue(db, "user_import", parse_params("user_import", {"role": role}), created_by=current_user.id)
+    # the row is not visible to workers before the commit, so the file is in place first
+    os.makedirs(job_dir(job.id), exist_ok=True)
+    with open(os.path.join(job_dir(job.id), INPUT_PREFIX + ".csv"), "wb") as out:
+        shutil.copyfileobj(file.file, out)
+    db.commit()
+    pool.wake()
+    return job_out(job)
+
+
+# -------------------------
+# Follow up (admins only)
+# -------------------------
+@router.get("/", response_model=List[schemas.JobOut])
+def list_jobs(
+    status: Optional[str] = Query(None, pattern="^(queued|running|succeeded|failed|cancelled)$"),
+    kind: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_read_db),
+):
+    require_admin(current_user)
+    q = db.query(models.Job)
+    if status is not None:
+        q = q.filter(models.Job.status == status)
+    if kind is not None:
+        q = q.filter(models.Job.kind == kind)
+    return [job_out(j) for j in q.order_by(models.Job.id.desc()).limit(limit)]
+
+
+@router.get("/{job_id}", response_model=schemas.JobOut)
+def get_job(
+    job_id: int,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_read_db),
+):
+    require_admin(current_user)
+    return job_out(_get_job(db, job_id))
+
+
+@router.get("/{job_id}/artifact")
+def download_artifact(
+    job_id: int,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_read_db),
+):
+    require_admin(current_user)
+    job = _get_job(db, job_id)
+    if job.status != "succeeded" or not job.artifact:
+        raise HTTPException(status_code=404, detail="This job has no artifact")
+    path = os.path.join(job_dir(job_id), job.artifact)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="The artifact was deleted")
+    return FileResponse(path, filename=job.artifact)
+
+
+@router.post("/{job_id}/cancel", response_model=schemas.JobOut)
+def cancel_job(
+    job_id: int,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_db),
+):
+    """Queued jobs are cancelled at once; running ones stop at their next progress update."""
+    require_admin(current_user)
+    _get_job(db, job_id)
+    if not cancel(db, job_id):
+        raise HTTPException(status_code=409, detail="Job already finished")
+    db.commit()
+    return job_out(_get_job(db, job_id))
+
+
+@router.post("/{job_id}/retry", response_model=schemas.JobOut)
+def retry_job(
+    job_id: int,
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_db),
+):
+    require_admin(current_user)
+    _get_job(db, job_id)
+    if not retry(db, job_id):
+        raise HTTPException(status_code=409, detail="Only failed or cancelled jobs can be retried")
+    db.commit()
+    pool.wake()
+    return job_out(_get_job(db, job_id))
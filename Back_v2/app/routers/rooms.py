@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 from .. import models, schemas, database
+from ..refdata import refdata
 
 router = APIRouter(prefix="/rooms", tags=["Rooms"])
 
 @router.get("/", response_model=List[schemas.RoomOut])
-def list_rooms(db: Session = Depends(database.get_db)):
-    return db.query(models.Room).all()
+def list_rooms(request: Request, db: Session = Depends(database.get_read_db)):
+    return refdata.response(request, db, "rooms")
 
 @router.post("/", response_model=schemas.RoomOut)
 def create_room(payload: schemas.RoomCreate, db: Session = Depends(database.get_db)):
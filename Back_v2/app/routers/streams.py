@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from typing import List
-from .. import models, schemas, database
+from .. import schemas, database
+from ..refdata import refdata
 
 router = APIRouter(prefix="/streams", tags=["Filières"])
 
 @router.get("/", response_model=List[schemas.StreamOut])
-def list_streams(db: Session = Depends(database.get_db)):
-    return db.query(models.Stream).all()
+def list_streams(request: Request, db: Session = Depends(database.get_read_db)):
+    return refdata.response(request, db, "streams")
 
 @router.get("/{stream_id}/subjects", response_model=List[schemas.SubjectOut])
-def list_subjects(stream_id: int, db: Session = Depends(database.get_db)):
-    return db.query(models.Subject).filter(models.Subject.stream_id == stream_id).all()
+def list_subjects(stream_id: int, request: Request, db: Session = Depends(database.get_read_db)):
+    return refdata.response(request, db, "subjects", stream_id)
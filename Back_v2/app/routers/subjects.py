@@ -1,15 +1,42 @@
 # subjects.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from .. import models, schemas, database
+from ..refdata import refdata
+from ..pagination import MAX_LIMIT, keyset, paginate, wants_ndjson, ndjson_response
 
 router = APIRouter(prefix="/subjects", tags=["Matières"])
 
 @router.get("/", response_model=List[schemas.SubjectOut])
-def list_all_subjects(db: Session = Depends(database.get_db)):
-    return db.query(models.Subject).all()
+def list_all_subjects(
+    request: Request,
+    response: Response,
+    stream_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(database.get_read_db),
+):
+    def filtered(session):
+        q = session.query(models.Subject)
+        if stream_id is not None:
+            q = q.filter(models.Subject.stream_id == stream_id)
+        return q
+
+    # the plain, unpaginated list is the dropdown case: serve it from memory
+    if limit is None and cursor is None and not wants_ndjson(request, format):
+        return refdata.response(request, db, "subjects", stream_id)
+
+    order = (models.Subject.id,)
+    if wants_ndjson(request, format):
+        return ndjson_response(
+            lambda s: keyset(filtered(s), order, cursor),
+            lambda r: schemas.SubjectOut.model_validate(r).model_dump_json(),
+            limit,
+        )
+    return paginate(filtered(db), order, lambda r: (r.id,), cursor, limit, response)
 
 @router.get("/stream/{stream_id}", response_model=List[schemas.SubjectOut])
-def list_subjects_by_stream(stream_id: int, db: Session = Depends(database.get_db)):
-    return db.query(models.Subject).filter(models.Subject.stream_id == stream_id).all()
+def list_subjects_by_stream(stream_id: int, request: Request, db: Session = Depends(database.get_read_db)):
+    return refdata.response(request, db, "subjects", stream_id)
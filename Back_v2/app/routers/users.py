@@ -1,19 +1,76 @@
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import orjson
 from .. import models, schemas, database
-from ..deps import get_current_user
+from ..deps import Principal, get_current_user_async_dep, get_current_user_dep, require_admin
+from ..importing import import_users
+from ..pagination import MAX_LIMIT, fast_json, keyset, paginate, wants_ndjson, ndjson_response
+from ..queries import USER_COLUMNS
+from ..search import search_users
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.get("/me", response_model=schemas.UserOut)
-def me(authorization: str = Header(None), db: Session = Depends(database.get_db)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing token")
-    token = authorization.split(" ", 1)[1]
-    user = get_current_user(token, db)
+async def me(
+    current_user: Principal = Depends(get_current_user_async_dep),
+    db: AsyncSession = Depends(database.get_async_db),
+):
+    user = await db.get(models.User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @router.get("/", response_model=List[schemas.UserOut])
-def list_users(db: Session = Depends(database.get_db)):
-    return db.query(models.User).all()
+def list_users(
+    request: Request,
+    response: Response,
+    role: Optional[str] = Query(None, pattern="^(admin|teacher|student)$"),
+    stream_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(database.get_read_db),
+):
+    def filtered(session):
+        q = session.query(*USER_COLUMNS)
+        if role is not None:
+            q = q.filter(models.User.role == role)
+        if stream_id is not None:
+            q = q.filter(models.User.stream_id == stream_id)
+        return q
+
+    order = (models.User.id,)
+    if wants_ndjson(request, format):
+        return ndjson_response(
+            lambda s: keyset(filtered(s), order, cursor),
+            lambda u: orjson.dumps(u._asdict()).decode(),
+            limit,
+        )
+    rows = paginate(filtered(db), order, lambda u: (u.id,), cursor, limit, response)
+    return fast_json([u._asdict() for u in rows], response)
+
+@router.get("/search", response_model=List[schemas.UserOut])
+def search(
+    q: str = Query(..., min_length=1, max_length=100, description="Part of a name, email, CNE or Apogée code"),
+    role: Optional[str] = Query(None, pattern="^(admin|teacher|student)$"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_read_db),
+):
+    """Best matches first; tolerates small typos in queries of four characters or more."""
+    require_admin(current_user)
+    if not q.strip():
+        return fast_json([])
+    return fast_json([u._asdict() for u in search_users(db, q, limit, role)])
+
+@router.post("/import", response_model=schemas.ImportReport)
+def import_users_csv(
+    role: str = Query(..., pattern="^(student|teacher)$"),
+    file: UploadFile = File(..., description="CSV with a header row: full_name,email,password,stream_id[,code_apoge,cne]"),
+    current_user: Principal = Depends(get_current_user_dep),
+    db: Session = Depends(database.get_db),
+):
+    require_admin(current_user)
+    return import_users(db, file.file, role)
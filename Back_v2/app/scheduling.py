@@ -0,0 +1,226 @@
+"""Automatic exam timetabling.
+
+The solver works on plain data so it can be exercised without a database:
+every subject to schedule is a node, nodes sharing a stream or a teacher
+may not share a slot (graph colouring where colours are the session slots),
+and each slot owns a pool of rooms that is consumed as exams are placed.
+
+Nodes are coloured DSATUR-style: the node with the fewest remaining slots
+(most saturated) is placed first, and every placement is propagated to the
+other nodes of its stream/teacher groups by pruning that slot from their
+domains. Streams and teachers are kept as groups instead of explicit edges,
+so a stream with many subjects does not blow up into a quadratic clique.
+"""
+import heapq
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .conflicts import overflow_rooms, resources
+
+
+class ExamNode:
+    __slots__ = ("key", "subject_id", "stream_id", "teacher_id", "size", "domain", "groups")
+
+    def __init__(self, key, subject_id, stream_id, teacher_id, size):
+        self.key = key
+        self.subject_id = subject_id
+        self.stream_id = stream_id
+        self.teacher_id = teacher_id
+        self.size = size
+        self.domain = None
+        self.groups = [("stream", stream_id)]
+        if teacher_id is not None:
+            self.groups.append(("teacher", teacher_id))
+
+
+class Plan:
+    def __init__(self):
+        self.placed = []        # (node, slot, room_id)
+        self.unscheduled = []   # (node, reason)
+
+
+def session_slots(start_date, end_date, times, excluded_weekdays=()):
+    """All (date, time) slots of the session window, in chronological order."""
+    slots = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() not in excluded_weekdays:
+            slots.extend((day, t) for t in sorted(times))
+        day += timedelta(days=1)
+    return slots
+
+
+def overlapping_slots(slots, duration):
+    """For every slot, the indexes of the slots (itself included) it overlaps with."""
+    by_day = defaultdict(list)
+    for i, (day, at) in enumerate(slots):
+        by_day[day].append((at.hour * 60 + at.minute, i))
+    overlaps = [None] * len(slots)
+    for starts in by_day.values():
+        for a, i in starts:
+            overlaps[i] = [j for b, j in starts if a < b + duration and b < a + duration]
+    return overlaps
+
+
+def solve(nodes, slots, rooms, busy=None, overlaps=None):
+    """Colour ``nodes`` with ``slots`` and give each placed exam a room.
+
+    ``rooms`` is a list of (room_id, capacity). ``busy`` maps a resource key
+    (``("stream", id)``, ``("teacher", id)`` or ``("room", id)``) to the set of
+    slot indexes it is already taken in. ``overlaps[i]`` lists the slots that
+    cannot be used by the same stream, teacher or room as slot ``i``; by default
+    slots only clash with themselves. Node domains may be pre-filled by the
+    caller (e.g. teacher unavailability); ``None`` means every slot.
+    """
+    busy = busy or {}
+    overlaps = overlaps or [[i] for i in range(len(slots))]
+    plan = Plan()
+
+    # free rooms per slot, kept sorted by capacity for best-fit lookups
+    free_rooms = []
+    for i in range(len(slots)):
+        free_rooms.append(sorted(
+            (cap, rid) for rid, cap in rooms if i not in busy.get(("room", rid), ())
+        ))
+
+    members = defaultdict(list)
+    for node in nodes:
+        if node.domain is None:
+            node.domain = set(range(len(slots)))
+        for group in node.groups:
+            node.domain -= busy.get(group, set())
+            members[group].append(node)
+
+    # load per (stream, date), used to spread a stream's exams over the session
+    day_load = defaultdict(int)
+    assigned = set()
+    largest = max((cap for _, cap in rooms), default=0)
+
+    def degree(node):
+        return sum(len(members[g]) - 1 for g in node.groups)
+
+    def entry(node):
+        return (len(node.domain), -degree(node), -node.size, node.key)
+
+    heap = [entry(n) for n in nodes]
+    heapq.heapify(heap)
+    by_key = {n.key: n for n in nodes}
+
+    while heap:
+        dom_size, _, _, key = heapq.heappop(heap)
+        node = by_key[key]
+        if key in assigned or dom_size != len(node.domain):
+            continue  # stale entry, a fresher one is in the heap
+        assigned.add(key)
+
+        best = None
+        for i in node.domain:
+            pool = free_rooms[i]
+            pos = bisect_left(pool, (node.size, -1))
+            if pos == len(pool):
+                continue
+            score = (day_load[(node.stream_id, slots[i][0])], i)
+            if best is None or score < best[0]:
+                best = (score, i, pos)
+
+        if best is None:
+            if node.size > largest:
+                # one room per planned exam; seat allocation can still split it by hand
+                reason = (
+                    f"{node.size} students, more than the largest room ({largest} seats): "
+                    "create the exam and allocate its seats across several rooms"
+                )
+            elif not node.domain:
+                reason = "no free slot"
+            else:
+                reason = "no room large enough in any free slot"
+            plan.unscheduled.append((node, reason))
+            continue
+
+        _, slot, pos = best
+        room = free_rooms[slot].pop(pos)
+        for j in overlaps[slot]:
+            if j != slot and room in free_rooms[j]:
+                free_rooms[j].remove(room)
+        plan.placed.append((node, slot, room[1]))
+        day_load[(node.stream_id, slots[slot][0])] += 1
+
+        # propagate: overlapping slots are no longer available to the node's groups
+        for group in node.groups:
+            for other in members[group]:
+                if other.key in assigned:
+                    continue
+                before = len(other.domain)
+                other.domain.difference_update(overlaps[slot])
+                if len(other.domain) != before:
+                    heapq.heappush(heap, entry(other))
+
+    return plan
+
+
+def build_plan(db: Session, request):
+    """Load the scheduling problem described by ``request`` and solve it."""
+    slots = session_slots(
+        request.start_date, request.end_date, request.slots, set(request.excluded_weekdays)
+    )
+    overlaps = overlapping_slots(slots, request.duration)
+
+    streams_q = db.query(models.Subject)
+    if request.stream_ids:
+        streams_q = streams_q.filter(models.Subject.stream_id.in_(request.stream_ids))
+    subjects = streams_q.order_by(models.Subject.stream_id, models.Subject.id).all()
+
+    # subjects that already have an exam are not scheduled again
+    scheduled = {sid for (sid,) in db.query(models.Exam.subject_id).distinct()}
+
+    sizes = dict(
+        db.query(models.User.stream_id, func.count(models.User.id))
+        .filter(models.User.role == "student")
+        .group_by(models.User.stream_id)
+        .all()
+    )
+    teachers = {a.subject_id: a.teacher_id for a in request.teacher_assignments}
+
+    unavailable = defaultdict(set)
+    for u in request.teacher_unavailability:
+        for i, (d, t) in enumerate(slots):
+            if d == u.date and (u.slot is None or u.slot == t):
+                unavailable[u.teacher_id].add(i)
+
+    nodes = []
+    for subject in subjects:
+        if subject.id in scheduled:
+            continue
+        node = ExamNode(
+            subject.id, subject.id, subject.stream_id,
+            teachers.get(subject.id), sizes.get(subject.stream_id, 0),
+        )
+        if node.teacher_id in unavailable:
+            node.domain = set(range(len(slots))) - unavailable[node.teacher_id]
+        nodes.append(node)
+
+    # existing exams inside the window occupy their stream, teacher and rooms
+    # (overflow rooms of split seatings included) in every slot they overlap with
+    day_slots = defaultdict(list)
+    for i, (day, at) in enumerate(slots):
+        day_slots[day].append((at.hour * 60 + at.minute, i))
+    busy = defaultdict(set)
+    extra_rooms = overflow_rooms(db)
+    existing = db.query(
+        models.Exam.id, models.Exam.stream_id, models.Exam.room_id, models.Exam.teacher_id,
+        models.Exam.date, models.Exam.time, models.Exam.duration,
+    ).filter(models.Exam.date >= request.start_date, models.Exam.date <= request.end_date)
+    for e in existing:
+        start = e.time.hour * 60 + e.time.minute
+        for slot_start, i in day_slots.get(e.date, ()):
+            if start < slot_start + request.duration and slot_start < start + e.duration:
+                for key in resources(e, extra_rooms.get(e.id, ())):
+                    busy[key].add(i)
+
+    rooms = [(r.id, r.capacity) for r in db.query(models.Room).all()]
+    return slots, solve(nodes, slots, rooms, busy, overlaps)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, model_validator
 from typing import Optional, List
-from datetime import date, time
+from datetime import date, datetime, time
 
 class StreamBase(BaseModel):
     nom: str
@@ -57,6 +57,15 @@ class UserOut(UserBase):
     cne: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
 
+class ImportRowError(BaseModel):
+    row: int
+    email: Optional[str] = None
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    created: int
+    errors: List[ImportRowError]
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
@@ -71,6 +80,7 @@ class ExamCreate(BaseModel):
     room_id: int
     date: date
     time: time
+    duration: int = Field(120, gt=0, description="Duration in minutes")
     teacher_id: Optional[int] = None
 
 class ExamOut(BaseModel):
@@ -80,10 +90,172 @@ class ExamOut(BaseModel):
     room: RoomOut
     date: date
     time: time
+    duration: int = 120
     teacher_id: Optional[int] = None
     model_config = ConfigDict(from_attributes=True)
 
+class StudentExamOut(ExamOut):
+    table_number: Optional[int] = None  # None until seats are allocated
+    seat_room: Optional[RoomOut] = None  # where the student sits; may be an overflow room
+
+class ExamConflict(BaseModel):
+    kind: str  # room | teacher | stream
+    resource_id: int
+    date: date
+    start: time
+    end: time
+    exam_id: Optional[int] = None
+    conflicting_exam_id: int
+
+class ExamBatchConflict(BaseModel):
+    kind: str  # room | teacher | stream
+    resource_id: int
+    item: int  # index of the earlier batch item it overlaps
+
+class ExamBatchResult(BaseModel):
+    index: int
+    exam: Optional[ExamOut] = None  # set once created; a rejected batch creates nothing
+    errors: List[str] = []
+    conflicts: List[ExamConflict] = []  # overlaps with exams already booked
+    batch_conflicts: List[ExamBatchConflict] = []
+
+class ExamBatchOut(BaseModel):
+    created: int
+    results: List[ExamBatchResult]
+
+class SeatedRoom(BaseModel):
+    room_id: int
+    capacity: int
+    assigned: int
+    model_config = ConfigDict(from_attributes=True)
+
+class SeatAllocationOut(BaseModel):
+    exam_id: int
+    students: int
+    rooms: List[SeatedRoom]
+
 class ConvocationOut(BaseModel):
     exam: ExamOut
     table_number: int
     model_config = ConfigDict(from_attributes=True)
+
+class TeacherAssignment(BaseModel):
+    subject_id: int
+    teacher_id: int
+
+class TeacherUnavailability(BaseModel):
+    teacher_id: int
+    date: date
+    slot: Optional[time] = None  # None = the whole day
+
+class ScheduleRequest(BaseModel):
+    start_date: date
+    end_date: date
+    slots: List[time] = [time(9, 0), time(14, 0)]
+    duration: int = Field(120, gt=0, description="Duration of every planned exam, in minutes")
+    excluded_weekdays: List[int] = [6]  # 0 = Monday ... 6 = Sunday
+    stream_ids: Optional[List[int]] = None
+    teacher_assignments: List[TeacherAssignment] = []
+    teacher_unavailability: List[TeacherUnavailability] = []
+    dry_run: bool = True
+
+class PlannedExam(BaseModel):
+    id: Optional[int] = None
+    subject_id: int
+    stream_id: int
+    room_id: int
+    teacher_id: Optional[int] = None
+    date: date
+    time: time
+    duration: int
+
+class UnscheduledSubject(BaseModel):
+    subject_id: int
+    stream_id: int
+    reason: str
+
+class ScheduleOut(BaseModel):
+    dry_run: bool
+    planned: List[PlannedExam]
+    unscheduled: List[UnscheduledSubject]
+
+class ChangeOut(BaseModel):
+    seq: int
+    entity: str  # exam | room | subject | seating (the seats of exam ``id``)
+    id: int
+    op: str  # create | update | delete; a create may show up as update after compaction
+
+class ChangesOut(BaseModel):
+    seq: int  # pass back as ``since`` on the next poll
+    changes: List[ChangeOut]
+    more: bool = False  # true when the page was cut at ``limit``: poll again right away
+
+class RoomUsageOut(BaseModel):
+    room_id: int
+    room_name: str
+    capacity: int
+    date: date
+    time: time
+    exams: int  # exams booked in the room or overflowing into it at this slot
+    seated: int
+    fill_ratio: Optional[float] = None  # seated / capacity; None for a zero-capacity room
+
+class DayUsageOut(BaseModel):
+    date: date
+    exams: int
+    students: int  # distinct students sitting at least one exam
+    room_slots: int
+    seats: int  # total capacity of the rooms in use, per slot
+    seated: int
+    fill_ratio: Optional[float] = None
+
+class StreamDayOut(BaseModel):
+    stream_id: int
+    stream_name: str
+    date: date
+    exams: int
+    students: int
+
+class TeacherDayOut(BaseModel):
+    teacher_id: int
+    teacher_name: str
+    date: date
+    exams: int
+    minutes: int
+
+class JobCreate(BaseModel):
+    kind: str  # convocations | seats
+    params: dict = {}
+
+class ConvocationExportParams(BaseModel):
+    exam_id: Optional[int] = None
+    stream_id: Optional[int] = None  # exactly one of exam_id / stream_id
+    format: str = Field("zip", pattern="^(zip|pdf)$")
+
+    @model_validator(mode="after")
+    def _one_scope(self):
+        if (self.exam_id is None) == (self.stream_id is None):
+            raise ValueError("give exactly one of exam_id and stream_id")
+        return self
+
+class SeatAllocationParams(BaseModel):
+    exam_ids: List[int] = Field(..., min_length=1)
+
+class UserImportParams(BaseModel):
+    role: str = Field(..., pattern="^(student|teacher)$")
+
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued | running | succeeded | failed | cancelled
+    params: dict
+    progress: int
+    total: Optional[int] = None
+    message: Optional[str] = None
+    result: Optional[dict] = None
+    artifact: Optional[str] = None  # download from /jobs/{id}/artifact
+    attempts: int
+    cancel_requested: bool
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,182 @@
+"""User search by name, email, CNE and Apogée code.
+
+On SQLite the ``users_fts`` FTS5 table (trigram tokenizer, external content
+on ``users``, kept in sync by triggers; see migration 5) answers substring
+queries from its index. Users whose CNE or code equals the query come
+first, then those whose name or email starts with it (both read from plain
+indexes, see migration 7), then the full-text matches: every term of three
+characters or more must occur in one of the columns. Only the first
+``RANK_WINDOW`` matches are ranked by BM25, which costs a few microseconds
+per match, so a term shared by the whole table stays cheap.
+
+Only when nothing matched does a fuzzy pass look for typos: it takes the
+users sharing the most trigrams with the query (at least ``FUZZY_MIN_SHARED``
+of them, reading at most ``FUZZY_GRAM_LIMIT`` users per trigram), then ranks
+them by ``difflib`` similarity between the query and the closest run of words
+in a column, so "mohamad" still finds "Mohamed" and "Studnet" finds "Student".
+
+Queries too short for a trigram, and databases without the FTS table (e.g.
+PostgreSQL), fall back to a LIKE scan.
+"""
+import difflib
+import math
+import re
+
+from sqlalchemy import column, func, inspect, literal_column, or_, select, table, union_all
+from sqlalchemy.orm import Session
+
+from . import models
+from .queries import USER_COLUMNS
+
+RANK_WINDOW = 500
+FUZZY_CANDIDATES = 100
+FUZZY_GRAM_LIMIT = 2000
+FUZZY_MIN_SHARED = 0.3  # share of the query's trigrams a candidate must contain
+FUZZY_MIN_SCORE = 0.7  # difflib ratio against the closest words of the best column
+FIELDS = ("full_name", "email", "cne", "code_apoge")
+
+User = models.User
+users_fts = table("users_fts", column("rowid"))
+_fts = literal_column("users_fts")
+# BM25 weights, in FIELDS order: a hit in the name matters most
+_rank = func.bm25(_fts, 10.0, 5.0, 2.0, 2.0)
+
+_fts_ready = {}  # engine url -> bool
+
+
+def fts_ready(db: Session) -> bool:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _fts_ready:
+        _fts_ready[key] = bind.dialect.name == "sqlite" and inspect(bind).has_table("users_fts")
+    return _fts_ready[key]
+
+
+def _phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _like(text: str) -> str:
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _contains(text: str):
+    pattern = _like(text)
+    return or_(*(getattr(User, f).ilike(pattern, escape="\\") for f in FIELDS))
+
+
+def _trigrams(text: str):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _score(matcher: difflib.SequenceMatcher, width: int, row) -> float:
+    """Best similarity between the query (``matcher``'s second sequence) and as
+    many consecutive words of a column."""
+    best = 0.0
+    for value in (getattr(row, f) or "" for f in FIELDS):
+        words = [w for w in re.split(r"[\W_]+", value.lower()) if w]
+        spans = {" ".join(words[i:i + width]) for i in range(max(len(words) - width + 1, 1))}
+        for span in spans | {value.lower()}:
+            matcher.set_seq1(span)
+            # the quick ratios are upper bounds of ratio(): skip spans that cannot win
+            if matcher.real_quick_ratio() > best and matcher.quick_ratio() > best:
+                best = max(best, matcher.ratio())
+    return best
+
+
+def _fts_select(match: str, role):
+    stmt = (
+        select(*USER_COLUMNS)
+        .select_from(users_fts.join(User, User.id == users_fts.c.rowid))
+        .where(_fts.op("MATCH")(match))
+    )
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    return stmt
+
+
+def _prefix_matches(db: Session, q: str, lowered: str, limit: int, role):
+    """Exact CNE/code hits, then names, then emails starting with the query, each from its index."""
+    upper = lowered + "\U0010ffff"  # sorts after every string starting with ``lowered``
+    name, email = func.lower(User.full_name), func.lower(User.email)
+    passes = (
+        select(*USER_COLUMNS).where(or_(User.cne == q, User.code_apoge == q)).order_by(User.id),
+        select(*USER_COLUMNS).where(name >= lowered, name < upper).order_by(name, User.id),
+        select(*USER_COLUMNS).where(email >= lowered, email < upper).order_by(email, User.id),
+    )
+    rows, seen = [], set()
+    for stmt in passes:
+        if len(rows) >= limit:
+            break
+        if role is not None:
+            stmt = stmt.where(User.role == role)
+        for row in db.execute(stmt.limit(limit)):
+            if row.id not in seen and len(rows) < limit:
+                seen.add(row.id)
+                rows.append(row)
+    return rows
+
+
+def search_users(db: Session, q: str, limit: int = 20, role=None):
+    """Up to ``limit`` UserOut-shaped rows, best match first."""
+    q = " ".join(q.split())
+    terms = q.split(" ")
+    long_terms = [t for t in terms if len(t) >= 3]
+
+    if not long_terms or not fts_ready(db):
+        stmt = select(*USER_COLUMNS).where(*(_contains(t) for t in terms))
+        if role is not None:
+            stmt = stmt.where(User.role == role)
+        return db.execute(stmt.order_by(User.full_name, User.id).limit(limit)).all()
+
+    lowered = q.lower()
+    rows = _prefix_matches(db, q, lowered, limit, role)
+    if len(rows) >= limit:
+        return rows
+
+    found = {r.id for r in rows}
+    exact = _fts_select(" ".join(_phrase(t) for t in long_terms), role).where(
+        *(_contains(t) for t in terms if len(t) < 3)
+    )
+    # matches come in rowid order; past RANK_WINDOW of them only the first window is ranked
+    window = db.scalars(
+        exact.with_only_columns(users_fts.c.rowid).order_by(users_fts.c.rowid).offset(RANK_WINDOW - 1).limit(1)
+    ).first()
+    if window is not None:
+        exact = exact.where(users_fts.c.rowid <= window)
+    if found:
+        exact = exact.where(User.id.notin_(found))
+    rows += db.execute(exact.order_by(_rank, User.id).limit(limit - len(rows))).all()
+
+    grams = _trigrams(q)
+    if rows or len(grams) < 2:
+        return rows
+
+    # one capped index lookup per trigram; users found by the most lookups share the most trigrams
+    hits = union_all(*(
+        select(
+            select(users_fts.c.rowid.label("id"))
+            .where(_fts.op("MATCH")(_phrase(g)))
+            .limit(FUZZY_GRAM_LIMIT)
+            .subquery()
+        )
+        for g in sorted(grams)
+    )).subquery()
+    shared = (
+        select(hits.c.id, func.count().label("shared"))
+        .group_by(hits.c.id)
+        .having(func.count() >= math.ceil(len(grams) * FUZZY_MIN_SHARED))
+        .subquery()
+    )
+    fuzzy = select(*USER_COLUMNS).select_from(shared.join(User, User.id == shared.c.id))
+    if role is not None:
+        fuzzy = fuzzy.where(User.role == role)
+    candidates = db.execute(fuzzy.order_by(shared.c.shared.desc(), User.id).limit(FUZZY_CANDIDATES)).all()
+    matcher = difflib.SequenceMatcher(None, "", lowered)  # the query is analysed once
+    width = len(terms)
+    scored = sorted(
+        ((score, r) for r in candidates if (score := _score(matcher, width, r)) >= FUZZY_MIN_SCORE),
+        key=lambda sr: (-sr[0], sr[1].full_name, sr[1].id),
+    )
+    return [r for _, r in scored[:limit]]
@@ -0,0 +1,101 @@
+"""Seat allocation for exams.
+
+Seats are assigned for a whole exam at once: students of the exam's stream,
+ordered by name, fill the exam's room table by table, then spill over into
+free rooms (largest first) when the stream does not fit. The same inputs
+always produce the same seating, and the result is written with a single
+bulk insert.
+"""
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .changes import record
+from .conflicts import conflict_index
+from .student_schedule import refresh_exams
+
+
+class RoomSeats:
+    def __init__(self, room_id, capacity):
+        self.room_id = room_id
+        self.capacity = capacity
+        self.assigned = 0
+
+
+def pick_rooms(db: Session, exam, needed):
+    """The exam's room plus as many free rooms as needed to seat ``needed`` students."""
+    rooms = [RoomSeats(exam.room.id, exam.room.capacity)]
+    seats = exam.room.capacity
+    if seats >= needed:
+        return rooms
+
+    conflict_index.ensure_loaded(db)
+    candidates = (
+        db.query(models.Room)
+        .filter(models.Room.id != exam.room_id)
+        .order_by(models.Room.capacity.desc(), models.Room.id)
+    )
+    for room in candidates:
+        if seats >= needed:
+            break
+        probe = SimpleNamespace(
+            id=None, room_id=room.id, stream_id=exam.stream_id, teacher_id=None,
+            date=exam.date, time=exam.time, duration=exam.duration,
+        )
+        # only this room matters; the exam's own bookings are ignored
+        busy = [
+            c for c in conflict_index.find(probe, ignore_exam_id=exam.id)
+            if c.kind == "room" and c.resource_id == room.id
+        ]
+        if busy:
+            continue
+        rooms.append(RoomSeats(room.id, room.capacity))
+        seats += room.capacity
+
+    if seats < needed:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Not enough free room capacity: {needed} students, {seats} seats available",
+        )
+    return rooms
+
+
+def allocate_seats(db: Session, exam):
+    """Replace the seating of ``exam`` in one transaction and return the rooms used."""
+    students = (
+        db.query(models.User.id)
+        .filter(models.User.role == "student", models.User.stream_id == exam.stream_id)
+        .order_by(models.User.full_name, models.User.id)
+        .all()
+    )
+
+    with conflict_index.writing(db):
+        rooms = pick_rooms(db, exam, len(students))
+
+        rows = []
+        it = iter(students)
+        for room in rooms:
+            for table in range(1, room.capacity + 1):
+                student = next(it, None)
+                if student is None:
+                    break
+                rows.append({
+                    "student_id": student.id,
+                    "exam_id": exam.id,
+                    "room_id": room.room_id,
+                    "table_number": table,
+                })
+                room.assigned += 1
+
+        db.execute(delete(models.Convocation).where(models.Convocation.exam_id == exam.id))
+        if rows:
+            db.execute(insert(models.Convocation), rows)
+        refresh_exams(db, [exam.id])
+        record(db, "seating", [exam.id])
+        db.commit()
+        conflict_index.set_overflow_rooms(exam, [r.room_id for r in rooms[1:] if r.assigned])
+
+    return [r for r in rooms if r.assigned]
@@ -1,42 +1,93 @@
+"""Reference data every deployment starts with.
+
+Seeding is set-based: one SELECT of the existing keys and at most one
+multi-row INSERT per table, all in a single transaction. The version of the
+seed data that was applied is stored in ``app_meta``. Once it matches,
+startup costs a single primary-key lookup.
+"""
+import hashlib
+import json
+
+from sqlalchemy import insert, select, tuple_
 from sqlalchemy.orm import Session
+
 from . import models
-from .deps import get_password_hash
-
-def seed_streams_subjects(db: Session):
-    streams = {
-        "IAA": ["Deep learning","Optimization","NoSql et ETL","SMA","Langues","Digital skills","python pour le web"],
-        "IMSD": ["Deep learning","Apprentissage automatique","Introduction aux EDP et Contrôle des systèmes linéaires","langues","Optimisation numérique","Droit et éthique de l’IA","Culture digitale"],
-    }
-
-    for s_name, subjects in streams.items():
-        stream = db.query(models.Stream).filter(models.Stream.nom == s_name).first()
-        if not stream:
-            stream = models.Stream(nom=s_name)
-            db.add(stream)
-            db.commit()
-            db.refresh(stream)
-        for sub_name in subjects:
-            exists = db.query(models.Subject).filter(models.Subject.stream_id == stream.id, models.Subject.name == sub_name).first()
-            if not exists:
-                db.add(models.Subject(name=sub_name, stream_id=stream.id))
-        db.commit()
-
-def seed_rooms(db: Session):
-    for r in [("Amphi A", 100), ("Salle 1", 40), ("Salle 2", 40)]:
-        name, cap = r
-        exists = db.query(models.Room).filter(models.Room.name == name).first()
-        if not exists:
-            db.add(models.Room(name=name, capacity=cap))
-    db.commit()
+from .cluster import touch
+from .refdata import refdata
+
+STREAMS = {
+    "IAA": ["Deep learning","Optimization","NoSql et ETL","SMA","Langues","Digital skills","python pour le web"],
+    "IMSD": ["Deep learning","Apprentissage automatique","Introduction aux EDP et Contrôle des systèmes linéaires","langues","Optimisation numérique","Droit et éthique de l’IA","Culture digitale"],
+}
+ROOMS = [("Amphi A", 100), ("Salle 1", 40), ("Salle 2", 40)]
+
+DEFAULT_ADMIN_EMAIL = "admin@example.com"
+# bcrypt of the default password "admin123", precomputed so a cold start never
+# pays for a hash; login re-hashes it if BCRYPT_ROUNDS differs
+DEFAULT_ADMIN_HASH = "$2b$12$GKSDCOSKTYfD7EaUmyCnq.x4XxDM5KgpiSSpSDZM1jN2fgyOmKitu"
+
+SEED_VERSION_KEY = "seed_version"
+# changes whenever the seed data above does
+SEED_VERSION = hashlib.sha256(
+    json.dumps([STREAMS, ROOMS, DEFAULT_ADMIN_EMAIL], ensure_ascii=False).encode()
+).hexdigest()[:16]
+
+
+def seed_streams_subjects(db: Session) -> int:
+    existing = {nom for (nom,) in db.execute(select(models.Stream.nom).where(models.Stream.nom.in_(STREAMS)))}
+    missing = [{"nom": nom} for nom in STREAMS if nom not in existing]
+    if missing:
+        db.execute(insert(models.Stream), missing)
+    stream_ids = dict(db.execute(select(models.Stream.nom, models.Stream.id).where(models.Stream.nom.in_(STREAMS))).all())
 
-def seed_default_admin(db: Session):
-    admin = db.query(models.User).filter(models.User.role == "admin").first()
-    if not admin:
-        admin = models.User(
-            full_name="Default Admin",
-            email="admin@example.com",
-            hashed_password=get_password_hash("admin123"),
-            role="admin",
+    wanted = [(stream_ids[s_name], sub_name) for s_name, subjects in STREAMS.items() for sub_name in subjects]
+    existing = set(db.execute(
+        select(models.Subject.stream_id, models.Subject.name).where(
+            tuple_(models.Subject.stream_id, models.Subject.name).in_(wanted)
         )
-        db.add(admin)
-        db.commit()
+    ).all())
+    subjects = [{"stream_id": sid, "name": name} for sid, name in wanted if (sid, name) not in existing]
+    if subjects:
+        db.execute(insert(models.Subject), subjects)
+    return len(missing) + len(subjects)
+
+
+def seed_rooms(db: Session) -> int:
+    names = [name for name, _ in ROOMS]
+    existing = {name for (name,) in db.execute(select(models.Room.name).where(models.Room.name.in_(names)))}
+    missing = [{"name": name, "capacity": cap} for name, cap in ROOMS if name not in existing]
+    if missing:
+        db.execute(insert(models.Room), missing)
+    return len(missing)
+
+
+def seed_default_admin(db: Session) -> int:
+    if db.execute(select(models.User.id).where(models.User.role == "admin").limit(1)).first():
+        return 0
+    db.execute(insert(models.User).values(
+        full_name="Default Admin",
+        email=DEFAULT_ADMIN_EMAIL,
+        hashed_password=DEFAULT_ADMIN_HASH,
+        role="admin",
+    ))
+    return 1
+
+
+def seed(db: Session) -> bool:
+    """Apply the seed data unless this version already was; True if anything ran."""
+    marker = db.get(models.AppMeta, SEED_VERSION_KEY)
+    if marker is not None and marker.value == SEED_VERSION:
+        return False
+
+    inserted = seed_streams_subjects(db) + seed_rooms(db) + seed_default_admin(db)
+    if inserted:
+        touch(db, "refdata")
+    if marker is None:
+        db.add(models.AppMeta(key=SEED_VERSION_KEY, value=SEED_VERSION))
+    else:
+        marker.value = SEED_VERSION
+    db.commit()
+    # Core inserts bypass the mapper events that normally invalidate reference data
+    if inserted:
+        refdata.bump()
+    return True
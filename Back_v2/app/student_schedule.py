@@ -0,0 +1,126 @@
+"""Materialized per-student timetable behind GET /exams/student.
+
+Each row is one exam of a student's stream, already serialized as
+``StudentExamOut`` with the student's seat, keyed by (student, date, time,
+exam). Serving a timetable is then a single primary-key range read and a
+string join, with no joins and no per-row validation.
+
+The table is a projection, so every write path that changes what a student
+sees refreshes it inside its own transaction, before committing:
+
+* exams created, edited, deleted or scheduled -> ``refresh_exams``
+* seats allocated -> ``refresh_exams``
+* students registered or imported -> ``refresh_students``
+
+Core bulk writes skip mapper events, which is why the calls are explicit.
+"""
+import json
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .queries import exam_query
+
+BATCH = 5_000
+REBUILD_CHUNK = 50  # exams per refresh during a rebuild
+_SEAT_FIELDS = ("table_number", "seat_room")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _room_payloads(db: Session):
+    return {r.id: _dumps(schemas.RoomOut.model_validate(r).model_dump(mode="json")) for r in db.query(models.Room)}
+
+
+def _write(db: Session, exams, students_by_stream, seats):
+    """Insert one row per (exam, student of its stream); ``seats`` maps (student, exam) -> (room_id, table)."""
+    rooms = _room_payloads(db) if seats else {}
+    conn = db.connection()  # Core executemany: the ORM bulk path costs as much again
+    table = models.StudentSchedule.__table__
+    rows = []
+    for exam in exams:
+        base = schemas.StudentExamOut.model_validate(exam).model_dump(mode="json")
+        unseated = _dumps(base)
+        # seat fields come last: a seated row is the shared prefix plus its seat
+        prefix = _dumps({k: v for k, v in base.items() if k not in _SEAT_FIELDS})[:-1]
+        for student_id in students_by_stream.get(exam.stream_id, ()):
+            seat = seats.get((student_id, exam.id))
+            if seat is None:
+                payload = unseated
+            else:
+                room_id, number = seat
+                payload = f'{prefix},"table_number":{number:d},"seat_room":{rooms[room_id or exam.room_id]}}}'
+            rows.append({
+                "student_id": student_id, "exam_id": exam.id,
+                "date": exam.date, "time": exam.time, "payload": payload,
+            })
+            if len(rows) >= BATCH:
+                conn.execute(insert(table), rows)
+                rows = []
+    if rows:
+        conn.execute(insert(table), rows)
+
+
+def _students_by_stream(db: Session, condition):
+    by_stream = {}
+    for sid, stream_id in db.execute(
+        select(models.User.id, models.User.stream_id).where(models.User.role == "student", condition)
+    ):
+        by_stream.setdefault(stream_id, []).append(sid)
+    return by_stream
+
+
+def _seats(db: Session, condition):
+    return {
+        (student_id, exam_id): (room_id, number)
+        for student_id, exam_id, room_id, number in db.execute(
+            select(models.Convocation.student_id, models.Convocation.exam_id,
+                   models.Convocation.room_id, models.Convocation.table_number).where(condition)
+        )
+    }
+
+
+def refresh_exams(db: Session, exam_ids):
+    """Recompute every row of ``exam_ids``; ids of deleted exams just lose their rows."""
+    exam_ids = list(set(exam_ids))
+    if not exam_ids:
+        return
+    db.flush()
+    db.execute(delete(models.StudentSchedule).where(models.StudentSchedule.exam_id.in_(exam_ids)))
+    exams = exam_query(db).filter(models.Exam.id.in_(exam_ids)).all()
+    if not exams:
+        return
+
+    students = _students_by_stream(db, models.User.stream_id.in_(list({e.stream_id for e in exams})))
+    _write(db, exams, students, _seats(db, models.Convocation.exam_id.in_(exam_ids)))
+
+
+def refresh_students(db: Session, student_ids):
+    """Recompute the whole timetable of ``student_ids`` (e.g. after they were registered)."""
+    student_ids = list(set(student_ids))
+    if not student_ids:
+        return
+    db.flush()
+    db.execute(delete(models.StudentSchedule).where(models.StudentSchedule.student_id.in_(student_ids)))
+    students = _students_by_stream(db, models.User.id.in_(student_ids))
+    if not students:
+        return
+
+    exams = exam_query(db).filter(models.Exam.stream_id.in_(list(students))).all()
+    _write(db, exams, students, _seats(db, models.Convocation.student_id.in_(student_ids)))
+
+
+def rebuild(db: Session):
+    """Recompute the whole table (backfill, or after writes that bypassed the hooks)."""
+    db.execute(delete(models.StudentSchedule))
+    exam_ids = [eid for (eid,) in db.execute(select(models.Exam.id).order_by(models.Exam.id))]
+    for i in range(0, len(exam_ids), REBUILD_CHUNK):
+        refresh_exams(db, exam_ids[i:i + REBUILD_CHUNK])
+    db.commit()
+
+
+def timetable_json(payloads) -> bytes:
+    return ("[" + ",".join(payloads) + "]").encode("utf-8")
@@ -0,0 +1,12 @@
+"""Load-testing and benchmark suite.
+
+Generates a synthetic campus into a scratch SQLite database and drives the
+real application in-process, reporting latency percentiles, throughput and
+SQL statement counts per endpoint as JSON::
+
+    cd Back_v2
+    python -m bench --students 10000 --out bench-10k.json
+
+Results from two commits can be compared field by field; ``--seed`` makes
+the generated data and the request mix reproducible.
+"""
@@ -0,0 +1,90 @@
+"""python -m bench [options] -- see bench/__init__.py."""
+import argparse
+import datetime
+import json
+import platform
+import shutil
+import sys
+import time
+
+from .scratch import git_commit, use_scratch_database
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench", description="Synthetic load test of the exams API")
+    p.add_argument("--streams", type=int, default=10)
+    p.add_argument("--subjects-per-stream", type=int, default=8)
+    p.add_argument("--students", type=int, default=10_000)
+    p.add_argument("--teachers", type=int, default=200)
+    p.add_argument("--room-capacity", type=int, default=60)
+    p.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    p.add_argument("--logins", type=int, default=100, help="login requests (bcrypt-bound)")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--workdir", help="scratch directory (default: a fresh temporary one)")
+    p.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    p.add_argument("--out", help="write the JSON report here instead of stdout")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = use_scratch_database(args.workdir)
+
+    from fastapi.testclient import TestClient
+
+    from app import models
+    from app.database import engine
+    from app.main import app
+    from app.migrations import migrate
+
+    from .datagen import Scale, generate
+    from .runner import endpoints, login_endpoint, measure
+
+    scale = Scale(
+        streams=args.streams, subjects_per_stream=args.subjects_per_stream, students=args.students,
+        teachers=args.teachers, room_capacity=args.room_capacity, seed=args.seed,
+    )
+    t0 = time.perf_counter()
+    models.Base.metadata.create_all(bind=engine)
+    migrate(engine)
+    campus = generate(engine, scale)
+    generate_s = time.perf_counter() - t0
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "scale": scale.as_dict(),
+        "generate_s": round(generate_s, 2),
+        "endpoints": {},
+    }
+    try:
+        with TestClient(app) as client:
+            tokens = {}
+            sample = campus.students[:: max(1, len(campus.students) // max(1, args.logins))][: args.logins]
+            login = login_endpoint(client, campus, sample, tokens)
+            report["endpoints"][login.name] = measure(login, args.logins, args.concurrency)
+            # whatever the login pass could not serve (e.g. 503 under back-pressure) is retried serially
+            for i, (uid, _, _) in enumerate(sample):
+                if uid not in tokens:
+                    login.call(i)
+
+            for endpoint in endpoints(client, campus, tokens, args.seed):
+                report["endpoints"][endpoint.name] = measure(endpoint, args.requests, args.concurrency)
+    finally:
+        engine.dispose()
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
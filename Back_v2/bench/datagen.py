@@ -0,0 +1,136 @@
+"""Synthetic campus generator.
+
+Everything is written with multi-row Core INSERTs in large batches, so a
+100k-student campus with its convocations takes seconds. Every synthetic
+user shares one password hash: bcrypt would otherwise dominate generation.
+"""
+import datetime
+import math
+import random
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import analytics, models, student_schedule
+from app.hashing import pwd_context
+
+BATCH = 10_000
+PASSWORD = "bench-password"
+SLOTS = (datetime.time(9, 0), datetime.time(14, 0))
+
+
+@dataclass
+class Scale:
+    streams: int = 10
+    subjects_per_stream: int = 8
+    students: int = 10_000
+    teachers: int = 200
+    room_capacity: int = 60
+    rooms: int = 0  # 0 = just enough to seat the largest stream
+    seating: bool = True  # convocations and materialized timetables (students x exams rows)
+    start_date: datetime.date = datetime.date(2026, 6, 1)
+    seed: int = 42
+
+    def as_dict(self):
+        d = asdict(self)
+        d["start_date"] = self.start_date.isoformat()
+        return d
+
+
+@dataclass
+class Campus:
+    """Ids the load runner needs to build requests."""
+    students: list  # (id, email, stream_id)
+    exams_by_stream: dict  # stream_id -> [exam_id]
+    password: str = PASSWORD
+
+
+def _insert(conn, model, rows):
+    for i in range(0, len(rows), BATCH):
+        conn.execute(insert(model), rows[i:i + BATCH])
+
+
+def generate(engine: Engine, scale: Scale) -> Campus:
+    rng = random.Random(scale.seed)
+    hashed = pwd_context.hash(PASSWORD)
+
+    per_stream = math.ceil(scale.students / scale.streams)
+    n_rooms = max(scale.rooms, math.ceil(per_stream / scale.room_capacity))
+
+    with engine.begin() as conn:
+        stream_ids = list(range(1, scale.streams + 1))
+        _insert(conn, models.Stream, [{"id": i, "nom": f"BENCH-{i:03d}"} for i in stream_ids])
+        room_ids = list(range(1, n_rooms + 1))
+        _insert(conn, models.Room, [
+            {"id": i, "name": f"Bench room {i}", "capacity": scale.room_capacity} for i in room_ids
+        ])
+
+        subjects = []
+        for sid in stream_ids:
+            for k in range(scale.subjects_per_stream):
+                subjects.append({"id": len(subjects) + 1, "name": f"Subject {sid}.{k + 1}", "stream_id": sid})
+        _insert(conn, models.Subject, subjects)
+
+        users = []
+        teacher_ids = []
+        for i in range(scale.teachers):
+            uid = len(users) + 1
+            teacher_ids.append(uid)
+            users.append({
+                "id": uid, "full_name": f"Teacher {i}", "email": f"teacher{i}@bench.example.com",
+                "hashed_password": hashed, "role": "teacher", "stream_id": rng.choice(stream_ids),
+            })
+        students = []
+        for i in range(scale.students):
+            uid = len(users) + 1
+            sid = stream_ids[i % scale.streams]
+            email = f"student{i}@bench.example.com"
+            students.append((uid, email, sid))
+            users.append({
+                "id": uid, "full_name": f"Student {i:06d}", "email": email, "hashed_password": hashed,
+                "role": "student", "code_apoge": f"{i:08d}", "cne": f"B{i:09d}", "stream_id": sid,
+            })
+        _insert(conn, models.User, users)
+
+        # each stream sits one subject per half-day; every stream uses every room at once,
+        # so streams are offset by whole days to keep rooms free of double bookings
+        exams = []
+        exams_by_stream = {sid: [] for sid in stream_ids}
+        for s in subjects:
+            k = len(exams_by_stream[s["stream_id"]])
+            slot = (s["stream_id"] - 1) * scale.subjects_per_stream + k
+            exam_id = len(exams) + 1
+            exams_by_stream[s["stream_id"]].append(exam_id)
+            exams.append({
+                "id": exam_id, "subject_id": s["id"], "stream_id": s["stream_id"],
+                "teacher_id": rng.choice(teacher_ids) if teacher_ids else None, "room_id": room_ids[0],
+                "date": scale.start_date + datetime.timedelta(days=slot // len(SLOTS)),
+                "time": SLOTS[slot % len(SLOTS)], "duration": 120,
+            })
+        _insert(conn, models.Exam, exams)
+        if scale.seating:
+            by_stream = {sid: [] for sid in stream_ids}
+            for uid, _, sid in students:
+                by_stream[sid].append(uid)
+            convocations = []
+            for exam in exams:
+                for seat, uid in enumerate(by_stream[exam["stream_id"]]):
+                    room, table = divmod(seat, scale.room_capacity)
+                    convocations.append({
+                        "student_id": uid, "exam_id": exam["id"],
+                        "room_id": room_ids[room], "table_number": table + 1,
+                    })
+                if len(convocations) >= BATCH:
+                    _insert(conn, models.Convocation, convocations)
+                    convocations = []
+            _insert(conn, models.Convocation, convocations)
+
+    # the inserts above bypass the write paths and the change log that keep
+    # the student timetables and the analytics rollups up to date
+    with Session(engine) as db:
+        student_schedule.rebuild(db)
+        analytics.rebuild(db)
+
+    return Campus(students=students, exams_by_stream=exams_by_stream)
@@ -0,0 +1,97 @@
+"""In-process load runner.
+
+Requests go through the real ASGI app with ``TestClient``, so routing,
+dependencies, serialization and the database are all measured; only the
+network is not. Each endpoint is timed under ``concurrency`` client threads,
+then probed once more on its own to count the SQL statements it issues.
+"""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from app.queries import QueryCounter
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    # i -> response; i is the request number, used to pick a user/exam deterministically
+    call: Callable[[int], object]
+    expect: int = 200
+
+
+def measure(endpoint: Endpoint, requests: int, concurrency: int) -> Dict:
+    latencies = []
+    statuses = {}
+
+    def one(i):
+        t0 = time.perf_counter()
+        response = endpoint.call(i)
+        return time.perf_counter() - t0, response.status_code
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, status in pool.map(one, range(requests)):
+            latencies.append(elapsed * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    wall = time.perf_counter() - wall
+
+    with QueryCounter() as counter:
+        endpoint.call(requests)
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": requests - statuses.get(endpoint.expect, 0),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_rps": round(requests / wall, 1),
+        "queries_per_request": counter.count,
+    }
+
+
+def endpoints(client, campus, tokens: Dict[int, str], seed: int) -> List[Endpoint]:
+    rng = random.Random(seed)
+    students = campus.students
+    # request i always maps to the same (student, exam) pair for a given seed
+    logged_in = [s for s in students if s[0] in tokens]
+    picks = [rng.choice(logged_in) for _ in range(4096)]
+    exams = [rng.choice(campus.exams_by_stream[sid]) for _, _, sid in picks]
+
+    def auth(i):
+        return {"Authorization": f"Bearer {tokens[picks[i % len(picks)][0]]}"}
+
+    return [
+        Endpoint("GET /exams/student", lambda i: client.get("/exams/student", headers=auth(i))),
+        Endpoint("GET /exams/", lambda i: client.get("/exams/")),
+        Endpoint("GET /exams/?limit=50", lambda i: client.get("/exams/", params={"limit": 50})),
+        Endpoint(
+            "GET /exams/{id}/convocation",
+            lambda i: client.get(f"/exams/{exams[i % len(exams)]}/convocation", headers=auth(i)),
+        ),
+    ]
+
+
+def login_endpoint(client, campus, sample: List[tuple], tokens: Dict[int, str]) -> Endpoint:
+    def call(i):
+        uid, email, _ = sample[i % len(sample)]
+        response = client.post("/auth/login", json={"email": email, "password": campus.password})
+        if response.status_code == 200:
+            tokens[uid] = response.json()["access_token"]
+        return response
+
+    return Endpoint("POST /auth/login", call)
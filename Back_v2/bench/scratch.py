@@ -0,0 +1,32 @@
+"""Environment shared by the benchmarks: scratch database and run metadata.
+
+The engines and caches read their configuration when ``app`` is imported,
+so ``use_scratch_database`` must run before anything from ``app`` is.
+"""
+import os
+import subprocess
+import tempfile
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def use_scratch_database(workdir=None) -> str:
+    """Point the app at an empty SQLite file under ``workdir``; returns the directory."""
+    workdir = workdir or tempfile.mkdtemp(prefix="exams-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    db_path = os.path.join(workdir, "bench.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.pop("DATABASE_READ_URL", None)
+    os.environ["CONVOCATION_CACHE_DIR"] = os.path.join(workdir, "pdf-cache")
+    return workdir
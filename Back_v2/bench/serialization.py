@@ -0,0 +1,125 @@
+"""Serialization throughput of the exam and user listings, old path vs new.
+
+    python -m bench.serialization --exams 2000 --users 20000
+
+"orm" is what the list handlers did before they moved to column projections:
+hydrate entities with their relationships, ``model_validate`` each row, then
+let FastAPI validate the list against ``response_model`` again and encode it
+with the standard json module. "projection" is what they do now: select the
+printed columns only, shape tuples into dicts and encode with orjson. Both
+produce the same JSON; this is checked before timing.
+"""
+import argparse
+import json
+import math
+import shutil
+import sys
+import time
+from typing import List
+
+from .scratch import git_commit, use_scratch_database
+
+
+def _rate(fn, rows, min_seconds):
+    """Rows per second of ``fn`` over enough repetitions to last ``min_seconds``."""
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return rows * runs / elapsed
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.serialization")
+    p.add_argument("--exams", type=int, default=2000)
+    p.add_argument("--users", type=int, default=20_000)
+    p.add_argument("--min-seconds", type=float, default=2.0, help="time spent on each measurement")
+    p.add_argument("--workdir")
+    p.add_argument("--out")
+    args = p.parse_args(argv)
+    workdir = use_scratch_database(args.workdir)
+    try:
+        report = _run(args)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+def _run(args):
+
+    import orjson
+    from pydantic import TypeAdapter
+
+    from app import models, schemas
+    from app.database import SessionLocal, engine
+    from app.migrations import migrate
+    from app.queries import USER_COLUMNS, exam_query, exam_row_dict, exam_rows
+    from app.routers.exams import EXAM_ORDER
+
+    from .datagen import Scale, generate
+
+    streams = max(1, math.ceil(args.exams / 50))
+    scale = Scale(
+        streams=streams, subjects_per_stream=math.ceil(args.exams / streams),
+        students=args.users, teachers=0, seating=False,
+    )
+    models.Base.metadata.create_all(bind=engine)
+    migrate(engine)
+    generate(engine, scale)
+
+    exams_out = TypeAdapter(List[schemas.ExamOut])
+    users_out = TypeAdapter(List[schemas.UserOut])
+
+    def respond(adapter, items):
+        # FastAPI 0.110: validate against response_model, dump in json mode, json.dumps
+        return json.dumps(adapter.dump_python(adapter.validate_python(items), mode="json")).encode()
+
+    with SessionLocal() as db:
+        def exams_orm():
+            db.expunge_all()
+            exams = exam_query(db).order_by(*EXAM_ORDER).all()
+            return respond(exams_out, [schemas.ExamOut.model_validate(e) for e in exams])
+
+        def exams_projection():
+            return orjson.dumps([exam_row_dict(r) for r in db.execute(exam_rows().order_by(*EXAM_ORDER))])
+
+        def users_orm():
+            db.expunge_all()
+            users = db.query(models.User).order_by(models.User.id).all()
+            return respond(users_out, users)
+
+        def users_projection():
+            return orjson.dumps([r._asdict() for r in db.query(*USER_COLUMNS).order_by(models.User.id)])
+
+        cases = {
+            "exams": (exams_orm, exams_projection, db.query(models.Exam).count()),
+            "users": (users_orm, users_projection, db.query(models.User).count()),
+        }
+        report = {"commit": git_commit(), "min_seconds": args.min_seconds, "results": {}}
+        for name, (before, after, rows) in cases.items():
+            if json.loads(before()) != json.loads(after()):
+                raise SystemExit(f"{name}: the two paths disagree")
+            orm_rate = _rate(before, rows, args.min_seconds)
+            projection_rate = _rate(after, rows, args.min_seconds)
+            report["results"][name] = {
+                "rows": rows,
+                "orm_rows_per_s": round(orm_rate),
+                "projection_rows_per_s": round(projection_rate),
+                "speedup": round(projection_rate / orm_rate, 2),
+            }
+    engine.dispose()
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(main())
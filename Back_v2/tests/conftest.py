@@ -0,0 +1,84 @@
+"""Shared fixtures: the app on a throwaway SQLite file, emptied before every test.
+
+The engines are built when ``app.database`` is imported, so the environment
+is set up here, before anything from ``app`` is.
+"""
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="exams-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_workdir, 'test.db')}",
+    CONVOCATION_CACHE_DIR=os.path.join(_workdir, "pdf-cache"),
+    JOBS_DIR=os.path.join(_workdir, "jobs"),
+    STARTUP_LOCK_FILE=os.path.join(_workdir, "startup.lock"),
+    JOB_WORKERS="0",
+    CONVOCATION_WORKERS="2",
+    CACHE_POLL_INTERVAL="0",
+    BCRYPT_ROUNDS="4",
+)
+os.environ.pop("DATABASE_READ_URL", None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models  # noqa: E402
+from app.conflicts import conflict_index  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.deps import clear_principals  # noqa: E402
+from app.main import app  # noqa: E402
+from app.refdata import refdata  # noqa: E402
+from app.seeds import DEFAULT_ADMIN_EMAIL  # noqa: E402
+
+
+def wipe():
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    conflict_index.reset()
+    refdata.bump()
+    clear_principals()
+
+
+@pytest.fixture
+def empty_db():
+    """An empty schema; startup seeds it once a client is opened."""
+    wipe()
+
+
+@pytest.fixture
+def client(empty_db):
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db(empty_db):
+    with SessionLocal() as session:
+        yield session
+
+
+def login(client, email, password):
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+@pytest.fixture
+def admin(client):
+    return login(client, DEFAULT_ADMIN_EMAIL, "admin123")
+
+
+def add_students(db, stream_id, count, prefix="student"):
+    """``count`` students of ``stream_id``, committed; returns their ids."""
+    users = [
+        models.User(
+            full_name=f"{prefix.title()} {i:04}", email=f"{prefix}{i}.{stream_id}@example.com",
+            hashed_password="x", role="student", stream_id=stream_id,
+        )
+        for i in range(count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return [u.id for u in users]
@@ -0,0 +1,71 @@
+from app import analytics, cluster, models
+from app.database import SessionLocal
+
+from .conftest import add_students
+
+
+def _exam_payload(db, day):
+    stream = db.query(models.Stream).order_by(models.Stream.id).first()
+    subject = db.query(models.Subject).filter(models.Subject.stream_id == stream.id).first()
+    room = db.query(models.Room).filter(models.Room.name == "Salle 1").one()
+    return stream.id, {
+        "subject_id": subject.id, "stream_id": stream.id, "room_id": room.id,
+        "date": day, "time": "09:00:00", "duration": 120,
+    }
+
+
+def _days(client, admin, path):
+    response = client.get(f"/analytics/{path}", headers=admin)
+    assert response.status_code == 200, response.text
+    return {row["date"]: row for row in response.json()}
+
+
+def test_moving_an_exam_updates_its_old_and_new_day(client, admin, db):
+    stream, payload = _exam_payload(db, "2026-06-01")
+    add_students(db, stream, 30)
+    exam = client.post("/exams/", headers=admin, json=payload).json()["id"]
+    assert client.post(f"/exams/{exam}/seats", headers=admin).status_code == 200
+
+    streams = _days(client, admin, "streams")
+    assert [(d, r["exams"], r["students"]) for d, r in streams.items()] == [("2026-06-01", 1, 30)]
+
+    payload["date"] = "2026-06-03"
+    assert client.put(f"/exams/{exam}", headers=admin, json=payload).status_code == 200
+
+    streams = _days(client, admin, "streams")
+    assert [(d, r["exams"], r["students"]) for d, r in streams.items()] == [("2026-06-03", 1, 30)]
+    rooms = _days(client, admin, "rooms")
+    assert [(d, r["seated"]) for d, r in rooms.items()] == [("2026-06-03", 30)]
+    days = _days(client, admin, "days")
+    assert list(days) == ["2026-06-03"]
+
+
+def _generation(db):
+    db.expire_all()
+    row = db.get(models.CacheGeneration, "analytics")
+    return row.generation if row is not None else 0
+
+
+def test_an_up_to_date_refresh_only_reads(client, db):
+    analytics.refresh(db)
+    before = _generation(db)
+    assert analytics.refresh(db) == 0
+    assert _generation(db) == before
+
+
+def test_a_refresh_done_by_another_worker_meanwhile_is_not_repeated(client, admin, db, monkeypatch):
+    _, payload = _exam_payload(db, "2026-06-01")
+    analytics.refresh(db)
+    assert client.post("/exams/", headers=admin, json=payload).status_code == 200
+
+    def hold_after_another_worker(session, name):
+        # the other worker got the lock first and folded the same changes in
+        with SessionLocal() as other:
+            cluster.hold(other, name)
+            analytics._rebuild(other, other.scalar(analytics.latest_seq_query()))
+            other.commit()
+        cluster.hold(session, name)
+
+    monkeypatch.setattr(analytics, "hold", hold_after_another_worker)
+    assert analytics.refresh(db) == 0
+    assert db.query(models.StreamDayRollup).count() == 1
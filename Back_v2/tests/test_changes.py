@@ -0,0 +1,54 @@
+import datetime
+
+from app import analytics, changes, models
+
+
+def _add_rooms(client, count, prefix="Room"):
+    for i in range(count):
+        assert client.post("/rooms/", json={"name": f"{prefix} {i}", "capacity": 10}).status_code == 200
+    return client.get("/changes/").json()["seq"]
+
+
+def test_prune_keeps_the_newest_rows(client, db, monkeypatch):
+    latest = _add_rooms(client, 5)
+    monkeypatch.setattr(changes, "MAX_ROWS", 2)
+
+    assert changes.prune(db) == 3
+    assert [seq for (seq,) in db.query(models.Change.seq).order_by(models.Change.seq)] == [latest - 1, latest]
+    assert changes.prune(db) == 0
+
+
+def test_prune_by_age_keeps_the_latest_change(client, db, monkeypatch):
+    latest = _add_rooms(client, 3)
+    monkeypatch.setattr(changes, "RETENTION_DAYS", 0)
+    db.query(models.Change).update({"at": datetime.datetime.utcnow() - datetime.timedelta(days=1)})
+    db.commit()
+
+    changes.prune(db)
+    assert [seq for (seq,) in db.query(models.Change.seq)] == [latest]
+    assert client.get("/changes/").json()["seq"] == latest
+
+
+def test_cursor_behind_the_pruned_log_is_gone(client, db, monkeypatch):
+    start = client.get("/changes/").json()["seq"] or 0
+    latest = _add_rooms(client, 4)
+    monkeypatch.setattr(changes, "MAX_ROWS", 1)
+    changes.prune(db)
+
+    assert client.get("/changes/", params={"since": start}).status_code == 410
+    assert client.get("/changes/", params={"since": latest - 2}).status_code == 410
+    # the last pruned seq itself is fine: everything after it was kept
+    response = client.get("/changes/", params={"since": latest - 1})
+    assert response.status_code == 200
+    assert response.json()["seq"] == latest
+
+
+def test_analytics_rebuild_after_its_cursor_was_pruned(client, db, monkeypatch):
+    _add_rooms(client, 1)
+    analytics.refresh(db)
+    _add_rooms(client, 3, prefix="Later")
+    monkeypatch.setattr(changes, "MAX_ROWS", 1)
+    changes.prune(db)
+
+    assert analytics.refresh(db) is None
+    assert analytics.refresh(db) == 0
@@ -0,0 +1,104 @@
+import datetime
+from types import SimpleNamespace
+
+from app import models
+from app.conflicts import ConflictIndex, sweep
+
+DAY = datetime.date(2026, 6, 1)
+
+
+def exam(id, start, duration=120, room_id=1, stream_id=1, teacher_id=None, date=DAY):
+    return SimpleNamespace(
+        id=id, room_id=room_id, stream_id=stream_id, teacher_id=teacher_id,
+        date=date, time=datetime.time(*divmod(start, 60)), duration=duration,
+    )
+
+
+def index(*exams):
+    idx = ConflictIndex(loaded=True)
+    for e in exams:
+        idx.add(e)
+    return idx
+
+
+def kinds(conflicts):
+    return sorted((c.kind, c.resource_id, c.conflicting_exam_id) for c in conflicts)
+
+
+def test_back_to_back_exams_do_not_overlap():
+    idx = index(exam(1, 9 * 60))  # 09:00-11:00
+    assert idx.find(exam(None, 11 * 60)) == []
+    assert idx.find(exam(None, 7 * 60)) == []  # 07:00-09:00
+    assert kinds(idx.find(exam(None, 10 * 60 + 59))) == [("room", 1, 1), ("stream", 1, 1)]
+
+
+def test_long_booking_spans_later_starts():
+    # the long exam starts first; later short ones sit between it and the probe
+    idx = index(
+        exam(1, 8 * 60, duration=8 * 60, room_id=1, stream_id=1),  # 08:00-16:00
+        exam(2, 9 * 60, duration=30, room_id=1, stream_id=2),
+        exam(3, 10 * 60, duration=30, room_id=1, stream_id=3),
+    )
+    found = idx.find(exam(None, 15 * 60, duration=30, room_id=1, stream_id=9))
+    assert kinds(found) == [("room", 1, 1)]
+
+
+def test_other_days_and_resources_are_free():
+    idx = index(exam(1, 9 * 60, room_id=1, stream_id=1, teacher_id=5))
+    assert idx.find(exam(None, 9 * 60, room_id=2, stream_id=2, teacher_id=6)) == []
+    assert idx.find(exam(None, 9 * 60, date=DAY + datetime.timedelta(days=1))) == []
+    assert kinds(idx.find(exam(None, 9 * 60, room_id=2, stream_id=2, teacher_id=5))) == [("teacher", 5, 1)]
+
+
+def test_overflow_room_is_booked():
+    idx = index()
+    idx.set_overflow_rooms(exam(1, 9 * 60, room_id=1), [4])
+    assert kinds(idx.find(exam(None, 10 * 60, room_id=4, stream_id=2))) == [("room", 4, 1)]
+
+    idx.set_overflow_rooms(exam(1, 9 * 60, room_id=1), [])
+    assert idx.find(exam(None, 10 * 60, room_id=4, stream_id=2)) == []
+
+
+def test_moving_an_exam_ignores_its_own_booking():
+    idx = index(exam(1, 9 * 60))
+    assert idx.find(exam(1, 10 * 60), ignore_exam_id=1) == []
+
+    # its overflow rooms move with it
+    idx.set_overflow_rooms(exam(1, 9 * 60), [4])
+    idx.add(exam(2, 14 * 60, room_id=4, stream_id=2))
+    assert kinds(idx.find(exam(1, 14 * 60), ignore_exam_id=1)) == [("room", 4, 2)]
+
+
+def test_removed_exam_frees_its_slot():
+    idx = index(exam(1, 9 * 60))
+    idx.remove(1)
+    assert idx.find(exam(None, 9 * 60)) == []
+
+
+def test_sweep_reports_each_overlapping_pair(db):
+    stream = models.Stream(nom="S")
+    db.add(stream)
+    db.flush()
+    subject = models.Subject(name="Sub", stream_id=stream.id)
+    rooms = [models.Room(name="R1", capacity=10), models.Room(name="R2", capacity=10)]
+    db.add_all([subject, *rooms])
+    db.flush()
+
+    def add(start, duration, room):
+        e = models.Exam(
+            subject_id=subject.id, stream_id=stream.id, room_id=room.id, date=DAY,
+            time=datetime.time(*divmod(start, 60)), duration=duration,
+        )
+        db.add(e)
+        db.flush()
+        return e
+
+    first = add(8 * 60, 8 * 60, rooms[0])
+    add(9 * 60, 30, rooms[1])
+    last = add(16 * 60, 60, rooms[0])  # starts as the first one ends
+    db.commit()
+
+    pairs = sorted((c.kind, c.exam_id, c.conflicting_exam_id) for c in sweep(db))
+    # only the stream is shared by the first two; the last one touches the first
+    assert pairs == [("stream", first.id + 1, first.id)]
+    assert all(last.id not in (c.exam_id, c.conflicting_exam_id) for c in sweep(db))
@@ -0,0 +1,101 @@
+import base64
+import io
+import re
+import zipfile
+import zlib
+
+from app import models
+from app.convocations import PdfMerger, render_pages, shutdown_executor
+
+from .conftest import add_students
+
+
+def pdf_pages(pdf: bytes):
+    """The decoded content stream of every page, in page order; checks the structure on the way."""
+    assert pdf.startswith(b"%PDF-") and pdf.rstrip().endswith(b"%%EOF")
+    xref = int(re.search(rb"startxref\s+(\d+)", pdf[-64:]).group(1))
+    table = pdf[xref:].split(b"trailer")[0].split(b"\n")
+    assert table[0] == b"xref"
+    objects = {}
+    for number, line in enumerate(table[3:], 1):
+        if not line.strip():
+            continue
+        offset = int(line[:10])
+        assert pdf[offset:].startswith(b"%d 0 obj" % number), number
+        objects[number] = pdf[offset:pdf.index(b"endobj", offset)]
+    root = int(re.search(rb"/Root (\d+) 0 R", pdf[xref:]).group(1))
+    pages = objects[int(re.search(rb"/Pages (\d+) 0 R", objects[root]).group(1))]
+    kids = [int(k) for k in re.findall(rb"(\d+) 0 R", pages[pages.index(b"/Kids"):pages.index(b"]")])]
+    assert int(re.search(rb"/Count (\d+)", pages).group(1)) == len(kids)
+
+    contents = []
+    for kid in kids:
+        page = objects[kid]
+        assert b"/Type /Page" in page
+        stream = objects[int(re.search(rb"/Contents (\d+) 0 R", page).group(1))]
+        data = re.search(rb"stream\r?\n(.*?~>)", stream, re.S).group(1)
+        contents.append(zlib.decompress(base64.a85decode(data, adobe=True)))
+    return contents
+
+
+def _data(i):
+    return {
+        "student_id": i, "full_name": f"Student {i:04}", "cne": None, "code_apoge": None, "exam_id": 1,
+        "stream": "IAA", "subject": "Deep learning", "room": "Amphi A", "table_number": i,
+        "date": "01/06/2026", "time": "09:00",
+    }
+
+
+def test_merger_keeps_every_page_in_order():
+    items = [_data(i) for i in range(7)]
+    merger = PdfMerger()
+    pdf = merger.header()
+    for chunk in (items[:3], items[3:6], items[6:]):
+        pdf += merger.add(render_pages(chunk))
+    pdf += merger.finish()
+
+    pages = pdf_pages(pdf)
+    assert len(pages) == 7
+    assert all(b"Student %04d)" % i in page for i, page in enumerate(pages))
+
+
+def _seated_exam(client, admin, db, students):
+    stream = db.query(models.Stream).first()
+    subject = db.query(models.Subject).filter(models.Subject.stream_id == stream.id).first()
+    room = db.query(models.Room).filter(models.Room.name == "Salle 1").one()  # 40 seats
+    add_students(db, stream.id, students)
+    exam = client.post("/exams/", headers=admin, json={
+        "subject_id": subject.id, "stream_id": stream.id, "room_id": room.id,
+        "date": "2026-06-01", "time": "09:00:00", "duration": 120,
+    }).json()
+    assert client.post(f"/exams/{exam['id']}/seats", headers=admin).status_code == 200
+    return exam["id"]
+
+
+def test_exports_have_one_valid_pdf_page_per_seated_student(client, admin, db):
+    exam_id = _seated_exam(client, admin, db, 45)  # overflows into a second room
+    seated = {
+        name for (name,) in db.query(models.User.full_name)
+        .join(models.Convocation, models.Convocation.student_id == models.User.id)
+        .filter(models.Convocation.exam_id == exam_id)
+    }
+    assert len(seated) == 45
+    try:
+        response = client.get(f"/exams/{exam_id}/convocations", headers=admin)
+        assert response.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+            names = zf.namelist()
+            assert len(names) == len(set(names)) == 45
+            found = set()
+            for name in names:
+                [page] = pdf_pages(zf.read(name))
+                found.add(re.search(rb"Nom complet : (.*?)\) Tj", page).group(1).decode())
+        assert found == seated
+
+        response = client.get(f"/exams/{exam_id}/convocations", params={"format": "pdf"}, headers=admin)
+        assert response.status_code == 200
+        pages = pdf_pages(response.content)
+        assert {re.search(rb"Nom complet : (.*?)\) Tj", p).group(1).decode() for p in pages} == seated
+        assert len(pages) == 45
+    finally:
+        shutdown_executor()
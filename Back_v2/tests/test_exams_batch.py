@@ -0,0 +1,97 @@
+import threading
+
+from sqlalchemy import insert
+
+from app import models, schemas
+from app.database import SQLALCHEMY_DATABASE_URL, make_engine
+
+
+def _item(client, **overrides):
+    subject = client.get("/subjects/").json()[0]
+    room = client.get("/rooms/").json()[0]
+    item = {
+        "subject_id": subject["id"], "stream_id": subject["stream_id"], "room_id": room["id"],
+        "date": "2026-06-01", "time": "09:00:00", "duration": 120,
+    }
+    item.update(overrides)
+    return item
+
+
+def _counts(db):
+    db.expire_all()
+    return db.query(models.Exam).count(), db.query(models.Change).count()
+
+
+def test_batch_creates_every_item(client, admin, db):
+    items = [_item(client), _item(client, date="2026-06-02"), _item(client, time="11:00:00")]
+    response = client.post("/exams/batch", json=items, headers=admin)
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 3
+    assert _counts(db)[0] == 3
+
+
+def test_one_missing_reference_rejects_the_whole_batch(client, admin, db):
+    before = _counts(db)
+    items = [_item(client), _item(client, date="2026-06-02", room_id=9999), _item(client, date="2026-06-03")]
+    response = client.post("/exams/batch", json=items, headers=admin)
+
+    assert response.status_code == 422
+    results = response.json()["detail"]["results"]
+    assert [r["errors"] for r in results] == [[], ["Room 9999 not found"], []]
+    assert all(r["exam"] is None for r in results)
+    assert _counts(db) == before
+
+
+def test_items_conflicting_with_each_other_reject_the_batch(client, admin, db):
+    before = _counts(db)
+    items = [_item(client), _item(client, time="10:00:00")]  # same room and stream, overlapping
+    response = client.post("/exams/batch", json=items, headers=admin)
+
+    assert response.status_code == 422
+    second = response.json()["detail"]["results"][1]
+    assert {(c["kind"], c["item"]) for c in second["batch_conflicts"]} == {("room", 0), ("stream", 0)}
+    assert _counts(db) == before
+
+
+def test_conflict_with_a_booked_exam_rejects_the_batch(client, admin, db):
+    assert client.post("/exams/", json=_item(client), headers=admin).status_code == 200
+    before = _counts(db)
+
+    items = [_item(client, date="2026-06-05"), _item(client, time="10:00:00")]
+    response = client.post("/exams/batch", json=items, headers=admin)
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["results"][1]["conflicts"]
+    assert _counts(db) == before
+    # nothing of the rejected batch reached the conflict index either
+    assert client.post("/exams/", json=_item(client, date="2026-06-05"), headers=admin).status_code == 200
+
+
+def test_a_booking_committed_by_another_process_meanwhile_is_seen(client, admin, db):
+    item = _item(client)
+    assert client.post("/exams/", json=_item(client, date="2026-06-09"), headers=admin).status_code == 200  # index loaded
+
+    # another worker process: its own engine, and no in-process listeners
+    other = make_engine(SQLALCHEMY_DATABASE_URL)
+    responses = []
+    try:
+        with other.connect() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO cache_generations (name, generation) VALUES ('conflicts', 1) "
+                "ON CONFLICT (name) DO UPDATE SET generation = generation + 1"
+            )
+            conn.execute(insert(models.Exam).values(**schemas.ExamCreate(**item).model_dump()))
+            # our request checks for conflicts while the other booking is not committed yet
+            thread = threading.Thread(
+                target=lambda: responses.append(client.post("/exams/", json=item, headers=admin))
+            )
+            thread.start()
+            thread.join(0.5)
+            assert thread.is_alive()  # waiting for the other writer
+            conn.commit()
+        thread.join()
+    finally:
+        other.dispose()
+
+    assert responses[0].status_code == 409, responses[0].text
+    assert _counts(db)[0] == 2
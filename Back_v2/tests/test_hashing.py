@@ -0,0 +1,12 @@
+from passlib.hash import bcrypt
+
+from app.hashing import BCRYPT_ROUNDS, PASSWORD_HASH_MAX_PENDING, REQUEST_THREADS, pwd_context
+
+
+def test_stronger_hashes_are_not_rehashed_down():
+    stronger = bcrypt.using(rounds=BCRYPT_ROUNDS + 1).hash("secret")
+    assert pwd_context.verify_and_update("secret", stronger) == (True, None)
+
+
+def test_queue_is_smaller_than_the_request_threadpool():
+    assert PASSWORD_HASH_MAX_PENDING < REQUEST_THREADS
@@ -0,0 +1,31 @@
+from app import models
+from tests.conftest import login
+
+HEADER = "full_name,email,password,stream_id\n"
+
+
+def _import(client, admin, rows):
+    response = client.post(
+        "/users/import", params={"role": "teacher"},
+        files={"file": ("users.csv", HEADER + "".join(rows))}, headers=admin,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_emails_differing_only_in_case_are_duplicates(client, admin, db):
+    assert _import(client, admin, ["One,s1@x.com,pw1,\n"])["created"] == 1
+
+    report = _import(client, admin, ["Two,S1@X.com,pw2,\n", "Three,s3@x.com,pw3,\n"])
+    assert report["created"] == 1
+    assert [(e["row"], e["errors"]) for e in report["errors"]] == [(2, ["email: already in use"])]
+
+    emails = sorted(e for (e,) in db.query(models.User.email).filter(models.User.role == "teacher"))
+    assert emails == ["s1@x.com", "s3@x.com"]
+
+
+def test_emails_are_stored_lowercased(client, admin, db):
+    report = _import(client, admin, ["Mixed,Mixed.Case@Example.com,pw,\n", "Again,mixed.case@example.COM,pw,\n"])
+    assert report["created"] == 1
+    assert report["errors"][0]["errors"] == ["email: duplicated in file"]
+    login(client, "mixed.case@example.com", "pw")
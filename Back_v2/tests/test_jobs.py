@@ -0,0 +1,179 @@
+import datetime
+import os
+import threading
+
+import pytest
+
+from app import jobs, models, schemas
+from app.hashing import hash_password
+
+from .conftest import login
+
+
+def _job(db, status, finished_days_ago=None):
+    now = datetime.datetime.utcnow()
+    job = models.Job(
+        kind="seats", params="{}", status=status, created_at=now,
+        finished_at=now - datetime.timedelta(days=finished_days_ago) if finished_days_ago is not None else None,
+    )
+    db.add(job)
+    db.flush()
+    os.makedirs(jobs.job_dir(job.id), exist_ok=True)
+    with open(os.path.join(jobs.job_dir(job.id), "out.zip"), "wb") as f:
+        f.write(b"x")
+    return job.id
+
+
+def test_purge_deletes_old_finished_jobs_and_their_files(db):
+    old = [_job(db, status, finished_days_ago=30) for status in ("succeeded", "failed", "cancelled")]
+    recent = _job(db, "succeeded", finished_days_ago=1)
+    running = _job(db, "running")
+    queued = _job(db, "queued")
+    db.commit()
+
+    assert sorted(jobs.purge_finished()) == old
+    db.expire_all()
+    assert sorted(id for (id,) in db.query(models.Job.id)) == [recent, running, queued]
+    assert [os.path.isdir(jobs.job_dir(i)) for i in old] == [False] * 3
+    assert all(os.path.isdir(jobs.job_dir(i)) for i in (recent, running, queued))
+    assert jobs.purge_finished() == []
+
+
+def _queued(db, count=1, kind="seats"):
+    ids = [jobs.enqueue(db, kind, schemas.SeatAllocationParams(exam_ids=[1])).id for _ in range(count)]
+    db.commit()
+    return ids
+
+
+def _status(db, job_id):
+    db.expire_all()
+    return db.get(models.Job, job_id)
+
+
+def test_two_workers_never_claim_the_same_job(db):
+    for _ in range(5):
+        job_id, = _queued(db)
+        barrier = threading.Barrier(2)
+        claimed = []
+
+        def work(name):
+            barrier.wait()
+            claimed.append(jobs.claim(name))
+
+        threads = [threading.Thread(target=work, args=(f"host:{i}",)) for i in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(claimed, key=lambda c: c is None) == [job_id, None]
+        job = _status(db, job_id)
+        assert (job.status, job.attempts) == ("running", 1)
+
+    first, second = _queued(db, 2)
+    assert (jobs.claim("host:0"), jobs.claim("host:1"), jobs.claim("host:2")) == (first, second, None)
+
+
+def test_jobs_with_a_stale_heartbeat_are_queued_again(db):
+    stale, fresh = _queued(db, 2)
+    assert jobs.claim("gone:1") == stale
+    assert jobs.claim("alive:1") == fresh
+    old = datetime.datetime.utcnow() - datetime.timedelta(seconds=jobs.JOB_STALE_SECONDS + 1)
+    db.query(models.Job).filter(models.Job.id == stale).update({"heartbeat_at": old, "cancel_requested": True})
+    db.commit()
+
+    assert jobs.requeue_stale() == 1
+    job = _status(db, stale)
+    assert (job.status, job.worker, job.cancel_requested) == ("queued", None, False)
+    assert _status(db, fresh).status == "running"
+    # picked up again, with its attempts counted
+    assert jobs.claim("alive:1") == stale
+    assert _status(db, stale).attempts == 2
+
+
+def _echo(ctx, db, params):
+    with open(ctx.path("out.txt"), "w") as f:
+        f.write("done")
+    ctx.progress(1, 1)
+    return {"rows": 1}, "out.txt"
+
+
+def _fail(ctx, db, params):
+    with open(ctx.path("partial.txt"), "w") as f:
+        f.write("half")
+    raise ValueError("broken input")
+
+
+@pytest.fixture
+def kinds(monkeypatch):
+    monkeypatch.setitem(jobs.KINDS, "echo", jobs.JobKind(schemas.SeatAllocationParams, _echo))
+    monkeypatch.setitem(jobs.KINDS, "fail", jobs.JobKind(schemas.SeatAllocationParams, _fail))
+
+
+def _submit(client, admin, kind):
+    response = client.post("/jobs/", headers=admin, json={"kind": kind, "params": {"exam_ids": [1]}})
+    assert response.status_code == 202, response.text
+    return response.json()["id"]
+
+
+def test_cancel_a_queued_job(client, admin, kinds):
+    job_id = _submit(client, admin, "echo")
+    response = client.post(f"/jobs/{job_id}/cancel", headers=admin)
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    assert jobs.claim("host:1") is None
+    assert client.post(f"/jobs/{job_id}/cancel", headers=admin).status_code == 409
+
+
+def test_cancel_a_running_job_stops_it_at_its_next_progress(client, admin, db, kinds):
+    job_id = _submit(client, admin, "echo")
+    assert jobs.claim("host:1") == job_id
+    response = client.post(f"/jobs/{job_id}/cancel", headers=admin)
+    assert (response.json()["status"], response.json()["cancel_requested"]) == ("running", True)
+
+    jobs.run_job(job_id)
+    job = _status(db, job_id)
+    assert (job.status, job.artifact) == ("cancelled", None)
+    assert os.listdir(jobs.job_dir(job_id)) == []
+
+
+def test_retry_a_failed_job(client, admin, db, kinds):
+    job_id = _submit(client, admin, "fail")
+    os.makedirs(jobs.job_dir(job_id), exist_ok=True)
+    with open(os.path.join(jobs.job_dir(job_id), jobs.INPUT_PREFIX + ".csv"), "w") as f:
+        f.write("kept")
+    assert jobs.claim("host:1") == job_id
+    jobs.run_job(job_id)
+    job = _status(db, job_id)
+    assert (job.status, job.message) == ("failed", "broken input")
+
+    response = client.post(f"/jobs/{job_id}/retry", headers=admin)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["status"], body["message"], body["progress"], body["attempts"]) == ("queued", None, 0, 1)
+    # the upload is kept for the next attempt, the outputs are not
+    assert os.listdir(jobs.job_dir(job_id)) == [jobs.INPUT_PREFIX + ".csv"]
+    assert jobs.claim("host:1") == job_id
+    assert client.post(f"/jobs/{job_id}/retry", headers=admin).status_code == 409
+
+
+def test_artifact_download_is_for_admins_of_finished_jobs(client, admin, db, kinds):
+    job_id = _submit(client, admin, "echo")
+    url = f"/jobs/{job_id}/artifact"
+    assert client.get(url, headers=admin).status_code == 404  # still queued
+
+    assert jobs.claim("host:1") == job_id
+    jobs.run_job(job_id)
+    response = client.get(url, headers=admin)
+    assert response.status_code == 200
+    assert response.content == b"done"
+
+    db.add(models.User(
+        full_name="Some Teacher", email="teacher@example.com", hashed_password=hash_password("pw"), role="teacher",
+    ))
+    db.commit()
+    assert client.get(url, headers=login(client, "teacher@example.com", "pw")).status_code == 403
+    assert client.get(url, headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+    assert client.get("/jobs/999999/artifact", headers=admin).status_code == 404
+
+    os.remove(os.path.join(jobs.job_dir(job_id), "out.txt"))
+    assert client.get(url, headers=admin).status_code == 410
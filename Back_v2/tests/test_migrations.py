@@ -0,0 +1,55 @@
+from sqlalchemy import create_engine, inspect
+
+from app import models
+from app.migrations import MIGRATIONS, check_indexes, migrate
+
+# The schema the first release created, before any migration existed
+BASELINE = (
+    "CREATE TABLE streams (id INTEGER NOT NULL PRIMARY KEY, nom VARCHAR NOT NULL)",
+    "CREATE UNIQUE INDEX ix_streams_nom ON streams (nom)",
+    "CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, full_name VARCHAR NOT NULL, email VARCHAR NOT NULL, "
+    "hashed_password VARCHAR NOT NULL, role VARCHAR NOT NULL, code_apoge VARCHAR, cne VARCHAR, "
+    "stream_id INTEGER REFERENCES streams (id))",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE TABLE subjects (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, "
+    "stream_id INTEGER NOT NULL REFERENCES streams (id))",
+    "CREATE TABLE rooms (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, capacity INTEGER NOT NULL)",
+    "CREATE TABLE exams (id INTEGER NOT NULL PRIMARY KEY, subject_id INTEGER NOT NULL REFERENCES subjects (id), "
+    "teacher_id INTEGER REFERENCES users (id), room_id INTEGER NOT NULL REFERENCES rooms (id), "
+    "stream_id INTEGER NOT NULL REFERENCES streams (id), date DATE NOT NULL, time TIME NOT NULL)",
+    "CREATE TABLE convocations (id INTEGER NOT NULL PRIMARY KEY, student_id INTEGER NOT NULL REFERENCES users (id), "
+    "exam_id INTEGER NOT NULL REFERENCES exams (id), table_number INTEGER NOT NULL, "
+    "CONSTRAINT _student_exam_uc UNIQUE (student_id, exam_id))",
+    "INSERT INTO streams (id, nom) VALUES (1, 'IAA')",
+    "INSERT INTO rooms (id, name, capacity) VALUES (1, 'Amphi A', 100)",
+    "INSERT INTO subjects (id, name, stream_id) VALUES (1, 'Analyse', 1)",
+    "INSERT INTO exams (id, subject_id, room_id, stream_id, date, time) VALUES (1, 1, 1, 1, '2026-06-01', '09:00:00')",
+)
+
+
+def _upgrade(engine):
+    """What ``python -m app.migrations upgrade`` and the app start-up do."""
+    models.Base.metadata.create_all(bind=engine)
+    return [m.version for m in migrate(engine)]
+
+
+def test_fresh_database_uses_an_index_for_every_listing(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert _upgrade(engine) == [m.version for m in MIGRATIONS]
+    assert check_indexes(engine) == []
+    assert _upgrade(engine) == []
+
+
+def test_baseline_database_is_brought_up_to_date(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE:
+            conn.exec_driver_sql(ddl)
+
+    assert _upgrade(engine) == [m.version for m in MIGRATIONS]
+    assert check_indexes(engine) == []
+    assert "duration" in {c["name"] for c in inspect(engine).get_columns("exams")}
+    assert "room_id" in {c["name"] for c in inspect(engine).get_columns("convocations")}
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT duration FROM exams").scalar() == 120
+    assert _upgrade(engine) == []
@@ -0,0 +1,18 @@
+import pytest
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+@pytest.mark.parametrize("path", ["/users/", "/subjects/", "/exams/"])
+def test_bad_cursor_is_a_400_in_both_formats(client, admin, path):
+    for params, headers in (({}, {}), ({}, NDJSON), ({"format": "ndjson"}, {})):
+        response = client.get(path, params={"cursor": "garbage", **params}, headers={**admin, **headers})
+        assert response.status_code == 400, (params, headers, response.text)
+        assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_ndjson_pages_follow_the_cursor(client, admin):
+    first = client.get("/subjects/", params={"limit": 2}, headers=admin)
+    cursor = first.headers["X-Next-Cursor"]
+    rest = client.get("/subjects/", params={"cursor": cursor, "format": "ndjson"}).text.splitlines()
+    assert len(first.json()) + len(rest) == len(client.get("/subjects/").json())
@@ -0,0 +1,59 @@
+from app import models
+from app.deps import principal_cache
+from app.hashing import hash_password
+
+from .conftest import login
+
+ADMIN_ONLY = "/users/search?q=zz"
+
+
+def _teacher(client, db):
+    db.add(models.User(
+        full_name="Some Teacher", email="teacher@example.com", hashed_password=hash_password("pw"), role="teacher",
+    ))
+    db.commit()
+    return login(client, "teacher@example.com", "pw")
+
+
+def _user(db):
+    return db.query(models.User).filter(models.User.email == "teacher@example.com").one()
+
+
+def test_role_change_is_seen_with_the_same_token(client, db):
+    headers = _teacher(client, db)
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 403  # cached from here on
+
+    _user(db).role = "admin"
+    db.commit()
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 200
+
+
+def test_deleted_user_is_rejected_with_the_same_token(client, db):
+    headers = _teacher(client, db)
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 403
+
+    db.delete(_user(db))
+    db.commit()
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 401
+
+
+def test_a_lookup_during_the_write_does_not_keep_the_old_row(client, db):
+    headers = _teacher(client, db)
+    _user(db).role = "admin"
+    db.flush()  # written, not committed: other sessions still read a teacher
+
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 403
+    db.commit()
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 200
+
+
+def test_rolled_back_change_keeps_the_cache(client, db):
+    headers = _teacher(client, db)
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 403
+    cached = len(principal_cache)
+
+    _user(db).role = "admin"
+    db.flush()
+    db.rollback()
+    assert len(principal_cache) == cached
+    assert client.get(ADMIN_ONLY, headers=headers).status_code == 403
@@ -0,0 +1,42 @@
+"""Listings must cost a fixed number of queries, however many rows they return."""
+from fastapi.testclient import TestClient
+
+from app.database import engine
+from app.main import app
+from app.queries import QueryCounter
+from bench.datagen import PASSWORD, Scale, generate
+from tests.conftest import login, wipe
+
+SMALL = Scale(streams=2, subjects_per_stream=2, students=20, teachers=2)
+LARGE = Scale(streams=2, subjects_per_stream=20, students=200, teachers=2)  # 10x exams and students
+
+LISTINGS = {
+    "/exams/": None,
+    "/exams/student": "student0@bench.example.com",
+    "/exams/teacher": "teacher0@bench.example.com",
+}
+
+
+def _run(scale, limits=None):
+    """path -> (queries, rows) on a fresh campus of ``scale``."""
+    wipe()
+    generate(engine, scale)
+    counts = {}
+    with TestClient(app) as client:
+        for path, email in LISTINGS.items():
+            headers = login(client, email, PASSWORD) if email else {}
+            client.get(path, headers=headers)  # fills the principal cache
+            with QueryCounter(limit=limits and limits[path]) as counter:
+                response = client.get(path, headers=headers)
+            assert response.status_code == 200, response.text
+            counts[path] = (counter.count, len(response.json()))
+    return counts
+
+
+def test_listing_query_counts_do_not_grow_with_rows(empty_db):
+    small = _run(SMALL)
+    large = _run(LARGE, limits={path: queries for path, (queries, _) in small.items()})
+
+    for path in LISTINGS:
+        assert large[path][1] > small[path][1], path
+        assert large[path][0] == small[path][0], path
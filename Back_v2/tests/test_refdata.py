@@ -0,0 +1,21 @@
+from app.refdata import ReferenceData
+
+
+def test_etag_depends_on_the_content_only(client, db):
+    first, second = ReferenceData(), ReferenceData()  # e.g. two worker processes
+    etag, body = first.get(db, "rooms")
+    assert second.get(db, "rooms") == (etag, body)
+
+    # a bump without a change (another worker's write to a different list) keeps the tag
+    first.bump()
+    assert first.get(db, "rooms")[0] == etag
+
+
+def test_revalidation_answers_304_until_the_list_changes(client):
+    etag = client.get("/rooms/").headers["etag"]
+    assert client.get("/rooms/", headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.post("/rooms/", json={"name": "New room", "capacity": 10}).status_code == 200
+    response = client.get("/rooms/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
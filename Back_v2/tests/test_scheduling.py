@@ -0,0 +1,112 @@
+import datetime
+from itertools import combinations
+
+from app import models
+from app.scheduling import ExamNode, overlapping_slots, session_slots, solve
+
+from .conftest import add_students
+
+MONDAY = datetime.date(2026, 6, 1)
+NINE, TEN, TWO = datetime.time(9), datetime.time(10), datetime.time(14)
+
+
+def nodes(*specs):
+    """(stream_id, teacher_id, size) per node."""
+    return [ExamNode(i, 100 + i, stream, teacher, size) for i, (stream, teacher, size) in enumerate(specs)]
+
+
+def assert_no_overlap(plan, overlaps):
+    for (a, slot_a, room_a), (b, slot_b, room_b) in combinations(plan.placed, 2):
+        if slot_b not in overlaps[slot_a]:
+            continue
+        assert a.stream_id != b.stream_id
+        assert a.teacher_id is None or a.teacher_id != b.teacher_id
+        assert room_a != room_b
+
+
+def test_solver_keeps_streams_teachers_and_rooms_apart():
+    slots = session_slots(MONDAY, MONDAY + datetime.timedelta(days=1), [NINE, TEN, TWO])
+    overlaps = overlapping_slots(slots, 120)  # 09:00 and 10:00 overlap
+    exams = nodes(
+        (1, 10, 30), (1, 11, 30), (1, None, 30), (2, 10, 20), (2, 12, 20), (3, 11, 60), (3, None, 60),
+    )
+    plan = solve(exams, slots, [(1, 60), (2, 30)], overlaps=overlaps)
+
+    assert plan.unscheduled == []
+    assert_no_overlap(plan, overlaps)
+    for node, _, room in plan.placed:
+        assert dict([(1, 60), (2, 30)])[room] >= node.size
+
+
+def test_solver_respects_unavailability_and_busy_resources():
+    slots = session_slots(MONDAY, MONDAY, [NINE, TWO])
+    exams = nodes((1, 10, 10), (2, 20, 10))
+    exams[0].domain = {1}  # teacher 10 is away in the morning
+    plan = solve(exams, slots, [(1, 50)], busy={("teacher", 20): {1}})
+
+    placed = {node.key: slot for node, slot, _ in plan.placed}
+    assert placed == {0: 1, 1: 0}
+
+
+def test_solver_explains_streams_larger_than_every_room():
+    slots = session_slots(MONDAY, MONDAY, [NINE])
+    plan = solve(nodes((1, None, 150), (2, None, 40)), slots, [(1, 100), (2, 40)])
+
+    assert [node.key for node, _, _ in plan.placed] == [1]
+    [(node, reason)] = plan.unscheduled
+    assert node.key == 0 and "largest room (100 seats)" in reason
+
+
+def _streams(db):
+    return [s.id for s in db.query(models.Stream).order_by(models.Stream.id)]
+
+
+def _request(stream_id, **overrides):
+    body = {
+        "start_date": str(MONDAY), "end_date": str(MONDAY), "slots": ["09:00:00"],
+        "stream_ids": [stream_id], "dry_run": False,
+    }
+    body.update(overrides)
+    return body
+
+
+def test_schedule_skips_the_overflow_rooms_of_seated_exams(client, admin, db):
+    first, second = _streams(db)
+    rooms = {r.name: r.id for r in db.query(models.Room)}
+    subject = db.query(models.Subject).filter(models.Subject.stream_id == first).first()
+    add_students(db, first, 150)  # Salle 1 (40) + Amphi A (100) + Salle 2 (40)
+    exam = client.post("/exams/", headers=admin, json={
+        "subject_id": subject.id, "stream_id": first, "room_id": rooms["Salle 1"],
+        "date": str(MONDAY), "time": "09:00:00", "duration": 120,
+    }).json()
+    seated = client.post(f"/exams/{exam['id']}/seats", headers=admin).json()
+    assert {r["room_id"] for r in seated["rooms"]} == set(rooms.values())
+
+    response = client.post("/exams/schedule", headers=admin, json=_request(second))
+    assert response.status_code == 200, response.text
+    assert response.json()["planned"] == []
+    assert {u["reason"] for u in response.json()["unscheduled"]} == {"no room large enough in any free slot"}
+    assert client.get("/exams/conflicts", headers=admin).json() == []
+
+
+def test_schedule_commit_books_no_conflicts(client, admin, db):
+    first, _ = _streams(db)
+    response = client.post("/exams/schedule", headers=admin, json=_request(
+        first, end_date=str(MONDAY + datetime.timedelta(days=3)), slots=["09:00:00", "14:00:00"],
+    ))
+    assert response.status_code == 200, response.text
+    planned = response.json()["planned"]
+    assert planned and all(p["id"] is not None for p in planned)
+    assert client.get("/exams/conflicts", headers=admin).json() == []
+
+
+def test_schedule_rejects_assignments_to_non_teachers(client, admin, db):
+    first, _ = _streams(db)
+    subject = db.query(models.Subject).filter(models.Subject.stream_id == first).first()
+    admin_id = db.query(models.User.id).filter(models.User.role == "admin").scalar()
+    response = client.post("/exams/schedule", headers=admin, json=_request(
+        first, teacher_assignments=[{"subject_id": subject.id, "teacher_id": admin_id}],
+    ))
+    assert response.status_code == 422
+    assert response.json()["detail"] == [f"Teacher {admin_id} not found"]
+    assert db.query(models.Exam).count() == 0
@@ -0,0 +1,69 @@
+from app import models
+from app.search import search_users
+
+
+def _users(db, *names, role="student"):
+    for name in names:
+        email = name.lower().replace(" ", ".") + "@example.com"
+        db.add(models.User(full_name=name, email=email, hashed_password="x", role=role))
+    db.commit()
+
+
+def _names(rows):
+    return [r.full_name for r in rows]
+
+
+def test_exact_substring_and_prefix_first(client, db):
+    _users(db, "Karim Bennani", "Bennani Youssef", "Sara Benali")
+    assert _names(search_users(db, "bennani")) == ["Bennani Youssef", "Karim Bennani"]
+
+
+def test_typos_find_the_closest_name(client, db):
+    _users(db, "Mohamed Alaoui", "Student Zero", "Ahmed Tazi")
+    assert _names(search_users(db, "mohamad")) == ["Mohamed Alaoui"]
+    assert _names(search_users(db, "Studnet")) == ["Student Zero"]
+    assert _names(search_users(db, "studnet zeor")) == ["Student Zero"]
+
+
+def test_users_sharing_one_trigram_do_not_crowd_out_the_match(client, db):
+    # each shares "net" with the query, several hundred of them
+    _users(db, *(f"Annette {i:03}" for i in range(300)))
+    _users(db, "Student Zero")
+    assert _names(search_users(db, "Studnet")) == ["Student Zero"]
+
+
+def test_fuzzy_pass_keeps_the_role_filter(client, db):
+    _users(db, "Student Zero")
+    _users(db, "Student Teacher", role="teacher")
+    assert _names(search_users(db, "studnet", role="teacher")) == ["Student Teacher"]
+
+
+def test_prefix_matches_come_before_better_bm25_scores(client, db):
+    # the term twice in a short name and in the email: the best BM25 score by far
+    _users(db, "Ali Ali", "Alibert Jean-Pierre Dupont-Moreau")
+    assert _names(search_users(db, "ali")) == ["Ali Ali", "Alibert Jean-Pierre Dupont-Moreau"]
+    assert _names(search_users(db, "alib")) == ["Alibert Jean-Pierre Dupont-Moreau"]
+    # names before emails, then the other full-text matches
+    _users(db, "Karim Benali")
+    assert _names(search_users(db, "ali")) == ["Ali Ali", "Alibert Jean-Pierre Dupont-Moreau", "Karim Benali"]
+
+
+def test_an_identifier_comes_first(client, db):
+    _users(db, "Sara Benali", "Youssef Amrani")
+    db.query(models.User).filter(models.User.full_name == "Youssef Amrani").update({"cne": "B130012345"})
+    db.query(models.User).filter(models.User.full_name == "Sara Benali").update({"code_apoge": "X130012345Y"})
+    db.commit()
+    assert _names(search_users(db, "B130012345")) == ["Youssef Amrani"]
+    assert _names(search_users(db, "130012345")) == ["Sara Benali", "Youssef Amrani"]
+
+
+def test_typos_are_ranked_by_similarity(client, db):
+    _users(db, "Ahmed Tazi", "Mohammed Amrani", "Mohamed Alaoui")
+    assert _names(search_users(db, "mohamad")) == ["Mohamed Alaoui", "Mohammed Amrani"]
+    assert _names(search_users(db, "mohamad amrani"))[0] == "Mohammed Amrani"
+
+
+def test_no_fuzzy_pass_once_something_matched(client, db):
+    _users(db, "Student Zero", "Studnet Typo")
+    assert _names(search_users(db, "student")) == ["Student Zero"]
+    assert _names(search_users(db, "studnet")) == ["Studnet Typo"]
@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+from app import models
+
+from .conftest import add_students
+
+
+def _ids(db):
+    streams = [s.id for s in db.query(models.Stream).order_by(models.Stream.id)]
+    rooms = {r.name: r.id for r in db.query(models.Room)}  # Amphi A 100, Salle 1 40, Salle 2 40
+    return streams, rooms
+
+
+def _exam(client, admin, db, stream_id, room_id, time="09:00:00"):
+    subject = db.query(models.Subject).filter(models.Subject.stream_id == stream_id).first()
+    response = client.post("/exams/", headers=admin, json={
+        "subject_id": subject.id, "stream_id": stream_id, "room_id": room_id,
+        "date": "2026-06-01", "time": time, "duration": 120,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _seat(client, admin, exam_id):
+    return client.post(f"/exams/{exam_id}/seats", headers=admin)
+
+
+def _rooms(response):
+    assert response.status_code == 200, response.text
+    return [(r["room_id"], r["assigned"]) for r in response.json()["rooms"]]
+
+
+def _tables(db, exam_id):
+    db.expire_all()
+    tables = defaultdict(list)
+    for room_id, table in db.query(models.Convocation.room_id, models.Convocation.table_number).filter(
+        models.Convocation.exam_id == exam_id
+    ):
+        tables[room_id].append(table)
+    return {room_id: sorted(numbers) for room_id, numbers in tables.items()}
+
+
+def test_a_stream_that_fits_stays_in_the_exam_room(client, admin, db):
+    (stream, _), rooms = _ids(db)
+    add_students(db, stream, 30)
+    exam = _exam(client, admin, db, stream, rooms["Salle 1"])
+
+    assert _rooms(_seat(client, admin, exam)) == [(rooms["Salle 1"], 30)]
+    assert _tables(db, exam) == {rooms["Salle 1"]: list(range(1, 31))}
+
+
+def test_overflow_fills_the_largest_free_rooms_first(client, admin, db):
+    (stream, _), rooms = _ids(db)
+    rooms["Salle 3"] = client.post("/rooms/", json={"name": "Salle 3", "capacity": 60}).json()["id"]
+    add_students(db, stream, 150)
+    exam = _exam(client, admin, db, stream, rooms["Salle 1"])
+
+    seated = _rooms(_seat(client, admin, exam))
+    assert seated == [(rooms["Salle 1"], 40), (rooms["Amphi A"], 100), (rooms["Salle 3"], 10)]
+    # one number per seat, contiguous from 1 in every room
+    assert _tables(db, exam) == {room: list(range(1, n + 1)) for room, n in seated}
+
+
+def test_overflow_skips_rooms_booked_or_overflowed_by_overlapping_exams(client, admin, db):
+    (first, second), rooms = _ids(db)
+    rooms["Salle 3"] = client.post("/rooms/", json={"name": "Salle 3", "capacity": 60}).json()["id"]
+    add_students(db, second, 50, prefix="other")
+    other = _exam(client, admin, db, second, rooms["Salle 2"])  # 09:00-11:00
+    assert _rooms(_seat(client, admin, other)) == [(rooms["Salle 2"], 40), (rooms["Amphi A"], 10)]
+
+    add_students(db, first, 100)
+    exam = _exam(client, admin, db, first, rooms["Salle 1"], time="10:00:00")
+    # Amphi A holds the other exam's overflow and Salle 2 its room
+    assert _rooms(_seat(client, admin, exam)) == [(rooms["Salle 1"], 40), (rooms["Salle 3"], 60)]
+
+    later = _exam(client, admin, db, first, rooms["Salle 2"], time="14:00:00")
+    assert _rooms(_seat(client, admin, later)) == [(rooms["Salle 2"], 40), (rooms["Amphi A"], 60)]
+    assert client.get("/exams/conflicts", headers=admin).json() == []
+
+
+def test_reseating_replaces_the_previous_seats(client, admin, db):
+    (stream, _), rooms = _ids(db)
+    add_students(db, stream, 30)
+    exam = _exam(client, admin, db, stream, rooms["Salle 1"])
+    assert _rooms(_seat(client, admin, exam)) == [(rooms["Salle 1"], 30)]
+
+    add_students(db, stream, 20, prefix="late")
+    assert _rooms(_seat(client, admin, exam)) == [(rooms["Salle 1"], 40), (rooms["Amphi A"], 10)]
+    assert _tables(db, exam) == {rooms["Salle 1"]: list(range(1, 41)), rooms["Amphi A"]: list(range(1, 11))}
+    assert db.query(models.Convocation).filter(models.Convocation.exam_id == exam).count() == 50
+
+
+def test_not_enough_seats_is_refused_and_keeps_the_seating(client, admin, db):
+    (stream, _), rooms = _ids(db)
+    add_students(db, stream, 30)
+    exam = _exam(client, admin, db, stream, rooms["Salle 1"])
+    assert _seat(client, admin, exam).status_code == 200
+    before = _tables(db, exam)
+
+    add_students(db, stream, 160, prefix="late")  # 190 students, 180 seats in all
+    response = _seat(client, admin, exam)
+    assert response.status_code == 409
+    assert "190 students, 180 seats" in response.json()["detail"]
+    assert _tables(db, exam) == before